@@ -5,276 +5,656 @@
 
 """
 This script creates a GUI application for managing and querying a bookstore database.
-It allows users to search for books by author, category, or publisher and displays relevant information.
-The GUI is built using tkinter and connects to a MySQL database through a DAO (Data Access Object) layer.
+It allows users to search for books by author, category, or publisher, or to type-ahead search across all of
+them, and displays relevant information. A basket tab finds the branches stocking a list of titles.
+The GUI is built using tkinter and connects to a MySQL (or SQLite) database through a DAO (Data Access Object) layer.
 This modular design facilitates easy changes to both the GUI and the database backend.
 """
 
 
+import argparse
+import logging
+import time
+from collections import namedtuple
+from functools import partial
 import tkinter as tk
 from tkinter import ttk
-from HenryDAO1 import HenryDAO # DAO class for database operations
-
-# Class to handle the Search By Author functionality
-class HenrySBA(tk.Frame):
-    def __init__(self, master=None, dao=None):
+from HenryBackends import BACKENDS, catalog_file_path, configure_logging, create_dao, load_config # Creates the configured DAO backend (MySQL, SQLite)
+from HenryCache import FEED_INVENTORY_TTL, INVENTORY_METHODS, CachedHenryDAO # Read-through cache in front of the DAO
+from HenryChangeFeed import InventoryChangeFeed # Follows the HENRY_INVENTORY change log
+from HenryExecutor import QueryExecutor # Runs DAO calls off the tkinter main thread
+from HenryPrefetch import DEFAULT_BUDGET, DEFAULT_NEIGHBOURS, Prefetcher # Loads likely next selections in the background
+from HenrySearch import SearchIndex # In-memory type-ahead index over titles, authors and publishers
+from HenrySnapshot import SnapshotHenryDAO # In-memory catalog snapshot for kiosks
+from HenryTreeRender import TreeRenderer, coalesce # Diff-based Treeview updates
+from HenryVirtualList import VirtualBookList # Book list that loads keyset pages as it scrolls
+
+logger = logging.getLogger("henry.gui")
+
+# Small progress bar shown while a frame is waiting for the database
+class LoadingIndicator(ttk.Frame):
+    def __init__(self, master=None):
+        super().__init__(master)
+        self.progress = ttk.Progressbar(self, mode="indeterminate", length=120)
+        self.label = ttk.Label(self, text="Loading...")
+        self.visible = False
+
+    def show(self):
+        if not self.visible:
+            self.label.configure(text="Loading...", foreground="")
+            self.progress.grid(row=0, column=0, padx=5)
+            self.label.grid(row=0, column=1, padx=5)
+            self.progress.start(10)
+            self.visible = True
+
+    def hide(self):
+        if self.visible:
+            self.progress.stop()
+            self.progress.grid_remove()
+            self.label.grid_remove()
+            self.visible = False
+
+    def show_error(self, message):
+        # Replaces the progress bar until the next query starts loading
+        self.hide()
+        self.label.configure(text=message, foreground="red")
+        self.label.grid(row=0, column=1, padx=5)
+
+
+# Base class for the search frames: runs DAO calls through the QueryExecutor and drives the loading indicator
+class HenryAsyncFrame(tk.Frame):
+    def __init__(self, master=None, dao=None, executor=None, channel_prefix="", prefetcher=None):
         super().__init__(master)
         self.dao = dao   # Data Access Object for database interaction
+        self.executor = executor  # Runs DAO calls on worker threads
+        # Shared by all tabs; without one, lookups still use the DAO cache but nothing is prefetched
+        self.prefetcher = prefetcher if prefetcher is not None else Prefetcher(dao, executor, budget=0)
+        self.channel_prefix = channel_prefix
+        self.on_ready = None  # Called once the initial lists and first book are shown
+        self.detail_pane = None  # BookDetailPane showing the selected book, if the frame has one
+        # Selections made within one tick (e.g. holding an arrow key in the book list) only look up the last book
+        self.select_book = coalesce(self, lambda book: self.on_book_selected(book))
         self.grid(sticky="nsew")
-        self.create_widgets()  # Method to create widgets in the GUI
-
-    def create_widgets(self):
-        # Author Selection Frame
-        author_frame = ttk.LabelFrame(self, text="Author Selection")
-        author_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
-
-        # Label and combobox for selecting an author
-        ttk.Label(author_frame, text="Select Author:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.authors = self.dao.getAllAuthors() # Fetch all authors from the database
-        author_names = [f"{author.author_first} {author.author_last}" for author in self.authors]
-        self.author_var = tk.StringVar()
-        self.author_combobox = ttk.Combobox(author_frame, textvariable=self.author_var, values=author_names)
-        self.author_combobox.grid(row=0, column=1, padx=5, pady=5)
-        self.author_combobox.bind("<<ComboboxSelected>>", self.on_author_selected)
+        self.loading = LoadingIndicator(self)
+        self.loading.grid(row=4, column=0, padx=10, pady=5, sticky="w")
+        self.create_widgets()  # Method to create widgets in the GUI; no queries are issued yet
+
+    def load(self, on_ready=None):
+        # Issue the frame's initial queries; create_widgets alone never touches the database
+        self.on_ready = on_ready
+        self.load_initial()
+
+    def load_initial(self):
+        raise NotImplementedError
+
+    def apply_inventory_changes(self, changes):
+        if self.detail_pane is not None:
+            self.detail_pane.apply_inventory_changes(changes)
+
+    def on_book_selected(self, selected_book):
+        # Called with the selected Book, or None when a new book list turned out to be empty
+        self.cancel_query("details")
+        if selected_book is None:
+            self.detail_pane.clear()
+            return
+        # A book already viewed or prefetched in any tab is in the shared DAO cache and is shown without a query
+        details = self.prefetcher.lookup(selected_book.book_code)
+        if details is not None:
+            self.show_book(details)
+            return
+        # Look the book up by its BOOK_CODE so books sharing a title are told apart
+        # Price and availability arrive together in a single round trip
+        self.run_query("details", self.dao.getBookDetails, selected_book.book_code, on_done=self.show_book)
+
+    def show_book(self, details):
+        self.detail_pane.show(details)
+        # Once the book is on screen, load the titles around it in the list in one batch
+        if details is not None:
+            self.prefetcher.prefetch_details(self.book_list.visible_books())
+
+    def run_query(self, channel, fn, *args, on_done=None, on_error=None):
+        # A newer request on the same channel supersedes an older one still in flight;
+        # on_error is called after the failure has been reported
+        self.executor.submit(self.channel_prefix + channel, fn, *args,
+                             on_done=lambda result: self._finish(on_done, result),
+                             on_error=lambda error: self._failed(error, on_error))
+        self.loading.show()
+
+    def cancel_query(self, *channels):
+        self.executor.cancel(*(self.channel_prefix + channel for channel in channels))
+        self._update_loading()
+
+    def _finish(self, on_done, result):
+        # on_done may chain the next query (e.g. authors -> books -> details), so check for pending work afterwards
+        if on_done is not None:
+            on_done(result)
+        self._update_loading()
+
+    def _failed(self, error, on_error=None):
+        logger.error("Query failed in %s", type(self).__name__, exc_info=error)
+        if on_error is not None:
+            on_error(error)
+        self._update_loading()
+        if not self.loading.visible:
+            self.loading.show_error(f"Error: {error}")
+
+    def _update_loading(self):
+        if self.executor.is_pending(self.channel_prefix):
+            self.loading.show()
+        else:
+            self.loading.hide()
+            if self.on_ready is not None:
+                on_ready, self.on_ready = self.on_ready, None
+                on_ready()
 
-        # Book Selection Frame
-        book_frame = ttk.LabelFrame(self, text="Book Selection")
-        book_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
 
-        ttk.Label(book_frame, text="Select Book:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.book_var = tk.StringVar()
-        self.book_combobox = ttk.Combobox(book_frame, textvariable=self.book_var)
-        self.book_combobox.grid(row=0, column=1, padx=5, pady=5)
-        self.book_combobox.bind("<<ComboboxSelected>>", self.on_book_selected)
+# Availability and price of the selected book; shared by every tab that lists books
+class BookDetailPane(ttk.Frame):
+    def __init__(self, master=None):
+        super().__init__(master)
+        self.book_code = None  # Book whose availability is in branches_tree
 
         # Book Availability Frame
         availability_frame = ttk.LabelFrame(self, text="Book Availability")
-        availability_frame.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
+        availability_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
 
         self.branches_tree = ttk.Treeview(availability_frame, columns=("Branch", "Availability"), show="headings")
         self.branches_tree.heading("Branch", text="Branch")
         self.branches_tree.heading("Availability", text="Availability")
         self.branches_tree.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        self.branches_view = TreeRenderer(self.branches_tree)  # Rows keyed by branch name
 
         # Book Price Frame
         price_frame = ttk.LabelFrame(self, text="Book Price")
-        price_frame.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
+        price_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
 
         self.price_var = tk.StringVar(value="Price: ")
-        price_label = ttk.Label(price_frame, textvariable=self.price_var)
-        price_label.grid(row=0, column=0, padx=5, pady=5)
-
-        # Setting the first author as default and populating the related information
-        self.author_combobox.current(0)
-        self.on_author_selected(None) 
-
-    def on_author_selected(self, event):
-        print("Author selection event triggered!")
-        # Event handler for when an author is selected
-        selected_author_name = self.author_combobox.get()
-        print("Selected author name:", selected_author_name)
-        # Fetch books by the selected author and update the GUI accordingly
-        selected_author = next(author for author in self.authors if f"{author.author_first} {author.author_last}" == selected_author_name) 
-        books = self.dao.getBooksByAuthor(selected_author)
-        print("Books for selected author:", books)
-
-        self.book_combobox['values'] = books
-        if books:
-            self.book_combobox.set(books[0])  
-            self.on_book_selected(None)
-        else:
-            self.book_combobox.set('')
-            self.branches_tree.delete(*self.branches_tree.get_children())
+        ttk.Label(price_frame, textvariable=self.price_var).grid(row=0, column=0, padx=5, pady=5)
+        # Extra line next to the price, e.g. the average price of the selected category
+        self.note_var = tk.StringVar()
+        ttk.Label(price_frame, textvariable=self.note_var).grid(row=0, column=1, padx=5, pady=5)
+
+    def show(self, details):
+        self.book_code = details.book_code if details is not None else None
+        if details is None:
+            self.branches_view.clear()
             self.price_var.set('Price: ')
+            return
+        # Only the branches whose count changed since the last book are touched
+        self.branches_view.schedule(details.availability.items())
+        self.price_var.set(f'Price: ${details.price:.2f}')
 
-    def on_book_selected(self, event):
-        selected_book_title = self.book_combobox.get()
-        branches_availability = self.dao.getBookAvailability(selected_book_title)
-        self.branches_tree.delete(*self.branches_tree.get_children())
-        for branch, availability in branches_availability.items():
-            self.branches_tree.insert("", "end", values=(branch, availability))
+    def clear(self):
+        self.show(None)
 
-        price = self.dao.getBookPrice(selected_book_title)
-        self.price_var.set(f'Price: ${price:.2f}')
+    def apply_inventory_changes(self, changes):
+        # Patch the on-hand counts of the book on screen in place, one (book, branch) row at a time
+        if self.book_code is None:
+            return
+        for change in changes:
+            if change.book_code != self.book_code or change.branch_name is None:
+                continue
+            values = (change.branch_name, change.on_hand) if change.on_hand is not None else None
+            self.branches_view.patch(change.branch_name, values)
 
 
 # In[2]:
 
 
-class HenrySBC(tk.Frame):
-    def __init__(self, master=None, dao=None):
-        super().__init__(master)
-        self.dao = dao
-        self.grid(sticky="nsew")
-        self.create_widgets()
+class BrowseDimension(namedtuple("BrowseDimension", ["name", "label", "list_method", "books_method", "display",
+                                                     "stats_method", "stats_label"],
+                                 defaults=(str, None, None))):
+    """
+    What a browse tab lists: list_method and books_method name the DAO methods returning the items
+    (e.g. getAllAuthors) and the books of one item (e.g. getBooksByAuthor); display(item) is its
+    combobox text. If stats_method is set (getPriceByCategory, getPriceByPublisher), the PriceStats
+    row whose label equals stats_label(item) is shown next to the book price.
+    """
+    __slots__ = ()
+
+
+BROWSE_DIMENSIONS = {
+    "author": BrowseDimension("author", "Author", "getAllAuthors", "getBooksByAuthor",
+                              display=lambda author: f"{author.author_first} {author.author_last}"),
+    "category": BrowseDimension("category", "Category", "getAllCategories", "getBooksByCategory",
+                                stats_method="getPriceByCategory", stats_label=lambda category: category.type_),
+    "publisher": BrowseDimension("publisher", "Publisher", "getAllPublishers", "getBooksByPublisher",
+                                 stats_method="getPriceByPublisher",
+                                 stats_label=lambda publisher: publisher.publisher_name),
+}
+
+
+# Browses the books of one author, category or publisher (Search By Author/Category/Publisher tabs)
+class HenryBrowseTab(HenryAsyncFrame):
+    def __init__(self, master=None, dao=None, executor=None, dimension=None, prefetcher=None):
+        self.dimension = dimension
+        self.neighbour_lists = None  # Book lists of the items next to the selected one, warmed after its first book
+        super().__init__(master, dao, executor, channel_prefix=dimension.name + ".", prefetcher=prefetcher)
 
     def create_widgets(self):
-        # Category Selection Frame
-        category_frame = ttk.LabelFrame(self, text="Category Selection")
-        category_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
-        
-        ttk.Label(category_frame, text="Select Category:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.categories = self.dao.getAllCategories()
-        self.category_var = tk.StringVar()
-        self.category_combobox = ttk.Combobox(category_frame, textvariable=self.category_var, values=self.categories)
-        self.category_combobox.grid(row=0, column=1, padx=5, pady=5)
-        self.category_combobox.bind("<<ComboboxSelected>>", self.on_category_selected)
+        label = self.dimension.label
+        # Item Selection Frame
+        item_frame = ttk.LabelFrame(self, text=f"{label} Selection")
+        item_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+
+        ttk.Label(item_frame, text=f"Select {label}:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.items = []
+        self.item_combobox = ttk.Combobox(item_frame)
+        self.item_combobox.grid(row=0, column=1, padx=5, pady=5)
+        self.item_combobox.bind("<<ComboboxSelected>>", self.on_item_selected)
 
         # Book Selection Frame
         book_frame = ttk.LabelFrame(self, text="Book Selection")
         book_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
-        
-        ttk.Label(book_frame, text="Select Book:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.book_var = tk.StringVar()
-        self.book_combobox = ttk.Combobox(book_frame, textvariable=self.book_var)
-        self.book_combobox.grid(row=0, column=1, padx=5, pady=5)
-        self.book_combobox.bind("<<ComboboxSelected>>", self.on_book_selected)
 
-        # Book Availability Frame
-        availability_frame = ttk.LabelFrame(self, text="Book Availability")
-        availability_frame.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
-        
-        self.branches_tree = ttk.Treeview(availability_frame, columns=("Branch", "Availability"), show="headings")
-        self.branches_tree.heading("Branch", text="Branch")
-        self.branches_tree.heading("Availability", text="Availability")
-        self.branches_tree.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Label(book_frame, text="Select Book:").grid(row=0, column=0, padx=5, pady=5, sticky="nw")
+
+        # Only a window of pages is loaded; more titles are fetched as the list scrolls
+        self.book_list = VirtualBookList(book_frame, self.run_query, "books", on_select=self.select_book)
+        self.book_list.grid(row=0, column=1, padx=5, pady=5)
+
+        self.detail_pane = BookDetailPane(self)
+        self.detail_pane.grid(row=2, column=0, sticky="ew")
+
+    def load_initial(self):
+        # Fetch all items in the background; the first one is selected once they arrive
+        self.run_query("items", getattr(self.dao, self.dimension.list_method), on_done=self.show_items)
+
+    def show_items(self, items):
+        self.items = items
+        self.item_combobox['values'] = [self.dimension.display(item) for item in self.items]
+        # Setting the first item as default and populating the related information
+        if self.items:
+            self.item_combobox.current(0)
+            self.on_item_selected(None)
+
+    def on_item_selected(self, event):
+        index = self.item_combobox.current()
+        if index < 0:
+            return
+        # The combobox index lines up with self.items, so the model (and its key) is picked directly
+        selected_item = self.items[index]
+        # Details of the previous item's book are no longer wanted
+        self.cancel_query("details")
+        books_method = getattr(self.dao, self.dimension.books_method)
+        self.book_list.reset(partial(books_method, selected_item))
+        neighbours = self.prefetcher.neighbours
+        self.neighbour_lists = [partial(books_method, item)
+                                for item in self.items[max(0, index - neighbours):index + neighbours + 1]
+                                if item is not selected_item]
+        if self.dimension.stats_method is not None:
+            self.run_query("stats", getattr(self.dao, self.dimension.stats_method),
+                           on_done=lambda stats: self.show_average_price(selected_item, stats))
+
+    def show_book(self, details):
+        super().show_book(details)
+        if self.neighbour_lists:
+            self.prefetcher.warm_lists(self.neighbour_lists, self.book_list.page_size)
+            self.neighbour_lists = None
+
+    def show_average_price(self, item, stats):
+        # Average price of the selected item's books, aggregated by the database
+        label = self.dimension.stats_label(item)
+        for stat in stats:
+            if stat.label == label:
+                self.detail_pane.note_var.set(f'Average Price: ${stat.average:.2f} ({stat.titles} books)')
+                return
+        self.detail_pane.note_var.set('Average Price: ')
 
-        # Book Price Frame
-        price_frame = ttk.LabelFrame(self, text="Book Price")
-        price_frame.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
-        
-        self.price_var = tk.StringVar(value="Price: ")
-        price_label = ttk.Label(price_frame, textvariable=self.price_var)
-        price_label.grid(row=0, column=0, padx=5, pady=5)
 
-        # Setting the first category as default and populating the related information
-        self.category_combobox.current(0)
-        self.on_category_selected(None)
-        
-    def on_category_selected(self, event):
-        selected_category_name = self.category_combobox.get()
-        # Finding the Category instance corresponding to the selected category name
-        selected_category = next(category for category in self.categories if str(category) == selected_category_name)
-        books = self.dao.getBooksByCategory(selected_category)
-
-        self.book_combobox['values'] = books
-        if books:
-            self.book_combobox.set(books[0])
-            self.on_book_selected(None)
-        else:
-            self.book_combobox.set('')
-            self.branches_tree.delete(*self.branches_tree.get_children())
-            self.price_var.set('Average Price: ')
+# In[3]:
 
-    def on_book_selected(self, event):
-        selected_book_title = self.book_combobox.get()
-        branches_availability = self.dao.getBookAvailability(selected_book_title)
-        self.branches_tree.delete(*self.branches_tree.get_children())
-        for branch, availability in branches_availability.items():
-            self.branches_tree.insert("", "end", values=(branch, availability))
 
-        price = self.dao.getBookPrice(selected_book_title)
-        self.price_var.set(f'Price: ${price:.2f}')
-        
+class HenrySearchTab(HenryAsyncFrame):
+    debounce_ms = 150   # Wait this long after the last keystroke before searching
+    result_limit = 50
 
+    def __init__(self, master=None, dao=None, executor=None, prefetcher=None):
+        super().__init__(master, dao, executor, channel_prefix="search.", prefetcher=prefetcher)
 
+    def create_widgets(self):
+        self.index = None   # SearchIndex, built in the background by load_initial
+        self.hits = []      # SearchHit objects behind the results tree, in display order
+        self._pending_search = None
+
+        # Search Frame
+        search_frame = ttk.LabelFrame(self, text="Search")
+        search_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+
+        ttk.Label(search_frame, text="Title, author or publisher:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.query_var = tk.StringVar()
+        self.query_entry = ttk.Entry(search_frame, textvariable=self.query_var, width=40)
+        self.query_entry.grid(row=0, column=1, padx=5, pady=5)
+        self.query_var.trace_add("write", self.on_query_changed)
+        self.status_var = tk.StringVar(value="Building search index...")
+        ttk.Label(search_frame, textvariable=self.status_var).grid(row=1, column=0, columnspan=2, padx=5, sticky="w")
+
+        # Results Frame: matches on the left, books of a selected author or publisher on the right
+        results_frame = ttk.LabelFrame(self, text="Results")
+        results_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+
+        self.results_tree = ttk.Treeview(results_frame, columns=("Type", "Name"), show="headings", height=10)
+        self.results_tree.heading("Type", text="Type")
+        self.results_tree.heading("Name", text="Name")
+        self.results_tree.column("Type", width=80)
+        self.results_tree.grid(row=0, column=0, padx=5, pady=5, sticky="ns")
+        self.results_tree.bind("<<TreeviewSelect>>", self.on_result_selected)
+        self.book_list = VirtualBookList(results_frame, self.run_query, "books", on_select=self.select_book)
+        self.book_list.grid(row=0, column=1, padx=5, pady=5, sticky="ns")
+
+        self.detail_pane = BookDetailPane(self)
+        self.detail_pane.grid(row=2, column=0, sticky="ew")
+
+
+    def load_initial(self):
+        # One bulk read of titles, authors and publishers; every keystroke afterwards is answered from memory
+        self.run_query("index", SearchIndex.from_dao, self.dao, on_done=self.set_index)
+
+    def set_index(self, index):
+        self.index = index
+        self.status_var.set(f"{len(index)} titles, authors and publishers indexed")
+        if self.query_var.get().strip():
+            self.run_search()
+
+    def on_query_changed(self, *args):
+        # Debounce: only search once typing pauses
+        if self._pending_search is not None:
+            self.after_cancel(self._pending_search)
+        self._pending_search = self.after(self.debounce_ms, self.run_search)
+
+    def run_search(self):
+        self._pending_search = None
+        if self.index is None:
+            return
+        started = time.perf_counter()
+        self.hits = self.index.search(self.query_var.get(), limit=self.result_limit)
+        elapsed = time.perf_counter() - started
+        self.results_tree.delete(*self.results_tree.get_children())
+        for position, hit in enumerate(self.hits):
+            self.results_tree.insert("", "end", iid=str(position), values=(hit.kind.capitalize(), hit.label))
+        if self.query_var.get().strip():
+            self.status_var.set(f"{len(self.hits)} matches in {elapsed * 1000:.2f} ms")
+
+    def on_result_selected(self, event):
+        selection = self.results_tree.selection()
+        if not selection:
+            return
+        hit = self.hits[int(selection[0])]
+        if hit.kind == "book":
+            self.cancel_query("books")
+            self.book_list.clear()
+            self.on_book_selected(hit.item)
+        elif hit.kind == "author":
+            self.book_list.reset(partial(self.dao.getBooksByAuthor, hit.item))
+        else:
+            self.book_list.reset(partial(self.dao.getBooksByPublisher, hit.item))
 
-# In[3]:
 
+# In[4]:
 
-import tkinter as tk
-from tkinter import ttk
 
-class HenrySBP(tk.Frame):
-    def __init__(self, master=None, dao=None):
-        super().__init__(master)
-        self.dao = dao
-        self.grid(sticky="nsew")
-        self.create_widgets()
+# Fleet-wide inventory reports; every figure is aggregated by the database (or the kiosk snapshot)
+class HenryReportTab(HenryAsyncFrame):
+    low_stock_threshold = 2
+    low_stock_limit = 200
+    all_categories = "All categories"
 
-    def create_widgets(self):
-        # Publisher Selection Frame
-        publisher_frame = ttk.LabelFrame(self, text="Publisher Selection")
-        publisher_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
-        
-        ttk.Label(publisher_frame, text="Select Publisher:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.publishers = self.dao.getAllPublishers()
-        publisher_names = [publisher.publisher_name for publisher in self.publishers]
-        self.publisher_var = tk.StringVar()
-        self.publisher_combobox = ttk.Combobox(publisher_frame, textvariable=self.publisher_var, values=publisher_names)
-        self.publisher_combobox.grid(row=0, column=1, padx=5, pady=5)
-        self.publisher_combobox.bind("<<ComboboxSelected>>", self.on_publisher_selected)
-
-        # Book Selection Frame
-        book_frame = ttk.LabelFrame(self, text="Book Selection")
-        book_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+    def __init__(self, master=None, dao=None, executor=None, prefetcher=None):
+        super().__init__(master, dao, executor, channel_prefix="report.", prefetcher=prefetcher)
 
-        ttk.Label(book_frame, text="Select Book:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.book_var = tk.StringVar()
-        self.book_combobox = ttk.Combobox(book_frame, textvariable=self.book_var)
-        self.book_combobox.grid(row=0, column=1, padx=5, pady=5)
-        self.book_combobox.bind("<<ComboboxSelected>>", self.on_book_selected)
-        
-        # Book Availability Frame
-        availability_frame = ttk.LabelFrame(self, text="Book Availability")
-        availability_frame.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
+    def create_widgets(self):
+        self.categories = []
+        # Report name -> (column headings, DAO method running the query, function returning its arguments,
+        # function formatting one result row). The arguments are read from the widgets on the main thread;
+        # only the DAO method runs on a worker.
+        no_args = lambda: ()
+        self.reports = {
+            "Stock by branch": (("Branch", "Titles", "On Hand", "Stock Value"),
+                                self.dao.getStockByBranch, lambda: (self.selected_category(),), self.stock_row),
+            "Stock by category": (("Category", "Titles", "On Hand", "Stock Value"),
+                                  self.dao.getStockByCategory, no_args, self.stock_row),
+            "Stock by publisher": (("Publisher", "Titles", "On Hand", "Stock Value"),
+                                   self.dao.getStockByPublisher, no_args, self.stock_row),
+            "Price by category": (("Category", "Books", "Average", "Lowest", "Highest"),
+                                  self.dao.getPriceByCategory, no_args, self.price_row),
+            "Price by publisher": (("Publisher", "Books", "Average", "Lowest", "Highest"),
+                                   self.dao.getPriceByPublisher, no_args, self.price_row),
+            "Low stock": (("Title", "Branch", "On Hand"),
+                          self.dao.getLowStock, lambda: (self.low_stock_threshold, self.low_stock_limit),
+                          lambda item: (item.title, item.branch_name, item.on_hand)),
+        }
+
+        # Report Selection Frame
+        selection_frame = ttk.LabelFrame(self, text="Report Selection")
+        selection_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+
+        ttk.Label(selection_frame, text="Report:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.report_combobox = ttk.Combobox(selection_frame, values=list(self.reports), state="readonly")
+        self.report_combobox.current(0)
+        self.report_combobox.grid(row=0, column=1, padx=5, pady=5)
+        self.report_combobox.bind("<<ComboboxSelected>>", lambda event: self.run_report())
+
+        ttk.Label(selection_frame, text="Category:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.category_combobox = ttk.Combobox(selection_frame, values=[self.all_categories], state="readonly")
+        self.category_combobox.current(0)
+        self.category_combobox.grid(row=1, column=1, padx=5, pady=5)
+        self.category_combobox.bind("<<ComboboxSelected>>", lambda event: self.run_report())
+
+        ttk.Button(selection_frame, text="Refresh", command=self.refresh).grid(row=0, column=2, padx=5, pady=5)
+
+        # Report Frame
+        report_frame = ttk.LabelFrame(self, text="Report")
+        report_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+
+        self.report_tree = ttk.Treeview(report_frame, show="headings", height=15)
+        self.report_tree.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        scrollbar = ttk.Scrollbar(report_frame, orient="vertical", command=self.report_tree.yview)
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        self.report_tree.configure(yscrollcommand=scrollbar.set)
+        self.report_view = TreeRenderer(self.report_tree)
+        self.status_var = tk.StringVar()
+        ttk.Label(report_frame, textvariable=self.status_var).grid(row=1, column=0, padx=5, sticky="w")
+
+    def load_initial(self):
+        self.run_query("categories", self.dao.getAllCategories, on_done=self.show_categories)
+        self.refresh()
+
+    def show_categories(self, categories):
+        self.categories = categories
+        self.category_combobox['values'] = [self.all_categories] + [str(category) for category in categories]
+
+    def selected_category(self):
+        index = self.category_combobox.current()
+        return self.categories[index - 1] if index > 0 else None
+
+    def refresh(self):
+        # Fold the latest inventory changes into the summary table, then rerun the report on top of it
+        self.status_var.set("Refreshing stock summary...")
+        self.run_query("summary", self.dao.refreshStockSummary, on_done=lambda result: self.run_report())
+
+    def run_report(self):
+        name = self.report_combobox.get()
+        columns, query, query_args, row = self.reports[name]
+        started = time.perf_counter()
+        self.run_query("report", query, *query_args(),
+                       on_done=lambda results: self.show_report(name, columns, row, results, started))
+
+    def show_report(self, name, columns, row, results, started):
+        if tuple(self.report_tree["columns"]) != columns:
+            # A different report: its rows share nothing with the ones shown
+            self.report_view.clear()
+            self.report_tree["columns"] = columns
+            for column in columns:
+                self.report_tree.heading(column, text=column)
+                self.report_tree.column(column, width=220 if column == columns[0] else 100,
+                                        anchor="w" if column == columns[0] else "e")
+        # Rerunning a report (Refresh, another category) only updates the rows whose figures changed
+        self.report_view.render(map(row, results))
+        self.status_var.set(f"{name}: {len(results)} rows in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @staticmethod
+    def stock_row(total):
+        return (total.label, total.titles or 0, total.on_hand or 0, f"${total.stock_value or 0:,.2f}")
+
+    @staticmethod
+    def price_row(stats):
+        return (stats.label, stats.titles, f"${stats.average:.2f}", f"${stats.lowest:.2f}", f"${stats.highest:.2f}")
 
-        self.branches_tree = ttk.Treeview(availability_frame, columns=("Branch", "Availability"), show="headings")
-        self.branches_tree.heading("Branch", text="Branch")
-        self.branches_tree.heading("Availability", text="Availability")
-        self.branches_tree.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
 
-        # Book Price Frame
-        price_frame = ttk.LabelFrame(self, text="Book Price")
-        price_frame.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
+# In[5]:
 
-        self.price_var = tk.StringVar(value="Price: ")
-        price_label = ttk.Label(price_frame, textvariable=self.price_var)
-        price_label.grid(row=0, column=0, padx=5, pady=5)
-
-        # Setting the first publisher as default and populating the related information
-        self.publisher_combobox.current(0)
-        self.on_publisher_selected(None)
-        
-        
-
-    def on_publisher_selected(self, event):
-        print("Publisher selection event triggered!")
-        selected_publisher_name = self.publisher_combobox.get()
-        print("Selected publisher name:", selected_publisher_name)
-        selected_publisher = next(publisher for publisher in self.publishers if publisher.publisher_name == selected_publisher_name)
-        books = self.dao.getBooksByPublisher(selected_publisher)
-        print("Books for selected publisher:", books)
-
-        self.book_combobox['values'] = books
-        if books:
-            self.book_combobox.set(books[0])  
-            self.on_book_selected(None)
-        else:
-            self.book_combobox.set('')
-            
-    def on_book_selected(self, event):
-        selected_book_title = self.book_combobox.get()
-        branches_availability = self.dao.getBookAvailability(selected_book_title)
-        self.branches_tree.delete(*self.branches_tree.get_children())
-        for branch, availability in branches_availability.items():
-            self.branches_tree.insert("", "end", values=(branch, availability))
-
-        price = self.dao.getBookPrice(selected_book_title)
-        self.price_var.set(f'Price: ${price:.2f}')
 
-    
+# Which branches have a basket of titles in stock; the whole branch x book matrix comes from one query
+class HenryBasketTab(HenryAsyncFrame):
+    missing_shown = 3   # Titles listed in the Missing column before it is summarized as "+n more"
 
+    def __init__(self, master=None, dao=None, executor=None, prefetcher=None):
+        super().__init__(master, dao, executor, channel_prefix="basket.", prefetcher=prefetcher)
 
-# In[5]:
+    def create_widgets(self):
+        self.basket = {}   # book code -> title, in the order the books were added
+
+        # Basket Frame
+        basket_frame = ttk.LabelFrame(self, text="Basket")
+        basket_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+
+        ttk.Label(basket_frame, text="Book codes:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.codes_var = tk.StringVar()
+        codes_entry = ttk.Entry(basket_frame, textvariable=self.codes_var, width=40)
+        codes_entry.grid(row=0, column=1, padx=5, pady=5)
+        codes_entry.bind("<Return>", lambda event: self.add_codes())
+        ttk.Button(basket_frame, text="Add", command=self.add_codes).grid(row=0, column=2, padx=5, pady=5)
+
+        self.basket_list = tk.Listbox(basket_frame, height=8, width=50, selectmode="extended", exportselection=False)
+        self.basket_list.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+        buttons = ttk.Frame(basket_frame)
+        buttons.grid(row=1, column=2, padx=5, pady=5, sticky="n")
+        ttk.Button(buttons, text="Remove", command=self.remove_selected).grid(row=0, column=0, pady=2, sticky="ew")
+        ttk.Button(buttons, text="Clear", command=self.clear_basket).grid(row=1, column=0, pady=2, sticky="ew")
+        self.status_var = tk.StringVar(value="Add book codes, separated by spaces or commas")
+        ttk.Label(basket_frame, textvariable=self.status_var).grid(row=2, column=0, columnspan=3, padx=5, sticky="w")
+
+        # Branch Coverage Frame: branches holding the most basket titles first, then the most copies
+        coverage_frame = ttk.LabelFrame(self, text="Branch Coverage")
+        coverage_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+
+        columns = ("Branch", "In Stock", "On Hand", "Missing")
+        self.coverage_tree = ttk.Treeview(coverage_frame, columns=columns, show="headings", height=12)
+        for column in columns:
+            self.coverage_tree.heading(column, text=column)
+        self.coverage_tree.column("In Stock", width=80, anchor="e")
+        self.coverage_tree.column("On Hand", width=80, anchor="e")
+        self.coverage_tree.column("Missing", width=320)
+        self.coverage_tree.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        scrollbar = ttk.Scrollbar(coverage_frame, orient="vertical", command=self.coverage_tree.yview)
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        self.coverage_tree.configure(yscrollcommand=scrollbar.set)
+        self.coverage_view = TreeRenderer(self.coverage_tree)
+
+    def load_initial(self):
+        # Nothing to load until books are added
+        self._update_loading()
+
+    def add_codes(self):
+        codes = [code.strip() for code in self.codes_var.get().replace(",", " ").split()]
+        codes = [code for code in dict.fromkeys(codes) if code not in self.basket]
+        if not codes:
+            return
+        # One batched lookup checks the codes and fetches the titles to list
+        self.run_query("titles", self.dao.getBookDetailsBatch, codes,
+                       on_done=lambda details: self.show_added(codes, details))
+
+    def show_added(self, codes, details):
+        unknown = [code for code in codes if code not in details]
+        for code in codes:
+            if code in details and code not in self.basket:
+                self.basket[code] = details[code].title
+                self.basket_list.insert("end", f"{details[code].title} ({code})")
+        self.codes_var.set(" ".join(unknown))
+        self.status_var.set(f"Unknown book codes: {', '.join(unknown)}" if unknown else f"{len(self.basket)} books in the basket")
+        self.check_stock()
+
+    def remove_selected(self):
+        codes = list(self.basket)
+        for index in sorted(self.basket_list.curselection(), reverse=True):
+            del self.basket[codes[index]]
+            self.basket_list.delete(index)
+        self.status_var.set(f"{len(self.basket)} books in the basket")
+        self.check_stock()
+
+    def clear_basket(self):
+        self.basket.clear()
+        self.basket_list.delete(0, "end")
+        self.status_var.set("Add book codes, separated by spaces or commas")
+        self.check_stock()
+
+    def check_stock(self):
+        if not self.basket:
+            self.cancel_query("stock")
+            self.coverage_view.clear()
+            return
+        codes = list(self.basket)
+        self.run_query("stock", self.dao.getBasketStock, codes, on_done=lambda matrix: self.show_coverage(codes, matrix))
+
+    def show_coverage(self, codes, matrix):
+        rows = []
+        for branch, in_stock, on_hand, missing in self.rank_branches(codes, matrix):
+            titles = [self.basket.get(code, code) for code in missing[:self.missing_shown]]
+            if len(missing) > self.missing_shown:
+                titles.append(f"+{len(missing) - self.missing_shown} more")
+            rows.append((branch, f"{in_stock}/{len(codes)}", on_hand, ", ".join(titles)))
+        self.coverage_view.render(rows)
+
+    @staticmethod
+    def rank_branches(codes, matrix):
+        """
+        Rank the branches of a getBasketStock matrix: (branch, titles in stock, copies of the basket
+        on hand, codes not in stock) tuples, most titles in stock first, then most copies.
+        """
+        ranked = []
+        for position, (branch, stock) in enumerate(matrix.items()):
+            missing = [code for code in codes if not stock.get(code)]
+            on_hand = sum(int(count) for count in stock.values() if count)
+            ranked.append((-(len(codes) - len(missing)), -on_hand, position, branch, missing, on_hand))
+        ranked.sort()
+        return [(branch, -in_stock, on_hand, missing) for in_stock, _, _, branch, missing, on_hand in ranked]
+
+
+# In[6]:
 
 
 def main():
     # Main method to create and run the GUI application
+    started_at = time.perf_counter()  # Startup timings are reported relative to this
+    parser = argparse.ArgumentParser(description="Henry's Bookstore")
+    parser.add_argument("--config", help="configuration file (default: henry.ini)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="storage backend (default: from the configuration)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="kiosk mode: load the whole catalog into memory and answer queries from it")
+    parser.add_argument("--refresh-interval", type=float, default=60.0,
+                        help="seconds between snapshot refreshes in kiosk mode (default: 60)")
+    parser.add_argument("--catalog-file",
+                        help="kiosk mode with a local catalog file: start from it instantly and keep browsing "
+                             "when the database is down (default: [snapshot] catalog_file with --snapshot)")
+    parser.add_argument("--inventory-poll", type=float, default=2.0,
+                        help="seconds between inventory change feed polls, 0 to disable (default: 2)")
+    parser.add_argument("--prefetch-budget", type=int, default=DEFAULT_BUDGET,
+                        help=f"books whose details are prefetched around a selection, 0 to disable (default: {DEFAULT_BUDGET})")
+    parser.add_argument("--prefetch-neighbours", type=int, default=DEFAULT_NEIGHBOURS,
+                        help="authors, categories or publishers on either side of the selection whose book lists "
+                             f"are prefetched (default: {DEFAULT_NEIGHBOURS})")
+    args = parser.parse_args()
+    config = load_config(args.config)
+    configure_logging(config)
 
     # Sets up the root window, tabs for each search type, and handles database connection
     
     def on_exit():
+        executor.shutdown()  # Drop queries still waiting for a worker
+        if prefetcher.stats["lookups"]:
+            from_memory, from_prefetch = prefetcher.hit_rate()
+            logger.info("Book details served from memory: %.0f%% of %d selections (%.0f%% prefetched)",
+                        from_memory * 100, prefetcher.stats["lookups"], from_prefetch * 100)
         dao.close_connection()  # Close the database connection
         root.destroy()  # Close the GUI window
 
@@ -290,27 +670,103 @@ def main():
     # Create the tabbed notebook
     notebook = ttk.Notebook(main_frame)
 
-    # Create an instance of the DAO
-    dao = HenryDAO()
-
-    # Create the Search by Author (SBA) tab
-    sba_frame = ttk.Frame(notebook)
-    app_sba = HenrySBA(master=sba_frame, dao=dao)
-    app_sba.pack(fill=tk.BOTH, expand=True)
-    notebook.add(sba_frame, text="Search By Author")
-
-    # Create the Search by Category (SBC) tab
-    sbc_frame = ttk.Frame(notebook)
-    app_sbc = HenrySBC(master=sbc_frame, dao=dao)
-    app_sbc.pack(fill=tk.BOTH, expand=True)
-    notebook.add(sbc_frame, text="Search By Category")
-
-    # Create the Search by Publisher (SBP) tab
-    sbp_frame = ttk.Frame(notebook)
-    app_sbp = HenrySBP(master=sbp_frame, dao=dao)
-    app_sbp.pack(fill=tk.BOTH, expand=True)
-    notebook.add(sbp_frame, text="Search By Publisher")
-
+    # Create an instance of the DAO, wrapped in the catalog cache (or the full snapshot in kiosk mode)
+    if args.snapshot or args.catalog_file:
+        # With a catalog file the database is only needed to revalidate it, so do not wait for a connection
+        catalog_path = catalog_file_path(config, args.catalog_file)
+        dao = SnapshotHenryDAO(create_dao(config, backend=args.backend, connect_eagerly=catalog_path is None),
+                               refresh_interval=args.refresh_interval, cache_path=catalog_path)
+    else:
+        dao = CachedHenryDAO(create_dao(config, backend=args.backend))
+    executor = QueryExecutor(root)
+    prefetcher = Prefetcher(dao, executor, budget=args.prefetch_budget, neighbours=args.prefetch_neighbours)
+
+    # Inventory change feed: on-hand counts on screen and in the cache are patched as they change.
+    # It is set up on a worker (its first query reads the watermark) so an unreachable database cannot delay startup.
+    feed = None
+
+    def start_feed(new_feed):
+        nonlocal feed
+        if not new_feed.enabled:
+            return
+        feed = new_feed
+        if isinstance(dao, CachedHenryDAO):
+            # Cached counts no longer go stale between polls, so they can be kept longer
+            dao.ttls.update(dict.fromkeys(INVENTORY_METHODS, FEED_INVENTORY_TTL))
+        root.after(int(args.inventory_poll * 1000), poll_inventory)
+
+    # Tabs are only placeholders at first; each search frame is built and queried the first time its tab is shown
+    tab_classes = [
+        ("Search By Author", partial(HenryBrowseTab, dimension=BROWSE_DIMENSIONS["author"])),
+        ("Search By Category", partial(HenryBrowseTab, dimension=BROWSE_DIMENSIONS["category"])),
+        ("Search By Publisher", partial(HenryBrowseTab, dimension=BROWSE_DIMENSIONS["publisher"])),
+        ("Search", HenrySearchTab),
+        ("Reports", HenryReportTab),
+        ("Basket", HenryBasketTab),
+    ]
+    tabs = {}   # notebook tab id -> (tab text, frame class or factory, placeholder frame)
+    apps = {}   # notebook tab id -> search frame, once built
+    for text, frame_class in tab_classes:
+        tab_frame = ttk.Frame(notebook)
+        notebook.add(tab_frame, text=text)
+        tabs[str(tab_frame)] = (text, frame_class, tab_frame)
+
+    def report_ready(text, built_at):
+        now = time.perf_counter()
+        logger.debug("Tab '%s' ready in %.1f ms (%.1f ms since startup)",
+                     text, (now - built_at) * 1000, (now - started_at) * 1000)
+
+    def build_selected_tab(event=None):
+        tab_id = notebook.select()
+        if not tab_id or tab_id in apps:
+            return
+        text, frame_class, tab_frame = tabs[tab_id]
+        built_at = time.perf_counter()
+        app = frame_class(master=tab_frame, dao=dao, executor=executor, prefetcher=prefetcher)
+        app.pack(fill=tk.BOTH, expand=True)
+        apps[tab_id] = app
+        app.load(on_ready=lambda: report_ready(text, built_at))
+
+    def on_first_map(event):
+        # Populate the visible tab only once the window is on screen
+        notebook.unbind("<Map>")
+        logger.debug("Window mapped in %.1f ms", (time.perf_counter() - started_at) * 1000)
+        notebook.bind("<<NotebookTabChanged>>", build_selected_tab)
+        root.after_idle(build_selected_tab)
+
+    notebook.bind("<Map>", on_first_map)
+
+    def poll_inventory():
+        # The next poll is only scheduled once this one finished, so polls never supersede each other
+        executor.submit("inventory", feed.poll, on_done=show_inventory_changes, on_error=inventory_failed)
+
+    def inventory_failed(error):
+        # Database errors come back as empty polls, so this is unexpected; keep polling
+        logger.error("Error polling inventory changes", exc_info=error)
+        root.after(int(args.inventory_poll * 1000), poll_inventory)
+
+    def show_inventory_changes(changes):
+        if changes:
+            for app in apps.values():
+                app.apply_inventory_changes(changes)
+        root.after(int(args.inventory_poll * 1000), poll_inventory)
+
+    if args.inventory_poll > 0:
+        executor.submit("inventory", InventoryChangeFeed, dao, on_done=start_feed,
+                        on_error=lambda error: logger.error("Error starting the inventory change feed", exc_info=error))
+
+    def show_connection_state():
+        # Kiosks keep browsing the saved catalog while the database is down
+        title = "Henry's Bookstore"
+        if dao.online is False:
+            saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(dao.snapshot.loaded_at))
+            title += f" (offline, catalog of {saved})"
+        if root.title() != title:
+            root.title(title)
+        root.after(2000, show_connection_state)
+
+    if isinstance(dao, SnapshotHenryDAO):
+        show_connection_state()
 
     # Pack the notebook
     notebook.pack(fill=tk.BOTH, expand=True)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryBackends.py, chooses and creates the storage backend of the Henry Bookstore application.
+create_dao() reads henry.ini (or the file named by the HENRY_CONFIG environment variable), looks up
+the configured backend in BACKENDS and returns a ready HenryDAOInterface implementation. Database
+credentials live in the configuration instead of the code: the password goes in the
+HENRY_DB_PASSWORD environment variable or in henry.local.ini (next to the configuration file and
+ignored by git), whose settings override henry.ini. HENRY_BACKEND overrides the backend for a single run.
+"""
+
+import configparser
+import logging
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG_PATH = os.path.join(SCRIPT_DIR, "henry.ini")
+LOCAL_CONFIG_SUFFIX = ".local.ini"   # henry.ini -> henry.local.ini, for settings kept out of git
+
+
+def load_config(path=None):
+    """
+    Read the configuration file and its local override file (e.g. henry.local.ini); missing files or
+    sections fall back to the built-in defaults.
+    """
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "database": {"backend": "mysql"},
+        "mysql": {"host": "localhost", "port": "3306", "user": "root", "password": "", "database": "Henry"},
+        "sqlite": {"path": ":memory:"},
+        "pool": {"size": "5", "checkout_timeout": "10", "health_check_interval": "30"},
+        "logging": {"level": "WARNING", "query_level": "DEBUG", "slow_query_ms": "500"},
+        "snapshot": {"catalog_file": ""},
+    })
+    path = path or os.environ.get("HENRY_CONFIG", DEFAULT_CONFIG_PATH)
+    config.read([path, os.path.splitext(path)[0] + LOCAL_CONFIG_SUFFIX])
+    if os.environ.get("HENRY_BACKEND"):
+        config["database"]["backend"] = os.environ["HENRY_BACKEND"]
+    if os.environ.get("HENRY_DB_PASSWORD"):
+        config["mysql"]["password"] = os.environ["HENRY_DB_PASSWORD"]
+    return config
+
+
+def configure_logging(config):
+    """Set up the root logger from the [logging] section (called by the application entry points)."""
+    logging.basicConfig(level=config["logging"]["level"].upper(),
+                        format="%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+
+def apply_instrumentation(dao, config):
+    """Apply the slow-query threshold and per-query log level from the [logging] section to a DAO."""
+    section = config["logging"]
+    dao.slow_query_threshold = section.getfloat("slow_query_ms") / 1000
+    dao.query_log_level = logging.getLevelName(section["query_level"].upper())
+    return dao
+
+
+def _pool_args(config):
+    pool = config["pool"]
+    return dict(pool_size=pool.getint("size"),
+                checkout_timeout=pool.getfloat("checkout_timeout"),
+                health_check_interval=pool.getfloat("health_check_interval"))
+
+
+def _create_mysql(config, connect_eagerly=True):
+    from HenryDAO1 import HenryDAO
+    section = config["mysql"]
+    return HenryDAO(host=section["host"], port=section.getint("port"), user=section["user"],
+                    password=section["password"], database=section["database"],
+                    connect_eagerly=connect_eagerly, **_pool_args(config))
+
+
+def _create_sqlite(config, connect_eagerly=True):
+    # A local file is always reachable, so there is nothing to defer
+    from HenrySQLiteDAO import HenrySQLiteDAO
+    path = config["sqlite"]["path"]
+    if path != ":memory:" and not os.path.isabs(path):
+        path = os.path.join(SCRIPT_DIR, path)
+    return HenrySQLiteDAO(path=path, **_pool_args(config))
+
+
+# Backend name -> factory taking the parsed configuration
+BACKENDS = {
+    "mysql": _create_mysql,
+    "sqlite": _create_sqlite,
+}
+
+
+def create_dao(config=None, backend=None, connect_eagerly=True):
+    """
+    Create the DAO for the configured backend.
+    `config` may be a ConfigParser or a path to a configuration file; `backend` overrides the
+    backend named in the configuration. With connect_eagerly=False an unreachable database server
+    is only noticed by the first query, so callers with a catalog file can start offline.
+    """
+    if not isinstance(config, configparser.ConfigParser):
+        config = load_config(config)
+    name = (backend or config["database"]["backend"]).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(sorted(BACKENDS))}")
+    return apply_instrumentation(BACKENDS[name](config, connect_eagerly=connect_eagerly), config)
+
+
+def catalog_file_path(config, path=None):
+    """
+    Absolute path of the snapshot catalog file: `path` (e.g. from the command line, relative to the
+    working directory), else [snapshot] catalog_file (relative to the scripts), or None if neither is set.
+    """
+    if path:
+        return os.path.abspath(path)
+    path = config["snapshot"]["catalog_file"]
+    if not path:
+        return None
+    return path if os.path.isabs(path) else os.path.join(SCRIPT_DIR, path)
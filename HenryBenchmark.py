@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryBenchmark.py, times every HenryDAO query method so performance can be tracked over time.
+For each method it records the cold call (the first call on a freshly created DAO, so it includes
+opening connections and warming the database's own caches) and a series of warm calls with
+varying arguments, and reports p50/p95/p99 latency, rows per second and how many connections
+and pool checkouts the calls needed. Results are written as JSON; passing an earlier result file
+with --compare prints the change per method and fails when a method got slower than the allowed
+threshold, so regressions show up between runs. --memory ROWS instead measures how much memory and
+time it takes to turn ROWS result rows into model objects (no database needed).
+
+    python HenryDataGen.py --books 1000000 --authors 100000 --branches 500 --sqlite henry_1m.db
+    python HenryBenchmark.py --sqlite henry_1m.db --output bench_1m.json
+    python HenryBenchmark.py --backend mysql --compare bench_before.json
+    python HenryBenchmark.py --memory 1000000
+    python HenryBenchmark.py --backend mysql --prepared-comparison
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from HenryBackends import BACKENDS, apply_instrumentation, configure_logging, create_dao, load_config
+from HenryCache import CachedHenryDAO
+from HenryInterfaceClasses import Author, Book, Category, Publisher
+from HenryMetrics import REGISTRY
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return 1
+
+
+def open_dao(args, config, cached=None):
+    if args.sqlite:
+        from HenrySQLiteDAO import HenrySQLiteDAO
+        dao = apply_instrumentation(HenrySQLiteDAO(path=args.sqlite, pool_size=args.pool_size), config)
+    else:
+        dao = create_dao(config, backend=args.backend)
+    return CachedHenryDAO(dao) if (args.cached if cached is None else cached) else dao
+
+
+def sample_arguments(dao, count, seed):
+    """Pick random authors, categories, publishers and book codes to vary the benchmarked calls."""
+    rng = random.Random(seed)
+
+    def sample(query, factory):
+        rows = dao.fetchRows(query) or []
+        return [factory(*row) for row in rng.sample(rows, min(count, len(rows)))]
+
+    return {
+        "authors": sample("SELECT DISTINCT A.AUTHOR_NUM, A.AUTHOR_LAST, A.AUTHOR_FIRST FROM HENRY_AUTHOR A "
+                          "JOIN HENRY_WROTE W ON W.AUTHOR_NUM = A.AUTHOR_NUM", Author),
+        "categories": sample("SELECT DISTINCT TYPE FROM HENRY_BOOK", Category),
+        "publishers": sample("SELECT DISTINCT P.PUBLISHER_CODE, P.PUBLISHER_NAME, P.CITY FROM HENRY_PUBLISHER P "
+                             "JOIN HENRY_BOOK B ON B.PUBLISHER_CODE = P.PUBLISHER_CODE", Publisher),
+        "book_codes": sample("SELECT BOOK_CODE FROM HENRY_BOOK", lambda code: code),
+        "dataset": {row[0]: row[1] for row in (dao.fetchRows(
+            "SELECT 'books', COUNT(*) FROM HENRY_BOOK UNION ALL SELECT 'authors', COUNT(*) FROM HENRY_AUTHOR "
+            "UNION ALL SELECT 'branches', COUNT(*) FROM HENRY_BRANCH "
+            "UNION ALL SELECT 'inventory', COUNT(*) FROM HENRY_INVENTORY") or [])},
+    }
+
+
+def benchmark_cases(samples, batch_size):
+    """Return (method name, list of argument tuples) for every benchmarked DAO method."""
+    codes = samples["book_codes"]
+    batches = [[codes[(start + i) % len(codes)] for i in range(batch_size)]
+               for start in range(0, len(codes), batch_size)] if codes else []
+    return [
+        ("getAllAuthors", [()]),
+        ("getAllCategories", [()]),
+        ("getAllPublishers", [()]),
+        ("getBooksByAuthor", [(a,) for a in samples["authors"]]),
+        ("getBooksByCategory", [(c,) for c in samples["categories"]]),
+        ("getBooksByPublisher", [(p,) for p in samples["publishers"]]),
+        ("getBookAvailability", [(c,) for c in codes]),
+        ("getBookPrice", [(c,) for c in codes]),
+        ("getBookDetails", [(c,) for c in codes]),
+        ("getBookDetailsBatch", [(batch,) for batch in batches]),
+    ]
+
+
+def time_method(dao, method_name, argument_sets, iterations):
+    """Time one cold call and `iterations` warm calls of a DAO method."""
+    method = getattr(dao, method_name)
+    pool_before = dao.pool_stats()
+
+    started = time.perf_counter()
+    result = method(*argument_sets[0])
+    cold = time.perf_counter() - started
+
+    warm, rows = [], 0
+    for i in range(iterations):
+        arguments = argument_sets[i % len(argument_sets)]
+        started = time.perf_counter()
+        result = method(*arguments)
+        warm.append(time.perf_counter() - started)
+        rows += row_count(result)
+
+    pool_after = dao.pool_stats()
+    total = sum(warm)
+    return {
+        "cold_ms": cold * 1000,
+        "warm_iterations": iterations,
+        "mean_ms": statistics.mean(warm) * 1000,
+        "p50_ms": percentile(warm, 0.50) * 1000,
+        "p95_ms": percentile(warm, 0.95) * 1000,
+        "p99_ms": percentile(warm, 0.99) * 1000,
+        "rows": rows,
+        "rows_per_sec": rows / total if total else 0.0,
+        # Each method runs on its own fresh DAO, so this counts every connection it needed
+        "connects": pool_after["connects"] + pool_after["reconnects"],
+        "checkouts": pool_after["checkouts"] - pool_before["checkouts"],
+    }
+
+
+# In[2]:
+
+
+def run(args):
+    config = load_config(args.config)
+    configure_logging(config)
+    # One DAO just to pick the arguments, so the timed DAOs start cold
+    dao = open_dao(args, config)
+    try:
+        samples = sample_arguments(dao, args.samples, args.seed)
+    finally:
+        dao.close_connection()
+
+    results = {}
+    for method_name, argument_sets in benchmark_cases(samples, args.batch_size):
+        if args.only and method_name not in args.only:
+            continue
+        if not argument_sets:
+            print(f"{method_name:22} skipped (no sample arguments)")
+            continue
+        dao = open_dao(args, config)
+        try:
+            results[method_name] = time_method(dao, method_name, argument_sets, args.iterations)
+        finally:
+            dao.close_connection()
+        report_line(method_name, results[method_name])
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": "sqlite:" + args.sqlite if args.sqlite else (args.backend or config["database"]["backend"]),
+        "cached": args.cached,
+        "python": platform.python_version(),
+        "dataset": samples["dataset"],
+        "iterations": args.iterations,
+        "methods": results,
+    }
+    if args.prepared_comparison:
+        report["prepared_comparison"] = prepared_comparison(args, config, samples)
+    report["metrics"] = REGISTRY.dump()
+    return report
+
+
+# The hot GUI paths: one call per book selection and one per author selection
+PREPARED_COMPARISON_METHODS = ("getBookAvailability", "getBooksByAuthor")
+
+
+def prepared_comparison(args, config, samples):
+    """
+    Time the hot query paths with plain statements and again with prepared statements, uncached.
+    Backends without server-side prepared statements (SQLite) run both passes the same way.
+    """
+    cases = dict(benchmark_cases(samples, args.batch_size))
+    comparison = {}
+    print("\nPlain vs prepared statements:")
+    for method_name in PREPARED_COMPARISON_METHODS:
+        if not cases.get(method_name):
+            continue
+        timings = {}
+        for label, prepared in (("plain", False), ("prepared", True)):
+            dao = open_dao(args, config, cached=False)
+            supported = dao.prepared_statements
+            dao.prepared_statements = prepared and supported
+            try:
+                timings[label] = time_method(dao, method_name, cases[method_name], args.iterations)
+            finally:
+                dao.close_connection()
+        plain, prepared = timings["plain"], timings["prepared"]
+        change = (prepared["p50_ms"] - plain["p50_ms"]) / plain["p50_ms"] if plain["p50_ms"] else 0.0
+        note = "" if supported else "  (backend has no prepared statements)"
+        print(f"{method_name:22} p50 {plain['p50_ms']:8.3f} -> {prepared['p50_ms']:8.3f} ms ({change:+.1%}) | "
+              f"p95 {plain['p95_ms']:8.3f} -> {prepared['p95_ms']:8.3f} ms{note}")
+        comparison[method_name] = timings
+    return comparison
+
+
+class DictBook:
+    """The Book model as it was before it became a named tuple (one __dict__ per instance), as a memory baseline."""
+
+    def __init__(self, book_code, title, price):
+        self.book_code = book_code
+        self.title = title
+        self.price = price
+
+
+class SlotsBook:
+    """Book as a plain class with __slots__, for comparison."""
+    __slots__ = ("book_code", "title", "price")
+
+    def __init__(self, book_code, title, price):
+        self.book_code = book_code
+        self.title = title
+        self.price = price
+
+
+def memory_benchmark(row_count):
+    """
+    Measure the memory and construction time of turning `row_count` (book_code, title, price) rows
+    into model objects. The rows themselves are allocated up front, so the numbers are the cost of
+    the objects alone.
+    """
+    rows = [(f"{i:08d}", f"Title {i}", 4.99 + i % 7500 / 100) for i in range(row_count)]
+    codes, titles, prices = zip(*rows)
+    variants = [
+        ("dict class, Cls(*row)", lambda: [DictBook(*row) for row in rows]),
+        ("__slots__ class, Cls(*row)", lambda: [SlotsBook(*row) for row in rows]),
+        ("Book(*row)", lambda: [Book(*row) for row in rows]),
+        ("Book.from_rows(rows)", lambda: Book.from_rows(rows)),
+        ("Book.from_columns(...)", lambda: Book.from_columns(codes, titles, prices)),
+    ]
+    results = {}
+    for name, build in variants:
+        gc.collect()
+        gc.disable()   # Like timeit: keep cyclic GC passes over the row list out of the timing
+        try:
+            started = time.perf_counter()
+            objects = build()
+            elapsed = time.perf_counter() - started
+        finally:
+            gc.enable()
+        del objects
+        gc.collect()
+        tracemalloc.start()
+        objects = build()
+        allocated, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del objects
+        results[name] = {"seconds": elapsed, "bytes": allocated, "peak_bytes": peak,
+                         "bytes_per_row": allocated / row_count}
+        print(f"{name:28} {elapsed * 1000:9.1f} ms | {allocated / 2 ** 20:8.1f} MiB "
+              f"({allocated / row_count:6.1f} B/row, peak {peak / 2 ** 20:.1f} MiB)")
+    return {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "rows": row_count, "memory": results}
+
+
+def report_line(method_name, result):
+    print(f"{method_name:22} cold {result['cold_ms']:9.2f} ms | p50 {result['p50_ms']:8.3f} "
+          f"p95 {result['p95_ms']:8.3f} p99 {result['p99_ms']:8.3f} ms | "
+          f"{result['rows_per_sec']:12,.0f} rows/s | {result['connects']} conn, {result['checkouts']} checkouts")
+
+
+def compare(current, baseline, threshold):
+    """Print the p50/p95 change per method against a baseline run; returns the regressed methods."""
+    regressions = []
+    print(f"\nCompared with {baseline.get('started_at', 'baseline')} ({baseline.get('backend')}):")
+    for method_name, result in current["methods"].items():
+        before = baseline.get("methods", {}).get(method_name)
+        if not before:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms"):
+            change = (result[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            changes.append(f"{metric[:3]} {change:+.1%}")
+            if change > threshold and method_name not in regressions:
+                regressions.append(method_name)
+        flag = "  REGRESSION" if method_name in regressions else ""
+        print(f"{method_name:22} {', '.join(changes)}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HenryDAO query methods")
+    parser.add_argument("--config", help="configuration file (default: henry.ini)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="backend from the configuration to benchmark")
+    parser.add_argument("--sqlite", help="benchmark this SQLite database file (e.g. from HenryDataGen.py)")
+    parser.add_argument("--cached", action="store_true", help="benchmark through CachedHenryDAO")
+    parser.add_argument("--iterations", type=int, default=200, help="warm calls per method (default: 200)")
+    parser.add_argument("--samples", type=int, default=100, help="distinct arguments per method (default: 100)")
+    parser.add_argument("--batch-size", type=int, default=50, help="book codes per getBookDetailsBatch call")
+    parser.add_argument("--only", action="append", help="only benchmark this method (repeatable)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="slowdown counted as a regression when comparing (default: 0.20 = 20%%)")
+    parser.add_argument("--prepared-comparison", action="store_true",
+                        help="also time getBookAvailability and getBooksByAuthor with plain vs prepared statements")
+    parser.add_argument("--memory", type=int, metavar="ROWS",
+                        help="only measure model object memory for this many rows (e.g. 1000000)")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        results = memory_benchmark(args.memory)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                json.dump(results, out, indent=2)
+        return 0
+    results = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            json.dump(results, out, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous:
+            if compare(results, json.load(previous), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
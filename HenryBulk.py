@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryBulk.py, imports and exports Henry Bookstore tables in bulk.
+Branch stock and catalog changes used to be maintained by hand-editing INSERT statements like the
+ones in Henry.sql. HenryBulk streams CSV or JSON Lines files (optionally gzip-compressed) row by row,
+validates every row against the column types of the schema (CHAR lengths, DECIMAL precision and
+scale, non-empty primary keys) and against the parent tables its foreign keys refer to, and
+upserts the valid rows with HenryDAO.upsertRows, which writes `--batch-size` rows per
+executemany() call and transaction (INSERT ... ON DUPLICATE KEY UPDATE on MySQL,
+INSERT ... ON CONFLICT DO UPDATE on SQLite). Invalid rows are reported and skipped.
+Exports read the table through HenryDAO.iterRows, so neither direction ever holds a whole table in memory.
+
+    python HenryBulk.py import HENRY_INVENTORY nightly_stock.csv.gz --batch-size 5000
+    python HenryBulk.py export HENRY_BOOK books.jsonl
+"""
+
+import argparse
+import contextlib
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from HenryBackends import BACKENDS, configure_logging, create_dao, load_config
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger("henry.bulk")
+
+FORMATS = ("csv", "jsonl")
+
+CREATE_TABLE_RE = re.compile(r"CREATE TABLE\s+(\w+)\s*\((.*?)\)\s*;", re.IGNORECASE | re.DOTALL)
+COLUMN_RE = re.compile(r"^\s*(\w+)\s+(CHAR|DECIMAL)\s*\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)(\s+PRIMARY KEY)?",
+                       re.IGNORECASE | re.MULTILINE)
+PRIMARY_KEY_RE = re.compile(r"PRIMARY KEY\s*\(([^)]*)\)", re.IGNORECASE)
+
+# Henry.sql declares no foreign keys; these are the references import rows are checked against
+FOREIGN_KEYS = {
+    "HENRY_BOOK": {"PUBLISHER_CODE": ("HENRY_PUBLISHER", "PUBLISHER_CODE")},
+    "HENRY_INVENTORY": {"BOOK_CODE": ("HENRY_BOOK", "BOOK_CODE"), "BRANCH_NUM": ("HENRY_BRANCH", "BRANCH_NUM")},
+    "HENRY_WROTE": {"BOOK_CODE": ("HENRY_BOOK", "BOOK_CODE"), "AUTHOR_NUM": ("HENRY_AUTHOR", "AUTHOR_NUM")},
+}
+# Rows whose foreign keys are looked up together; also bounds the IN lists (SQLite allows 999 parameters)
+REFERENCE_CHECK_ROWS = 500
+
+
+class BulkError(Exception):
+    """Raised when an import or export cannot go on (bad file layout, too many invalid rows)."""
+
+
+class Column:
+    def __init__(self, name, kind, length, scale=0):
+        self.name = name        # Upper-case column name
+        self.kind = kind        # "CHAR" or "DECIMAL"
+        self.length = length    # CHAR length, or DECIMAL precision
+        self.scale = scale      # DECIMAL digits after the point
+
+    def convert(self, value):
+        """Return the value to write for a raw CSV/JSON value, or raise ValueError if it does not fit."""
+        if self.kind == "CHAR":
+            value = str(value)
+            if len(value) > self.length:
+                raise ValueError(f"{self.name}: {value!r} is longer than {self.length} characters")
+            return value
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            raise ValueError(f"{self.name}: {value!r} is not a number") from None
+        if not number.is_finite() or number != number.quantize(Decimal(1).scaleb(-self.scale)):
+            raise ValueError(f"{self.name}: {value!r} has more than {self.scale} decimal places")
+        if abs(number) >= 10 ** (self.length - self.scale):
+            raise ValueError(f"{self.name}: {value!r} does not fit DECIMAL({self.length},{self.scale})")
+        # Kept exact: a float could round a value such as a PRICE on its way to the database
+        return int(number) if self.scale == 0 else number
+
+
+class TableSchema:
+    def __init__(self, name, columns, key_columns):
+        self.name = name
+        self.columns = {column.name: column for column in columns}   # In CREATE TABLE order
+        self.key_columns = key_columns
+
+
+def parse_schema(text):
+    """Return {table name: TableSchema} for the CREATE TABLE statements of a SQL script."""
+    tables = {}
+    for name, body in CREATE_TABLE_RE.findall(text):
+        columns, keys = [], []
+        for column, kind, length, scale, primary in COLUMN_RE.findall(body):
+            columns.append(Column(column.upper(), kind.upper(), int(length), int(scale or 0)))
+            if primary:
+                keys.append(column.upper())
+        match = PRIMARY_KEY_RE.search(body)
+        if match:
+            keys = [key.strip().upper() for key in match.group(1).split(",")]
+        tables[name.upper()] = TableSchema(name.upper(), columns, keys)
+    return tables
+
+
+def load_schema(generated=False):
+    """The tables of Henry.sql, or with generated=True the widened schema written by HenryDataGen."""
+    if generated:
+        from HenryDataGen import SCHEMA
+        return parse_schema(SCHEMA)
+    with open(os.path.join(SCRIPT_DIR, "Henry.sql"), encoding="utf-8") as script:
+        return parse_schema(script.read())
+
+
+def detect_format(path, fmt=None):
+    """The file format given explicitly or by extension (.csv, .jsonl/.ndjson, optionally .gz)."""
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise BulkError(f"Cannot tell the format of {path}; use --format {' or '.join(FORMATS)}")
+
+
+def open_text(path, mode):
+    """Open a text file for streaming; "-" is stdin/stdout and a .gz suffix means gzip."""
+    if path == "-":
+        return _std_stream(sys.stdin if mode == "r" else sys.stdout)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+@contextlib.contextmanager
+def _std_stream(stream):
+    # stdin/stdout stay open after the with-block: the UTF-8 wrapper is detached instead of closed
+    if not hasattr(stream, "buffer"):
+        yield stream
+        return
+    stream.flush()
+    wrapper = io.TextIOWrapper(stream.buffer, encoding="utf-8", newline="")
+    try:
+        yield wrapper
+    finally:
+        wrapper.flush()
+        wrapper.detach()
+
+
+# In[2]:
+
+
+def read_records(stream, fmt):
+    """Yield (line number, {column: raw value}) for each record of a CSV (with header) or JSONL stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_num, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                record = json.loads(line)
+            except ValueError as err:
+                record = err   # Reported as an invalid row by RowValidator
+            yield line_num, record
+
+
+class RowValidator:
+    """
+    Turns raw records into row tuples, in the column order of the file's first record.
+    Missing or empty values are written as NULL, except in primary key columns. With a dao, non-NULL
+    FOREIGN_KEYS values must exist in their parent table; they are looked up REFERENCE_CHECK_ROWS
+    rows at a time. Invalid records are logged and skipped; once more than `max_errors` were
+    rejected, BulkError stops the import.
+    """
+
+    def __init__(self, table, max_errors=100, dao=None):
+        self.table = table
+        self.max_errors = max_errors
+        self.dao = dao
+        self.references = FOREIGN_KEYS.get(table.name, {}) if dao is not None else {}
+        self.columns = []
+        self.rows = 0
+        self.rejected = 0
+
+    def validate(self, records):
+        """Yield a row tuple for every valid record; self.columns is set once the first record is read."""
+        pending = []   # (line number, row) waiting for the foreign key lookup
+        for line_num, row in self._converted(records):
+            if not self.references:
+                self.rows += 1
+                yield row
+                continue
+            pending.append((line_num, row))
+            if len(pending) >= REFERENCE_CHECK_ROWS:
+                yield from self._referenced(pending)
+                pending = []
+        yield from self._referenced(pending)
+
+    def _converted(self, records):
+        table = self.table
+        for line_num, record in records:
+            if not self.columns:
+                self._set_columns(line_num, record)
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError(f"not a JSON object ({record})")
+                values = {str(name).strip().upper(): value for name, value in record.items()}
+                row = []
+                for name in self.columns:
+                    value = values.get(name)
+                    if value is None or value == "":
+                        if name in table.key_columns:
+                            raise ValueError(f"{name}: primary key value is missing")
+                        row.append(None)
+                    else:
+                        row.append(table.columns[name].convert(value))
+            except ValueError as err:
+                self._reject(line_num, err)
+                continue
+            yield line_num, tuple(row)
+
+    def _reject(self, line_num, reason):
+        self.rejected += 1
+        logger.warning("Skipping line %d: %s", line_num, reason)
+        if self.rejected > self.max_errors:
+            raise BulkError(f"More than {self.max_errors} invalid rows; stopped at line {line_num}") from None
+
+    def _referenced(self, pending):
+        """Yield the rows of `pending` whose foreign keys all exist; reject the others."""
+        checks = []   # (column index, column name, parent table, normalized keys found)
+        for name, (parent, parent_column) in self.references.items():
+            if name in self.columns:
+                index = self.columns.index(name)
+                values = {row[index] for _, row in pending if row[index] is not None}
+                checks.append((index, name, parent, self._existing(parent, parent_column, values)))
+        for line_num, row in pending:
+            missing = next((f"{name}: {row[index]!r} is not in {parent}" for index, name, parent, found in checks
+                            if row[index] is not None and _reference_key(row[index]) not in found), None)
+            if missing is not None:
+                self._reject(line_num, missing)
+                continue
+            self.rows += 1
+            yield row
+
+    def _existing(self, parent, parent_column, values):
+        if not values:
+            return set()
+        query = f"SELECT {parent_column} FROM {parent} WHERE {parent_column} IN ({', '.join(['%s'] * len(values))})"
+        rows = self.dao.fetchRows(query, tuple(values))
+        if rows is None:
+            raise BulkError(f"Could not look up {parent}.{parent_column} to check foreign keys")
+        return {_reference_key(value) for value, in rows}
+
+    def _set_columns(self, line_num, record):
+        if not isinstance(record, dict):
+            raise BulkError(f"line {line_num}: expected an object with column names, got {record!r}")
+        columns = [str(name).strip().upper() for name in record]
+        unknown = [name for name in columns if name not in self.table.columns]
+        if unknown:
+            raise BulkError(f"{self.table.name} has no column {', '.join(unknown)}")
+        missing = [key for key in self.table.key_columns if key not in columns]
+        if missing:
+            raise BulkError(f"Rows for {self.table.name} need the primary key column {', '.join(missing)}")
+        self.columns = columns
+
+
+def _reference_key(value):
+    # MySQL compares CHAR keys without regard to case or trailing spaces
+    return value.rstrip().casefold() if isinstance(value, str) else value
+
+
+def _table(schema, table):
+    if table.upper() not in schema:
+        raise BulkError(f"Unknown table {table}; expected one of {', '.join(sorted(schema))}")
+    return schema[table.upper()]
+
+
+def import_file(dao, table, path, fmt=None, batch_size=5000, max_errors=100, schema=None):
+    """
+    Stream a CSV/JSONL file into `table`, upserting `batch_size` rows per transaction.
+    Returns {"rows": rows written, "rejected": invalid rows skipped, "seconds": elapsed}. Batches
+    committed before an error stay in the database; re-running the import is safe since every
+    write is an upsert.
+    """
+    table = _table(schema or load_schema(), table)
+    fmt = detect_format(path, fmt)
+    started = time.perf_counter()
+    validator = RowValidator(table, max_errors, dao)
+    with open_text(path, "r") as stream:
+        records = iter(read_records(stream, fmt))
+        rows = validator.validate(records)
+        first = next(rows, None)   # Reads the header, so the column list is known before the upsert starts
+        written = 0
+        if first is not None:
+            written = dao.upsertRows(table.name, validator.columns, table.key_columns,
+                                     _prepend(first, rows), batch_size=batch_size)
+    return {"rows": written, "rejected": validator.rejected, "seconds": time.perf_counter() - started}
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def export_table(dao, table, path, fmt=None, batch_size=5000, schema=None):
+    """
+    Write every row of `table` to a CSV/JSONL file in primary key order, streaming it from the
+    database `batch_size` rows at a time. Returns {"rows": rows written, "seconds": elapsed}.
+    """
+    table = _table(schema or load_schema(), table)
+    fmt = detect_format(path, fmt)
+    columns = list(table.columns)
+    query = f"SELECT {', '.join(columns)} FROM {table.name} ORDER BY {', '.join(table.key_columns)}"
+    started = time.perf_counter()
+    count = 0
+    with open_text(path, "w") as stream:
+        if fmt == "csv":
+            writer = csv.writer(stream)
+            writer.writerow(columns)
+            for row in dao.iterRows(query, batch_size=batch_size):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in dao.iterRows(query, batch_size=batch_size):
+                stream.write(json.dumps(dict(zip(columns, row)), default=_json_value) + "\n")
+                count += 1
+    return {"rows": count, "seconds": time.perf_counter() - started}
+
+
+# In[3]:
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import and export Henry Bookstore tables in bulk")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("table", help="table name, e.g. HENRY_INVENTORY")
+    parser.add_argument("file", help="CSV or JSONL file, optionally .gz; - for stdin/stdout")
+    parser.add_argument("--format", choices=FORMATS, help="file format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="rows per executemany() call and transaction, or per fetch on export (default: 5000)")
+    parser.add_argument("--max-errors", type=int, default=100,
+                        help="invalid rows to skip before the import is stopped (default: 100)")
+    parser.add_argument("--generated-schema", action="store_true",
+                        help="validate against the widened column sizes of HenryDataGen databases")
+    parser.add_argument("--config", help="configuration file (default: henry.ini)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="storage backend (default: from the configuration)")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    config = load_config(args.config)
+    configure_logging(config)
+
+    schema = load_schema(args.generated_schema)
+    dao = create_dao(config, backend=args.backend)
+    try:
+        if args.command == "import":
+            result = import_file(dao, args.table, args.file, args.format, args.batch_size, args.max_errors, schema)
+            summary = f"Imported {result['rows']:,} rows into {args.table.upper()} ({result['rejected']:,} rejected)"
+            # Inventory changes reach the stock summary through the change log; catalog edits need a rebuild
+            dao.refreshStockSummary(full=args.table.upper() != "HENRY_INVENTORY")
+        else:
+            result = export_table(dao, args.table, args.file, args.format, args.batch_size, schema)
+            summary = f"Exported {result['rows']:,} rows from {args.table.upper()}"
+    except (BulkError, OSError) as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return 1
+    except dao.Error as err:
+        print(f"Database error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        dao.close_connection()
+    seconds = result["seconds"]
+    rate = result["rows"] / seconds if seconds > 0 else 0.0
+    print(f"{summary} in {seconds:.1f} s ({rate:,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryCache.py, provides a read-through cache that sits in front of HenryDAO.
+Authors, categories, publishers and the book lists under them rarely change, so repeated combobox
+selections in the GUI are answered from memory instead of going back to MySQL. Every cached DAO
+method has its own time-to-live: catalog data is kept for minutes, while anything that carries
+HENRY_INVENTORY.ON_HAND counts expires after a few seconds so stock figures stay fresh.
+Entries are evicted least-recently-used first once either the entry count or the approximate
+memory bound is exceeded. CachedHenryDAO exposes the same methods as HenryDAO, so the GUI can use
+either one interchangeably.
+When the inventory change feed (HenryChangeFeed.py) is running, apply_inventory_changes() patches
+the cached on-hand counts in place, so inventory entries can be kept for FEED_INVENTORY_TTL instead.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from HenryInterfaceClasses import BookDetail
+
+# Time-to-live in seconds for each cached DAO method
+CATALOG_TTL = 600.0
+INVENTORY_TTL = 5.0
+FEED_INVENTORY_TTL = 60.0   # Inventory TTL while the change feed keeps cached counts current
+DEFAULT_TTLS = {
+    "getAllAuthors": CATALOG_TTL,
+    "getAllCategories": CATALOG_TTL,
+    "getAllPublishers": CATALOG_TTL,
+    "getBooksByAuthor": CATALOG_TTL,
+    "getBooksByCategory": CATALOG_TTL,
+    "getBooksByPublisher": CATALOG_TTL,
+    "getBookPrice": CATALOG_TTL,
+    "getBookAvailability": INVENTORY_TTL,
+    "getBookDetails": INVENTORY_TTL,
+    "getStockByBranch": INVENTORY_TTL,
+    "getStockByCategory": INVENTORY_TTL,
+    "getStockByPublisher": INVENTORY_TTL,
+    "getLowStock": INVENTORY_TTL,
+    "getPriceByCategory": CATALOG_TTL,
+    "getPriceByPublisher": CATALOG_TTL,
+}
+
+# Methods whose results include on-hand counts
+INVENTORY_METHODS = ("getBookAvailability", "getBookDetails")
+# Reports aggregating on-hand counts; dropped whenever any count changes
+STOCK_REPORT_METHODS = ("getStockByBranch", "getStockByCategory", "getStockByPublisher", "getLowStock")
+
+
+def page_key(arg_key, after=None, before=None, limit=None):
+    """Cache key of one keyset page of a book list; the whole list keeps the plain argument key."""
+    if after is None and before is None and limit is None:
+        return arg_key
+    positions = tuple((book.title, book.book_code) if book is not None else None for book in (after, before))
+    return (arg_key,) + positions + (limit,)
+
+
+def index_groups(key):
+    """
+    The LRUCache index groups of a (method, argument key) cache key: its method and, for a page_key()
+    of a book list, (method, the list's argument key).
+    """
+    method, arg_key = key
+    if isinstance(arg_key, tuple) and len(arg_key) == 4:
+        return method, (method, arg_key[0])
+    return (method,)
+
+
+def approx_size(value, _seen=None):
+    """
+    Estimate the memory footprint of a cached value in bytes.
+    Walks lists, tuples, dicts and model objects (through __dict__ or __slots__); shared objects
+    are only counted once.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float)) or value is None:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += approx_size(key, _seen) + approx_size(item, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += approx_size(item, _seen)
+    else:
+        if hasattr(value, "__dict__"):
+            size += approx_size(vars(value), _seen)
+        for slot in getattr(type(value), "__slots__", ()):
+            if hasattr(value, slot):
+                size += approx_size(getattr(value, slot), _seen)
+    return size
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-entry expiry and an approximate memory bound.
+    Keys are (method name, argument key) tuples. An index maps each method, and each paged book
+    list, to its cached keys, so invalidations only touch the entries they drop.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, expires_at, size)
+        self._index = {}                # index_groups() group -> set of keys
+        self._bytes = 0
+        self._stats = {"hits": {}, "misses": {}, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key):
+        """Return (True, value) for a live entry, (False, None) on a miss or an expired entry."""
+        method = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"][method] = self._stats["misses"].get(method, 0) + 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"][method] = self._stats["hits"].get(method, 0) + 1
+            return True, entry[0]
+
+    def contains(self, key):
+        """Return True if the key has a live entry; does not count as a hit or refresh its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def peek(self, key):
+        """Like get(), but a miss is not counted (the caller is about to fall back to get())."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return False, None
+            self._entries.move_to_end(key)
+            method = key[0]
+            self._stats["hits"][method] = self._stats["hits"].get(method, 0) + 1
+            return True, entry[0]
+
+    def set(self, key, value, ttl):
+        """Store a value for `ttl` seconds, evicting least recently used entries to stay in bounds."""
+        size = approx_size(key) + approx_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            for group in index_groups(key):
+                self._index.setdefault(group, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def update(self, key, fn):
+        """
+        Replace a live entry's value with fn(value), keeping its expiry time and LRU position.
+        Returns False if the key is not cached (or has expired); nothing is stored in that case.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return False
+            value = fn(entry[0])
+            size = approx_size(key) + approx_size(value)
+            self._entries[key] = (value, entry[1], size)
+            self._bytes += size - entry[2]
+            return True
+
+    def invalidate(self, method=None, arg_key=None):
+        """
+        Drop cached entries. With no arguments everything is dropped; with a method name only that
+        method's entries; with a method name and an argument key only the entry for that argument and,
+        for book lists, every cached page of it.
+        """
+        with self._lock:
+            if method is None:
+                keys = list(self._entries)
+            elif arg_key is None:
+                keys = list(self._index.get(method, ()))
+            else:
+                keys = list(self._index.get((method, arg_key), ()))
+                if (method, arg_key) in self._entries:
+                    keys.append((method, arg_key))
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def stats(self):
+        """Return hit/miss counters (total and per method) and the current size of the cache."""
+        with self._lock:
+            hits = dict(self._stats["hits"])
+            misses = dict(self._stats["misses"])
+            total_hits, total_misses = sum(hits.values()), sum(misses.values())
+            lookups = total_hits + total_misses
+            return {
+                "hits": total_hits,
+                "misses": total_misses,
+                "hit_rate": total_hits / lookups if lookups else 0.0,
+                "hits_by_method": hits,
+                "misses_by_method": misses,
+                "evictions": self._stats["evictions"],
+                "expirations": self._stats["expirations"],
+                "invalidations": self._stats["invalidations"],
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        for group in index_groups(key):
+            keys = self._index[group]
+            keys.discard(key)
+            if not keys:
+                del self._index[group]
+
+
+# In[2]:
+
+
+class CachedHenryDAO:
+    """
+    Read-through caching wrapper around a HenryDAO.
+    Each public DAO method is looked up in an LRUCache first and only forwarded to the wrapped DAO
+    on a miss. Model arguments are keyed by their primary key (author_num, type_, publisher_code)
+    so equal selections share a cache entry. Cached lists and objects are shared between callers
+    and must be treated as read-only. Any attribute not defined here (close_connection, pool_stats,
+    ...) is forwarded to the wrapped DAO unchanged.
+    """
+
+    def __init__(self, dao, ttls=None, max_entries=10000, max_bytes=32 * 1024 * 1024):
+        self.dao = dao
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    def __getattr__(self, name):
+        return getattr(self.dao, name)
+
+    def _cached(self, method, arg_key, loader):
+        hit, value = self.cache.get((method, arg_key))
+        if hit:
+            return value
+        value = loader()
+        # Do not pin failed lookups (the DAO returns None or an empty result on database errors)
+        if value not in (None, [], {}):
+            self.cache.set((method, arg_key), value, self.ttls[method])
+        return value
+
+    def getAllAuthors(self):
+        return self._cached("getAllAuthors", None, self.dao.getAllAuthors)
+
+    def getAllCategories(self):
+        return self._cached("getAllCategories", None, self.dao.getAllCategories)
+
+    def getAllPublishers(self):
+        return self._cached("getAllPublishers", None, self.dao.getAllPublishers)
+
+    def getBooksByAuthor(self, author, after=None, before=None, limit=None):
+        return self._cached("getBooksByAuthor", page_key(author.author_num, after, before, limit),
+                            lambda: self.dao.getBooksByAuthor(author, after, before, limit))
+
+    def getBooksByCategory(self, category, after=None, before=None, limit=None):
+        return self._cached("getBooksByCategory", page_key(category.type_, after, before, limit),
+                            lambda: self.dao.getBooksByCategory(category, after, before, limit))
+
+    def getBooksByPublisher(self, publisher, after=None, before=None, limit=None):
+        return self._cached("getBooksByPublisher", page_key(publisher.publisher_code, after, before, limit),
+                            lambda: self.dao.getBooksByPublisher(publisher, after, before, limit))
+
+    def getBookPrice(self, book_code):
+        return self._cached("getBookPrice", book_code, lambda: self.dao.getBookPrice(book_code))
+
+    def getBookAvailability(self, book_code):
+        return self._cached("getBookAvailability", book_code,
+                            lambda: self.dao.getBookAvailability(book_code))
+
+    def getBookDetails(self, book_code):
+        return self._cached("getBookDetails", book_code, lambda: self.dao.getBookDetails(book_code))
+
+    def getStockByBranch(self, category=None, publisher=None):
+        arg_key = (category.type_ if category is not None else None,
+                   publisher.publisher_code if publisher is not None else None)
+        return self._cached("getStockByBranch", arg_key, lambda: self.dao.getStockByBranch(category, publisher))
+
+    def getStockByCategory(self):
+        return self._cached("getStockByCategory", None, self.dao.getStockByCategory)
+
+    def getStockByPublisher(self):
+        return self._cached("getStockByPublisher", None, self.dao.getStockByPublisher)
+
+    def getPriceByCategory(self):
+        return self._cached("getPriceByCategory", None, self.dao.getPriceByCategory)
+
+    def getPriceByPublisher(self):
+        return self._cached("getPriceByPublisher", None, self.dao.getPriceByPublisher)
+
+    def getLowStock(self, threshold=2, limit=100):
+        return self._cached("getLowStock", (threshold, limit), lambda: self.dao.getLowStock(threshold, limit))
+
+    def refreshStockSummary(self, full=False):
+        """Refresh the summary table and drop the cached stock reports computed from the old one."""
+        result = self.dao.refreshStockSummary(full)
+        self.invalidate_stock_reports()
+        return result
+
+    def getBookDetailsBatch(self, book_codes):
+        """Serve cached details per book and fetch only the missing codes in one batched query."""
+        results, missing = {}, []
+        for book_code in dict.fromkeys(book_codes):
+            hit, detail = self.cache.get(("getBookDetails", book_code))
+            if hit:
+                results[book_code] = detail
+            else:
+                missing.append(book_code)
+        if missing:
+            fetched = self.dao.getBookDetailsBatch(missing)
+            for book_code, detail in fetched.items():
+                self.cache.set(("getBookDetails", book_code), detail, self.ttls["getBookDetails"])
+            results.update(fetched)
+        return results
+
+    def peek_book_details(self, book_code):
+        """
+        Return the cached BookDetail of a book, or None if it is not cached; never queries the
+        database, so the GUI can call it on the main thread before falling back to getBookDetails.
+        """
+        hit, detail = self.cache.peek(("getBookDetails", book_code))
+        return detail if hit else None
+
+    def prefetch_book_details(self, book_codes):
+        """
+        Load the details of the given books that are not cached yet with one getBookDetailsBatch
+        query and cache them. Returns the list of book codes that were loaded.
+        """
+        missing = [code for code in dict.fromkeys(book_codes) if not self.cache.contains(("getBookDetails", code))]
+        if not missing:
+            return []
+        fetched = self.dao.getBookDetailsBatch(missing)
+        for book_code, detail in fetched.items():
+            self.cache.set(("getBookDetails", book_code), detail, self.ttls["getBookDetails"])
+        return list(fetched)
+
+    # Invalidation hooks
+
+    def invalidate(self, method=None, arg_key=None):
+        """Drop cached results; see LRUCache.invalidate for the meaning of the arguments."""
+        return self.cache.invalidate(method, arg_key)
+
+    def invalidate_inventory(self, book_code=None):
+        """Drop cached on-hand counts, for one book or for all books."""
+        return sum(self.cache.invalidate(method, book_code) for method in INVENTORY_METHODS)
+
+    def apply_inventory_changes(self, changes):
+        """
+        Patch the cached availability dicts and BookDetail objects with InventoryChange entries.
+        Cached values are shared with callers, so changed books get new copies instead of being
+        modified. A change whose branch is unknown drops the book's inventory entries instead.
+        Returns the number of cache entries updated.
+        """
+        if changes:
+            self.invalidate_stock_reports()
+        by_book = {}
+        for change in changes:
+            by_book.setdefault(change.book_code, []).append(change)
+        updated = 0
+        for book_code, book_changes in by_book.items():
+            if any(change.branch_name is None for change in book_changes):
+                self.invalidate_inventory(book_code)
+                continue
+
+            def patched(availability):
+                availability = dict(availability)
+                for change in book_changes:
+                    if change.on_hand is None:
+                        availability.pop(change.branch_name, None)
+                    else:
+                        availability[change.branch_name] = change.on_hand
+                return availability
+
+            def patched_detail(detail):
+                return BookDetail(detail.book_code, detail.title, detail.price, detail.publisher,
+                                  detail.authors, patched(detail.availability))
+
+            updated += self.cache.update(("getBookAvailability", book_code), patched)
+            updated += self.cache.update(("getBookDetails", book_code), patched_detail)
+        return updated
+
+    def invalidate_stock_reports(self):
+        """Drop cached stock reports (totals and low-stock lists)."""
+        return sum(self.cache.invalidate(method) for method in STOCK_REPORT_METHODS)
+
+    def invalidate_catalog(self):
+        """Drop everything, e.g. after authors, books or publishers were edited."""
+        return self.cache.invalidate()
+
+    def cache_stats(self):
+        """Return the cache hit/miss counters."""
+        return self.cache.stats()
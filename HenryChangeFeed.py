@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryChangeFeed.py, follows the HENRY_INVENTORY change log for the Henry Bookstore application.
+HENRY_INVENTORY.ON_HAND is the only data that changes often. Migration 002 adds triggers that log
+every insert, update and delete of an inventory row to HENRY_INVENTORY_CHANGE under an increasing
+CHANGE_ID. InventoryChangeFeed remembers the last CHANGE_ID it has seen (its watermark) and each
+poll() reads only the rows logged after it, so a poll on an idle store costs one indexed range scan
+that returns nothing. The changes are pushed into the DAO wrapper (CachedHenryDAO or
+SnapshotHenryDAO) and returned to the caller, which patches the (book_code, branch) rows that are
+on screen instead of re-querying whole books.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger("henry.changefeed")
+
+
+class InventoryChangeFeed:
+    """
+    Incremental reader of the HENRY_INVENTORY_CHANGE log.
+    The watermark starts at the newest change when the feed is created, so only changes made
+    afterwards are reported. If it cannot be read then (the database is unreachable), poll() keeps
+    trying and the feed starts from the newest change at that time. Only when the log does not exist
+    (a database without migration 002) is the feed disabled, and poll() always returns an empty list.
+    Change ids are assigned when a row is inserted, not when its transaction commits, so a change
+    committed late behind a higher id is missed; the cache TTLs and snapshot refreshes still bound
+    how long such a count stays stale.
+    """
+
+    def __init__(self, dao, batch_size=1000):
+        self.dao = dao
+        self.batch_size = batch_size
+        self._lock = threading.Lock()   # poll() may run on any executor worker
+        self.watermark = None
+        self.missing = False            # True once the change log is known not to exist
+        self.stats = {"polls": 0, "changes": 0}
+        self._read_watermark()
+        if self.watermark is None and not self.missing:
+            logger.warning("Inventory change log could not be read; the change feed will retry on every poll")
+
+    def _read_watermark(self):
+        self.watermark = self.dao.getInventoryWatermark()
+        if self.watermark is not None:
+            logger.debug("Inventory change feed starts after change id %d", self.watermark)
+        elif self.dao.hasInventoryChangeLog() is False:
+            self.missing = True
+            logger.warning("Inventory change log is not available; on-hand counts are refreshed by expiry only")
+
+    @property
+    def enabled(self):
+        return not self.missing
+
+    def poll(self):
+        """
+        Read every change logged since the last poll, apply it to the DAO's cached data and return
+        the list of InventoryChange objects, oldest first.
+        """
+        if not self.enabled:
+            return []
+        with self._lock:
+            if self.watermark is None:
+                # Changes made before the watermark could be read are left to the cache TTLs
+                self._read_watermark()
+                if self.watermark is None:
+                    return []
+            changes = []
+            while True:
+                batch = self.dao.getInventoryChanges(self.watermark, self.batch_size)
+                if not batch:
+                    break
+                changes.extend(batch)
+                self.watermark = batch[-1].change_id
+                if len(batch) < self.batch_size:
+                    break
+            self.stats["polls"] += 1
+            self.stats["changes"] += len(changes)
+            # Applied under the lock so overlapping polls cannot apply their changes out of order
+            if changes:
+                logger.debug("Inventory change feed: %d changes up to id %d", len(changes), self.watermark)
+                apply = getattr(self.dao, "apply_inventory_changes", None)
+                if apply is not None:
+                    apply(changes)
+        return changes
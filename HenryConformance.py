@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryConformance.py, checks that Henry storage backends behave identically.
+Every backend created by HenryBackends.create_dao() is run through the same set of checks on the
+HenryDAOInterface methods (types, ordering, agreement between the single, batched and detail
+lookups, handling of unknown keys, the shared-title books from Henry.sql), and when more than one
+backend is checked their complete catalogs are compared with each other after normalizing driver
+differences such as Decimal versus float prices.
+
+    python HenryConformance.py                      # every registered backend
+    python HenryConformance.py --backend sqlite     # only the embedded backend
+"""
+
+import argparse
+import sys
+from decimal import Decimal
+
+from HenryBackends import BACKENDS, create_dao, load_config
+from HenryDAOInterface import HenryDAOInterface
+from HenryInterfaceClasses import Author, Book, BookDetail, Category, Publisher
+
+
+class ConformanceFailure(AssertionError):
+    pass
+
+
+def check(condition, message):
+    if not condition:
+        raise ConformanceFailure(message)
+
+
+def normalize(value):
+    """Normalize driver-specific values (Decimal/float/int, CHAR padding) so backends can be compared."""
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    if isinstance(value, str):
+        return value.rstrip()
+    return value
+
+
+def catalog_dump(dao):
+    """Return a backend-independent, comparable dump of everything the DAO interface exposes."""
+    books = {}
+    for lister, items in ((dao.getBooksByAuthor, dao.getAllAuthors()),
+                          (dao.getBooksByCategory, dao.getAllCategories()),
+                          (dao.getBooksByPublisher, dao.getAllPublishers())):
+        for item in items:
+            for book in lister(item):
+                books[book.book_code] = book
+    details = dao.getBookDetailsBatch(sorted(books))
+    return {
+        "authors": sorted((normalize(a.author_num), normalize(a.author_last), normalize(a.author_first))
+                          for a in dao.getAllAuthors()),
+        "categories": sorted(normalize(c.type_) for c in dao.getAllCategories()),
+        "publishers": sorted((normalize(p.publisher_code), normalize(p.publisher_name), normalize(p.city))
+                             for p in dao.getAllPublishers()),
+        "books": {
+            code: (normalize(detail.title), normalize(detail.price),
+                   normalize(detail.publisher.publisher_code) if detail.publisher else None,
+                   [normalize(a.author_num) for a in detail.authors],
+                   {normalize(branch): normalize(on_hand) for branch, on_hand in detail.availability.items()})
+            for code, detail in details.items()
+        },
+    }
+
+
+# In[2]:
+
+
+def check_interface(dao):
+    check(isinstance(dao, HenryDAOInterface), f"{type(dao).__name__} does not implement HenryDAOInterface")
+
+
+def check_authors(dao):
+    authors = dao.getAllAuthors()
+    check(authors and all(isinstance(a, Author) for a in authors), "getAllAuthors must return Author objects")
+    check(len({a.author_num for a in authors}) == len(authors), "getAllAuthors returned duplicate authors")
+    for author in authors:
+        books = dao.getBooksByAuthor(author)
+        check(books and all(isinstance(b, Book) for b in books), f"author {author.author_num} has no Book objects")
+        check([(b.title, b.book_code) for b in books] == sorted((b.title, b.book_code) for b in books),
+              f"getBooksByAuthor({author.author_num}) is not ordered by title")
+        for book in books:
+            detail = dao.getBookDetails(book.book_code)
+            check(any(a.author_num == author.author_num for a in detail.authors),
+                  f"details of {book.book_code} do not list author {author.author_num}")
+
+
+def check_categories_and_publishers(dao):
+    categories = dao.getAllCategories()
+    check(categories and all(isinstance(c, Category) for c in categories), "getAllCategories must return Category objects")
+    check(len({c.type_ for c in categories}) == len(categories), "getAllCategories returned duplicates")
+    for category in categories:
+        books = dao.getBooksByCategory(category)
+        check(books, f"category {category.type_} has no books")
+        check([(b.title, b.book_code) for b in books] == sorted((b.title, b.book_code) for b in books),
+              f"getBooksByCategory({category.type_}) is not ordered by title")
+    publishers = dao.getAllPublishers()
+    check(publishers and all(isinstance(p, Publisher) for p in publishers), "getAllPublishers must return Publisher objects")
+    for publisher in publishers:
+        books = dao.getBooksByPublisher(publisher)
+        check(books, f"publisher {publisher.publisher_code} has no books")
+        for detail in dao.getBookDetailsBatch([b.book_code for b in books]).values():
+            check(detail.publisher.publisher_code == publisher.publisher_code,
+                  f"{detail.book_code} is listed under the wrong publisher")
+
+
+def check_book_lookups(dao):
+    codes = sorted({b.book_code for c in dao.getAllCategories() for b in dao.getBooksByCategory(c)})
+    books = dao.getAllBooks()
+    check(books is not None and all(isinstance(b, Book) for b in books), "getAllBooks must return Book objects")
+    check(set(codes) <= {b.book_code for b in books or []}, "getAllBooks must list every categorized book")
+    batch = dao.getBookDetailsBatch(codes)
+    check(sorted(batch) == codes, "getBookDetailsBatch did not return every requested book")
+    for code in codes:
+        detail = dao.getBookDetails(code)
+        check(isinstance(detail, BookDetail), f"getBookDetails({code}) must return a BookDetail")
+        check(normalize(dao.getBookPrice(code)) == normalize(detail.price), f"price of {code} differs from its details")
+        check(dao.getBookAvailability(code) == detail.availability, f"availability of {code} differs from its details")
+        check(batch[code].availability == detail.availability and normalize(batch[code].price) == normalize(detail.price),
+              f"batched details of {code} differ from the single lookup")
+
+
+def check_unknown_keys(dao):
+    check(dao.getBookDetails("????") is None, "unknown book codes must give no details")
+    check(dao.getBookPrice("????") is None, "unknown book codes must give no price")
+    check(dao.getBookAvailability("????") == {}, "unknown book codes must give no availability")
+    check(dao.getBookDetailsBatch([]) == {}, "an empty batch must give an empty result")
+
+
+def check_shared_titles(dao):
+    # Henry.sql has two different editions titled 'A Guide to SQL' (669X and 6800)
+    first, second = dao.getBookDetails("669X"), dao.getBookDetails("6800")
+    if first is None or second is None:
+        return
+    check(first.title == second.title, "sample data changed: 669X and 6800 should share a title")
+    check(normalize(first.price) != normalize(second.price), "books sharing a title must keep their own price")
+
+
+def check_raw_rows(dao):
+    rows = dao.fetchRows("SELECT COUNT(*) FROM HENRY_BOOK WHERE PRICE > %s", (0,))
+    check(rows is not None and len(rows) == 1, "fetchRows must return row tuples")
+    streamed = list(dao.iterRows("SELECT BOOK_CODE FROM HENRY_BOOK ORDER BY BOOK_CODE", batch_size=3))
+    fetched = dao.fetchRows("SELECT BOOK_CODE FROM HENRY_BOOK ORDER BY BOOK_CODE")
+    check([tuple(row) for row in streamed] == [tuple(row) for row in fetched or []],
+          "iterRows must stream the same rows as fetchRows")
+
+
+def check_pagination(dao):
+    # Walking a book list forwards and backwards in small keyset pages must reproduce the whole list
+    for category in dao.getAllCategories():
+        books = [book.book_code for book in dao.getBooksByCategory(category)]
+        forward, page = [], dao.getBooksByCategory(category, limit=2)
+        while page:
+            forward += [book.book_code for book in page]
+            page = dao.getBooksByCategory(category, after=page[-1], limit=2)
+        check(forward == books, f"paging forward through category {category.type_} differs from the full list")
+        if not books:
+            continue
+        last = dao.getBooksByCategory(category)[-1]
+        backward, page = [last.book_code], dao.getBooksByCategory(category, before=last, limit=2)
+        while page:
+            backward = [book.book_code for book in page] + backward
+            page = dao.getBooksByCategory(category, before=page[0], limit=2)
+        check(backward == books, f"paging backward through category {category.type_} differs from the full list")
+
+
+def check_inventory_feed(dao):
+    # The change log must exist (migration 002) and nothing may be reported past its newest entry
+    check(dao.hasInventoryChangeLog() is True, "hasInventoryChangeLog does not find the change log")
+    watermark = dao.getInventoryWatermark()
+    check(isinstance(watermark, int), f"getInventoryWatermark returned {watermark!r}")
+    check(dao.getInventoryChanges(watermark) == [], "getInventoryChanges reports changes past the watermark")
+
+
+def check_reports(dao):
+    # Every stock report adds up to the same inventory, and the price report covers every categorized book
+    check(dao.refreshStockSummary() is not None, "refreshStockSummary failed")
+    inventory = dao.fetchRows("SELECT COUNT(*), SUM(ON_HAND) FROM HENRY_INVENTORY")[0]
+    expected = (int(inventory[0]), int(inventory[1] or 0))
+    for name in ("getStockByBranch", "getStockByCategory", "getStockByPublisher"):
+        totals = getattr(dao, name)()
+        actual = (sum(int(total.titles) for total in totals), sum(int(total.on_hand) for total in totals))
+        check(actual == expected, f"{name} totals {actual} differ from HENRY_INVENTORY {expected}")
+    books = dao.fetchRows("SELECT COUNT(*) FROM HENRY_BOOK WHERE TYPE IS NOT NULL")[0][0]
+    check(sum(stats.titles for stats in dao.getPriceByCategory()) == books,
+          "getPriceByCategory does not cover every book")
+    low = dao.getLowStock(threshold=2, limit=1000)
+    check(all(item.on_hand <= 2 for item in low), "getLowStock returned rows above the threshold")
+    check([item.on_hand for item in low] == sorted(item.on_hand for item in low), "getLowStock is not sorted")
+
+
+def check_basket_stock(dao):
+    # The branch x book matrix must hold the same counts as the per-book availability lookups
+    codes = [b.book_code for c in dao.getAllCategories() for b in dao.getBooksByCategory(c, limit=20)] + ["????"]
+    matrix = dao.getBasketStock(codes)
+    expected = {}
+    for code in codes:
+        for branch, on_hand in dao.getBookAvailability(code).items():
+            expected.setdefault(branch, {})[code] = on_hand
+    check(matrix == expected, "getBasketStock differs from getBookAvailability")
+    check(dao.getBasketStock([]) == {}, "an empty basket must give an empty matrix")
+
+
+CHECKS = [check_interface, check_authors, check_categories_and_publishers, check_book_lookups,
+          check_unknown_keys, check_shared_titles, check_raw_rows, check_pagination, check_inventory_feed,
+          check_reports, check_basket_stock]
+
+
+def run_checks(dao):
+    """Run every check against one DAO; returns a list of (check name, failure message)."""
+    failures = []
+    for conformance_check in CHECKS:
+        try:
+            conformance_check(dao)
+        except ConformanceFailure as failure:
+            failures.append((conformance_check.__name__, str(failure)))
+    return failures
+
+
+# In[3]:
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that Henry storage backends behave identically")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS),
+                        help="backend to check (repeatable, default: all registered backends)")
+    parser.add_argument("--config", help="configuration file (default: henry.ini)")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    failed = False
+    dumps = {}
+    for name in args.backend or sorted(BACKENDS):
+        try:
+            dao = create_dao(config, backend=name)
+        except Exception as err:
+            print(f"[{name}] FAILED: could not create backend: {err}")
+            failed = True
+            continue
+        try:
+            failures = run_checks(dao)
+            dumps[name] = catalog_dump(dao)
+        finally:
+            dao.close_connection()
+        for check_name, message in failures:
+            print(f"[{name}] FAILED {check_name}: {message}")
+        print(f"[{name}] {len(CHECKS) - len(failures)}/{len(CHECKS)} checks passed")
+        failed = failed or bool(failures)
+
+    names = sorted(dumps)
+    for other in names[1:]:
+        if dumps[other] != dumps[names[0]]:
+            differing = [key for key in dumps[other] if dumps[other][key] != dumps[names[0]][key]]
+            print(f"FAILED: {names[0]} and {other} disagree on {', '.join(differing)}")
+            failed = True
+        else:
+            print(f"{names[0]} and {other} return identical catalogs")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
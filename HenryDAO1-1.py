@@ -11,171 +11,888 @@ books, publishers, etc., and is used by the main application script (which inclu
 display this data to the user. The script uses the mysql.connector library to establish and manage database connections.
 """
 
-import mysql.connector
-from HenryInterfaceClasses import Author, Book, Branch, Category, Publisher
-class HenryDAO:
+import itertools
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import mysql.connector
+except ImportError:  # Only needed by the MySQL backend; the SQLite backend runs without it
+    mysql = None
+from HenryDAOInterface import HenryDAOInterface
+from HenryInterfaceClasses import (Author, Book, BookDetail, Branch, Category, InventoryChange, LowStockItem,
+                                   PriceStats, Publisher, StockTotal)
+from HenryMetrics import REGISTRY
+
+logger = logging.getLogger("henry.dao")
+slow_query_logger = logging.getLogger("henry.dao.slow")
+
+IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")   # Table and column names accepted by upsertRows
+
+
+class PoolError(Exception):
+    """Raised when no connection can be checked out of a HenryConnectionPool."""
+
+
+class HenryConnectionPool:
+    """
+    Bounded, thread-safe pool of database connections shared by all HenryDAO methods.
+    Idle connections are kept on a LIFO stack so the most recently used one (the one most likely
+    to still be alive) is handed out first. At most `size` connections are ever open; callers that
+    find the pool exhausted wait up to `checkout_timeout` seconds before a PoolError is raised.
+    Connections that sat idle longer than `health_check_interval` seconds are pinged before reuse
+    and transparently replaced if the server dropped them.
+    """
+
+    def __init__(self, connect, size=5, checkout_timeout=10.0, health_check_interval=30.0,
+                 is_healthy=None):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._connect = connect
+        self._is_healthy = is_healthy or (lambda conn: conn.is_connected())
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._cond = threading.Condition()
+        self._idle = []       # stack of (connection, last_released_at)
+        self._open = 0        # connections currently open, idle or checked out
+        self._closed = False
+        self._stats = {"checkouts": 0, "waits": 0, "timeouts": 0,
+                       "connects": 0, "reconnects": 0, "discarded": 0}
+
+    def acquire(self):
+        """
+        Check a connection out of the pool, opening a new one if the pool is below its size.
+        Blocks for up to `checkout_timeout` seconds when every connection is in use.
         """
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    # Reserve the slot now, open the connection outside the lock
+                    self._open += 1
+                    conn, released_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolError(f"No connection available within {self.checkout_timeout}s "
+                                    f"(pool size {self.size})")
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                self._cond.wait(remaining)
+            self._stats["checkouts"] += 1
+
+        try:
+            if conn is None:
+                conn = self._connect()
+                self._count("connects")
+            elif time.monotonic() - released_at > self.health_check_interval and not self._healthy(conn):
+                self._close_quietly(conn)
+                conn = self._connect()
+                self._count("reconnects")
+        except Exception:
+            # Give the reserved slot back so a failed connect does not shrink the pool
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, healthy=True):
+        """Return a connection to the pool; broken connections are closed and their slot freed."""
+        with self._cond:
+            if self._closed or not healthy:
+                self._open -= 1
+                if not self._closed:
+                    self._stats["discarded"] += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager wrapping acquire()/release(); a connection that errored is health checked."""
+        conn = self.acquire()
+        healthy = True
+        try:
+            yield conn
+        except Exception:
+            healthy = self._healthy(conn)
+            raise
+        finally:
+            self.release(conn, healthy)
+
+    def close(self):
+        """Close every idle connection; connections still checked out are closed on release."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._open -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return a snapshot of the pool counters together with its current occupancy."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self.size, open=self._open, idle=len(self._idle),
+                         in_use=self._open - len(self._idle))
+        return stats
+
+    def _healthy(self, conn):
+        try:
+            return bool(self._is_healthy(conn))
+        except Exception:
+            return False
+
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+
+
+class HenryDAO(HenryDAOInterface):
+    """
     HenryDAO class for handling all database interactions.
     This class encapsulates all SQL queries and provides methods for the main application
     to retrieve and manipulate data without needing to directly handle SQL statements.
+    Connections are borrowed from a HenryConnectionPool for the duration of a single query,
+    so repeated GUI selections reuse already authenticated connections.
+    HenryDAO talks to MySQL through mysql.connector. Other backends (see HenrySQLiteDAO.py)
+    subclass it and only replace the driver hooks: _create_connection, _is_healthy, _begin,
+    _upsert_query, Error and paramstyle. All queries are written once, with %s placeholders.
+    The fixed queries of the DAO methods are registered in QUERIES and run as server-side prepared
+    statements: each pooled connection keeps a small LRU of prepared cursors keyed by SQL text, so
+    MySQL parses and plans every query once per connection instead of once per call.
     """
 
-    def __init__(self):
+    paramstyle = "format"   # Placeholder style of the driver: "format" (%s) or "qmark" (?)
+    prepared_statements = True   # Run registered queries as prepared statements cached per connection
+    statement_cache_size = 32    # Prepared statements kept per connection (IN lists and pages add variants)
+    slow_query_threshold = 0.5   # Seconds after which a query is written to the slow-query log
+    query_log_level = logging.DEBUG   # Level of the one-line timing summary logged for every query
+    metrics = REGISTRY
+
+    # Shared SELECT for getBookDetails/getBookDetailsBatch: one row per (author, branch) pair of a book,
+    # folded back into BookDetail objects by _fold_book_details.
+    BOOK_DETAIL_QUERY = """SELECT BK.BOOK_CODE, BK.TITLE, BK.PRICE,
+                                  P.PUBLISHER_CODE, P.PUBLISHER_NAME, P.CITY,
+                                  A.AUTHOR_NUM, A.AUTHOR_LAST, A.AUTHOR_FIRST,
+                                  B.BRANCH_NAME, I.ON_HAND
+                           FROM HENRY_BOOK BK
+                           LEFT JOIN HENRY_PUBLISHER P ON P.PUBLISHER_CODE = BK.PUBLISHER_CODE
+                           LEFT JOIN HENRY_WROTE W ON W.BOOK_CODE = BK.BOOK_CODE
+                           LEFT JOIN HENRY_AUTHOR A ON A.AUTHOR_NUM = W.AUTHOR_NUM
+                           LEFT JOIN HENRY_INVENTORY I ON I.BOOK_CODE = BK.BOOK_CODE
+                           LEFT JOIN HENRY_BRANCH B ON B.BRANCH_NUM = I.BRANCH_NUM
+                           WHERE {where}
+                           ORDER BY BK.BOOK_CODE, W.SEQUENCE, B.BRANCH_NUM"""
+
+    # Registry of the fixed queries behind the DAO methods (keyed by method name). These are the
+    # statements that get prepared; book lists add a keyset/ORDER BY/LIMIT suffix in _book_page.
+    QUERIES = {
+        "getAllAuthors": "SELECT HA.author_num, HA.author_last, HA.author_first FROM henry_author AS HA JOIN henry_wrote AS HW ON HA.author_num = HW.author_num GROUP BY HA.author_num, HA.author_last, HA.author_first",
+        "getAllCategories": "SELECT DISTINCT TYPE FROM henry_book",
+        "getAllBooks": "SELECT BOOK_CODE, TITLE, PRICE FROM HENRY_BOOK",
+        "getAllPublishers": "SELECT p.PUBLISHER_CODE, p.PUBLISHER_NAME, p.CITY FROM HENRY_PUBLISHER AS p JOIN HENRY_BOOK AS b ON p.PUBLISHER_CODE = b.PUBLISHER_CODE GROUP BY p.PUBLISHER_CODE, p.PUBLISHER_NAME, p.CITY",
+        "getBooksByAuthor": """SELECT bk.book_code, bk.title, bk.price from henry_book as bk 
+                               join henry_wrote as hw on bk.book_code=hw.book_code
+                               where hw.author_num=%s""",
+        "getBooksByCategory": "SELECT bk.book_code, bk.title, bk.price FROM henry_book AS bk WHERE bk.type = %s",
+        "getBooksByPublisher": "SELECT bk.book_code, bk.title, bk.price FROM henry_book AS bk WHERE bk.publisher_code = %s",
+        "getBookAvailability": """SELECT B.BRANCH_NAME, I.ON_HAND FROM HENRY_BRANCH B 
+                                  JOIN HENRY_INVENTORY I ON B.BRANCH_NUM = I.BRANCH_NUM
+                                  WHERE I.BOOK_CODE = %s
+                                  ORDER BY B.BRANCH_NUM""",
+        "getBookPrice": "SELECT price FROM henry_book WHERE book_code = %s",
+        "getBookDetails": BOOK_DETAIL_QUERY.format(where="BK.BOOK_CODE = %s"),
+        "getInventoryWatermark": "SELECT COALESCE(MAX(CHANGE_ID), 0) FROM HENRY_INVENTORY_CHANGE",
+        "getInventoryChanges": """SELECT C.CHANGE_ID, C.BOOK_CODE, C.BRANCH_NUM, B.BRANCH_NAME, C.ON_HAND
+                                  FROM HENRY_INVENTORY_CHANGE C
+                                  LEFT JOIN HENRY_BRANCH B ON B.BRANCH_NUM = C.BRANCH_NUM
+                                  WHERE C.CHANGE_ID > %s
+                                  ORDER BY C.CHANGE_ID
+                                  LIMIT %s""",
+        # Reports: stock figures come from HENRY_STOCK_SUMMARY (migration 003), prices from HENRY_BOOK
+        "getStockByBranch": """SELECT B.BRANCH_NAME, SUM(S.TITLES), SUM(S.ON_HAND), SUM(S.STOCK_VALUE)
+                               FROM HENRY_BRANCH B
+                               JOIN HENRY_STOCK_SUMMARY S ON S.BRANCH_NUM = B.BRANCH_NUM
+                               WHERE S.DIMENSION = %s""",
+        "getStockByCategory": """SELECT S.GROUP_KEY, SUM(S.TITLES), SUM(S.ON_HAND), SUM(S.STOCK_VALUE)
+                                 FROM HENRY_STOCK_SUMMARY S
+                                 WHERE S.DIMENSION = 'TYPE'
+                                 GROUP BY S.GROUP_KEY
+                                 ORDER BY S.GROUP_KEY""",
+        "getStockByPublisher": """SELECT P.PUBLISHER_NAME, SUM(S.TITLES), SUM(S.ON_HAND), SUM(S.STOCK_VALUE)
+                                  FROM HENRY_STOCK_SUMMARY S
+                                  JOIN HENRY_PUBLISHER P ON P.PUBLISHER_CODE = S.GROUP_KEY
+                                  WHERE S.DIMENSION = 'PUBLISHER'
+                                  GROUP BY P.PUBLISHER_CODE, P.PUBLISHER_NAME
+                                  ORDER BY P.PUBLISHER_NAME""",
+        "getPriceByCategory": """SELECT TYPE, COUNT(*), AVG(PRICE), MIN(PRICE), MAX(PRICE) FROM HENRY_BOOK
+                                 WHERE TYPE IS NOT NULL
+                                 GROUP BY TYPE
+                                 ORDER BY TYPE""",
+        "getPriceByPublisher": """SELECT P.PUBLISHER_NAME, COUNT(*), AVG(BK.PRICE), MIN(BK.PRICE), MAX(BK.PRICE)
+                                  FROM HENRY_BOOK BK
+                                  JOIN HENRY_PUBLISHER P ON P.PUBLISHER_CODE = BK.PUBLISHER_CODE
+                                  GROUP BY P.PUBLISHER_CODE, P.PUBLISHER_NAME
+                                  ORDER BY P.PUBLISHER_NAME""",
+        "getLowStock": """SELECT I.BOOK_CODE, BK.TITLE, B.BRANCH_NAME, I.ON_HAND
+                          FROM HENRY_INVENTORY I
+                          JOIN HENRY_BOOK BK ON BK.BOOK_CODE = I.BOOK_CODE
+                          JOIN HENRY_BRANCH B ON B.BRANCH_NUM = I.BRANCH_NUM
+                          WHERE I.ON_HAND <= %s
+                          ORDER BY I.ON_HAND, BK.TITLE, B.BRANCH_NUM
+                          LIMIT %s""",
+    }
+
+    # On-hand counts of a basket of books at every branch stocking any of them; {codes} is an IN list
+    BASKET_STOCK_QUERY = """SELECT I.BRANCH_NUM, B.BRANCH_NAME, I.BOOK_CODE, I.ON_HAND
+                            FROM HENRY_INVENTORY I
+                            JOIN HENRY_BRANCH B ON B.BRANCH_NUM = I.BRANCH_NUM
+                            WHERE I.BOOK_CODE IN ({codes})
+                            ORDER BY B.BRANCH_NUM, I.BOOK_CODE"""
+    # Book codes per basket query
+    BASKET_CHUNK = 512
+
+    # Number of tables with the given name in the connected database
+    TABLE_EXISTS_QUERY = """SELECT COUNT(*) FROM information_schema.TABLES
+                            WHERE TABLE_SCHEMA = DATABASE() AND UPPER(TABLE_NAME) = %s"""
+
+    # HENRY_STOCK_SUMMARY dimensions and the HENRY_BOOK column each one groups by
+    STOCK_SUMMARY_DIMENSIONS = {"TYPE": "TYPE", "PUBLISHER": "PUBLISHER_CODE"}
+    # Incremental refreshes over more changes than this rebuild the whole summary instead
+    STOCK_SUMMARY_FULL_REFRESH_CHANGES = 50000
+    # Net change of every summary row touched by the inventory changes in a CHANGE_ID range
+    STOCK_SUMMARY_DELTAS = """SELECT BK.{column}, C.BRANCH_NUM,
+                                     SUM(CASE C.CHANGE_KIND WHEN 'I' THEN 1 WHEN 'D' THEN -1 ELSE 0 END),
+                                     SUM(COALESCE(C.ON_HAND, 0) - COALESCE(C.OLD_ON_HAND, 0)),
+                                     SUM((COALESCE(C.ON_HAND, 0) - COALESCE(C.OLD_ON_HAND, 0)) * BK.PRICE)
+                              FROM HENRY_INVENTORY_CHANGE C
+                              JOIN HENRY_BOOK BK ON BK.BOOK_CODE = C.BOOK_CODE
+                              WHERE C.CHANGE_ID > %s AND C.CHANGE_ID <= %s AND BK.{column} IS NOT NULL
+                              GROUP BY BK.{column}, C.BRANCH_NUM"""
+    # Full rebuild of one dimension
+    STOCK_SUMMARY_REBUILD = """INSERT INTO HENRY_STOCK_SUMMARY (DIMENSION, GROUP_KEY, BRANCH_NUM, TITLES, ON_HAND, STOCK_VALUE)
+                               SELECT '{dimension}', BK.{column}, I.BRANCH_NUM, COUNT(*), SUM(I.ON_HAND),
+                                      SUM(I.ON_HAND * BK.PRICE)
+                               FROM HENRY_INVENTORY I
+                               JOIN HENRY_BOOK BK ON BK.BOOK_CODE = I.BOOK_CODE
+                               WHERE BK.{column} IS NOT NULL
+                               GROUP BY BK.{column}, I.BRANCH_NUM"""
+
+
+    def __init__(self, host="localhost", user="root", *, password, database="Henry",
+                 port=3306, pool_size=5, checkout_timeout=10.0, health_check_interval=30.0,
+                 connect_eagerly=True):
         """
-        Initialize the DAO class by establishing a database connection.
+        Initialize the DAO class by creating the connection pool.
+        The password has no default; HenryBackends takes it from $HENRY_DB_PASSWORD or a local config file.
+        One connection is opened eagerly so a misconfigured database fails at startup, unless
+        connect_eagerly is False (offline-capable callers that can start without the database).
         """
-        self.conn = self._create_connection()
+        if mysql is None:
+            raise ImportError("The MySQL backend needs mysql.connector (pip install mysql-connector-python)")
+        self.connect_args = dict(host=host, user=user, password=password, database=database, port=port)
+        self.Error = (mysql.connector.Error, PoolError)
+        self._start_pool(pool_size, checkout_timeout, health_check_interval, connect_eagerly)
+
+    def _start_pool(self, pool_size, checkout_timeout, health_check_interval, connect_eagerly=True):
+        # connection -> OrderedDict of SQL text -> prepared cursor; entries go away with their connection
+        self._statements = weakref.WeakKeyDictionary()
+        self._statements_lock = threading.Lock()
+        self._pool = HenryConnectionPool(self._create_connection, size=pool_size,
+                                         checkout_timeout=checkout_timeout,
+                                         health_check_interval=health_check_interval,
+                                         is_healthy=self._is_healthy)
+        if connect_eagerly:
+            self._pool.release(self._pool.acquire())
 
     def _create_connection(self):
         """Create and return a new database connection."""
-        return mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="PinakShome12",
-            database="Henry")
+        # autocommit keeps pooled connections from pinning a stale read snapshot between queries;
+        # the C extension (when installed) converts result rows in C instead of per value in Python
+        return mysql.connector.connect(autocommit=True, use_pure=not getattr(mysql.connector, "HAVE_CEXT", False),
+                                       **self.connect_args)
+
+    def _is_healthy(self, conn):
+        """Return True if a pooled connection can still be used (pings the server)."""
+        return conn.is_connected()
+
+    def _begin(self, conn):
+        """Start a transaction on a pooled (autocommit) connection."""
+        conn.start_transaction()
+
+    def _upsert_query(self, table, columns, key_columns):
+        """INSERT that updates the non-key columns of a row whose primary key already exists."""
+        values = ", ".join(f"{column} = VALUES({column})" for column in columns if column not in key_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON DUPLICATE KEY UPDATE {values or f'{key_columns[0]} = {key_columns[0]}'}")
+
+    def _sql(self, query):
+        """Translate a query written with %s placeholders to the driver's placeholder style."""
+        return query.replace("%s", "?") if self.paramstyle == "qmark" else query
+
+    def _cursor(self, conn, query, prepared):
+        """
+        Return (cursor, operation, reusable) for running `query` on `conn`.
+        Registered queries get the connection's cached prepared cursor for that SQL text, which
+        re-executes the already prepared statement; anything else gets a fresh cursor to close after use.
+        `operation` is the SQL string to pass to execute(): mysql.connector only skips re-preparing
+        when it receives the very string object it prepared, so the cached one is handed back.
+        """
+        if not (prepared and self.prepared_statements):
+            return conn.cursor(), query, False
+        with self._statements_lock:
+            statements = self._statements.get(conn)
+            if statements is None:
+                statements = self._statements[conn] = OrderedDict()
+            entry = statements.get(query)
+            if entry is not None:
+                statements.move_to_end(query)
+        if entry is not None:
+            self.metrics.counter("henry_dao_prepared_reuses_total", "Queries that reused a prepared statement").inc()
+            return entry[1], entry[0], True
+        cursor = conn.cursor(prepared=True)
+        with self._statements_lock:
+            statements[query] = (query, cursor)
+            evicted = [statements.popitem(last=False)[1] for _ in range(len(statements) - self.statement_cache_size)]
+        for _, old_cursor in evicted:
+            old_cursor.close()   # Deallocates the server-side statement
+        self.metrics.counter("henry_dao_prepared_statements_total", "Statements prepared on a connection").inc()
+        return cursor, query, True
+
+    def _forget_statements(self, conn):
+        """Drop the prepared cursors of a connection whose query failed (it may have been reset)."""
+        with self._statements_lock:
+            self._statements.pop(conn, None)
+
+    def _fetchall(self, query, params=(), name="query", prepared=False):
+        """
+        Run one query on a pooled connection and return all rows as tuples.
+        With prepared=True the query is run as a prepared statement cached on the connection
+        (used for the registered QUERIES; ad hoc SQL should not fill the statement cache).
+        Records timing, row counts, connection acquire time and errors under the DAO method `name`.
+        Database errors are logged and reported as None so callers can fall back to an empty result.
+        """
+        query = self._sql(query)
+        metrics = self.metrics
+        metrics.counter("henry_dao_queries_total", "DAO queries executed").inc(method=name)
+        started = time.perf_counter()
+        try:
+            with self._pool.connection() as conn:
+                acquired = time.perf_counter()
+                metrics.histogram("henry_dao_connection_acquire_seconds",
+                                  "Time spent checking a connection out of the pool").observe(acquired - started)
+                logger.debug("Executing %s: %s params=%r", name, query, params)
+                cursor, operation, reusable = self._cursor(conn, query, prepared)
+                try:
+                    cursor.execute(operation, params)
+                    results = cursor.fetchall()
+                except Exception:
+                    if reusable:
+                        self._forget_statements(conn)
+                    raise
+                finally:
+                    if not reusable:
+                        cursor.close()
+        except self.Error as err:
+            metrics.counter("henry_dao_query_errors_total", "DAO queries that failed").inc(method=name)
+            logger.error("%s failed after %.1f ms: %s", name, (time.perf_counter() - started) * 1000, err)
+            return None
+        self._record_query(name, query, params, len(results), started, acquired, results)
+        return results
+
+    def _record_query(self, name, query, params, row_count, started, acquired, results=None):
+        """Log and record metrics for a query that completed; result payloads are only logged at DEBUG."""
+        finished = time.perf_counter()
+        elapsed = finished - started
+        metrics = self.metrics
+        metrics.histogram("henry_dao_query_seconds", "DAO query latency including connection checkout").observe(
+            elapsed, method=name)
+        metrics.counter("henry_dao_rows_total", "Rows returned by DAO queries").inc(row_count, method=name)
+        logger.log(self.query_log_level, "%s: %d rows in %.2f ms (connection acquired in %.2f ms)",
+                   name, row_count, elapsed * 1000, (acquired - started) * 1000)
+        if results is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s returned %r", name, results)
+        if elapsed >= self.slow_query_threshold:
+            metrics.counter("henry_dao_slow_queries_total", "DAO queries slower than the threshold").inc(method=name)
+            slow_query_logger.warning("%s took %.1f ms (%d rows): %s params=%r",
+                                      name, elapsed * 1000, row_count, " ".join(query.split()), params)
+
+    def _iterrows(self, query, params=(), name="query", batch_size=1000):
+        """
+        Run one query and yield its rows, fetched from the driver `batch_size` rows at a time with fetchmany().
+        The pooled connection is held until the generator is exhausted or closed; a stream abandoned
+        half way still has unread rows on its connection, so that connection is discarded instead of reused.
+        """
+        query = self._sql(query)
+        metrics = self.metrics
+        metrics.counter("henry_dao_queries_total", "DAO queries executed").inc(method=name)
+        started = time.perf_counter()
+        conn, healthy, row_count = None, False, 0
+        try:
+            conn = self._pool.acquire()
+            acquired = time.perf_counter()
+            metrics.histogram("henry_dao_connection_acquire_seconds",
+                              "Time spent checking a connection out of the pool").observe(acquired - started)
+            logger.debug("Streaming %s: %s params=%r", name, query, params)
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                row_count += len(batch)
+                yield from batch
+            cursor.close()
+            healthy = True
+        except self.Error as err:
+            metrics.counter("henry_dao_query_errors_total", "DAO queries that failed").inc(method=name)
+            logger.error("%s failed after %d rows: %s", name, row_count, err)
+            raise
+        finally:
+            if conn is not None:
+                self._pool.release(conn, healthy)
+        self._record_query(name, query, params, row_count, started, acquired)
+
+    def _executemany(self, query, rows, name="query", batch_size=1000):
+        """
+        Run a write statement once per row, `batch_size` rows per executemany() call and transaction,
+        holding one pooled connection for the whole run. Returns the number of rows written.
+        A failing batch is rolled back and the error raised; batches committed before it stay.
+        """
+        query = self._sql(query)
+        metrics = self.metrics
+        metrics.counter("henry_dao_queries_total", "DAO queries executed").inc(method=name)
+        started = time.perf_counter()
+        written = 0
+        rows = iter(rows)
+        try:
+            with self._pool.connection() as conn:
+                acquired = time.perf_counter()
+                metrics.histogram("henry_dao_connection_acquire_seconds",
+                                  "Time spent checking a connection out of the pool").observe(acquired - started)
+                logger.debug("Executing %s in batches of %d: %s", name, batch_size, query)
+                cursor = conn.cursor()
+                try:
+                    while True:
+                        batch = list(itertools.islice(rows, batch_size))
+                        if not batch:
+                            break
+                        self._begin(conn)
+                        try:
+                            cursor.executemany(query, batch)
+                            conn.commit()
+                        except Exception:
+                            conn.rollback()
+                            raise
+                        written += len(batch)
+                finally:
+                    cursor.close()
+        except self.Error as err:
+            metrics.counter("henry_dao_query_errors_total", "DAO queries that failed").inc(method=name)
+            logger.error("%s failed after %d rows: %s", name, written, err)
+            raise
+        self._record_query(name, query, (), written, started, acquired)
+        return written
+
+    def _book_page(self, name, query, params, after=None, before=None, limit=None):
+        """
+        Run a book-list query selecting bk.book_code, bk.title, bk.price and return Book objects in
+        (title, book_code) order, optionally one keyset page at a time.
+        `after` / `before` are the last / first Book of the neighbouring page: the page continues
+        strictly after (or ends strictly before) that book's (title, book_code) position, so every
+        page is an index range seek instead of an OFFSET scan. With `before`, the `limit` books
+        closest to it are returned (still in ascending order).
+        """
+        params = list(params)
+        if after is not None:
+            query += " AND (bk.title > %s OR (bk.title = %s AND bk.book_code > %s))"
+            params += [after.title, after.title, after.book_code]
+        if before is not None:
+            query += " AND (bk.title < %s OR (bk.title = %s AND bk.book_code < %s))"
+            params += [before.title, before.title, before.book_code]
+        # Paging backwards walks the index in descending order and flips the page afterwards
+        descending = before is not None and limit is not None
+        query += " ORDER BY bk.title DESC, bk.book_code DESC" if descending else " ORDER BY bk.title, bk.book_code"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(int(limit))
+        rows = self._fetchall(query, tuple(params), name, prepared=True)
+        if rows is None:
+            return []
+        if descending:
+            rows.reverse()
+        return Book.from_rows(rows)
 
     def close_connection(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
+        """Close all pooled database connections."""
+        self._pool.close()
+
+    def pool_stats(self):
+        """Return connection pool statistics (checkouts, waits, reconnects, occupancy)."""
+        return self._pool.stats()
 
     def getAllAuthors(self):
         """
         Retrieve all authors from the database.
         Returns a list of Author objects.
         """
-        with self.conn.cursor() as cursor:
-            query = "SELECT HA.author_num, HA.author_last, HA.author_first FROM henry_author AS HA JOIN henry_wrote AS HW ON HA.author_num = HW.author_num GROUP BY HA.author_num, HA.author_last, HA.author_first"
-            try:
-                print("Executing query:", query)
-                cursor.execute(query)
-                results = [Author(*row) for row in cursor.fetchall()]
-                print("Fetched results:", results)
-                while cursor.nextset():
-                    pass
-                return results
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                return []
-            
-    def getBooksByAuthor(self, author):
-        with self.conn.cursor() as cursor:
-            query = """SELECT bk.title from henry_book as bk 
-                       join henry_wrote as hw on bk.book_code=hw.book_code 
-                       join henry_author as ha on ha.author_num=hw.author_num 
-                       where author_last=%s and author_first=%s"""
-            try:
-                print("Executing query:", query)
-                cursor.execute(query, (author.author_last, author.author_first))
-                results = [row[0] for row in cursor.fetchall()]
-                print("Fetched results:", results)
-                while cursor.nextset():
-                    pass
-                return results
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                return []
+        query = self.QUERIES["getAllAuthors"]
+        rows = self._fetchall(query, name="getAllAuthors", prepared=True)
+        return Author.from_rows(rows) if rows is not None else []
+
+    def getAllBooks(self):
+        """
+        Retrieve every book of the catalog, in no particular order.
+        Returns a list of Book objects, or None if the books could not be read.
+        """
+        query = self.QUERIES["getAllBooks"]
+        rows = self._fetchall(query, name="getAllBooks", prepared=True)
+        return Book.from_rows(rows) if rows is not None else None
             
-    def getBookAvailability(self, book_title):
-        conn = self._create_connection()
-        with conn.cursor() as cursor:
-            query = """SELECT B.BRANCH_NAME, I.ON_HAND FROM HENRY_BRANCH B 
-                       JOIN HENRY_INVENTORY I ON B.BRANCH_NUM = I.BRANCH_NUM 
-                       JOIN HENRY_BOOK BK ON I.BOOK_CODE = BK.BOOK_CODE 
-                       WHERE BK.TITLE = %s"""
-            try:
-                print("Executing query:", query)
-                cursor.execute(query, (book_title,))
-                results = {row[0]: row[1] for row in cursor.fetchall()}
-                print("Fetched results:", results)
-                while cursor.nextset():
-                    pass
-                conn.close()
-                return results
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                conn.close()
-                return {}
-    def getBookPrice(self, book_title):
-        conn = self._create_connection()
-        with conn.cursor() as cursor:
-            query = "SELECT price FROM henry_book WHERE title = %s"
-            try:
-                print("Executing query:", query)
-                cursor.execute(query, (book_title,))
-                result = cursor.fetchone()[0]
-                print("Fetched result:", result)
-                while cursor.nextset():
-                    pass
-                conn.close()
-                return result
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                conn.close()
-                return None
+    def getBooksByAuthor(self, author, after=None, before=None, limit=None):
+        """
+        Retrieve the books written by an author, looked up by AUTHOR_NUM.
+        Returns a list of Book objects; after/before/limit select one keyset page (see _book_page).
+        """
+        query = self.QUERIES["getBooksByAuthor"]
+        return self._book_page("getBooksByAuthor", query, (author.author_num,), after, before, limit)
             
+    def getBookAvailability(self, book_code):
+        """
+        Retrieve the copies on hand at each branch for a book, looked up by BOOK_CODE.
+        Returns a dict mapping branch name to copies on hand.
+        """
+        query = self.QUERIES["getBookAvailability"]
+        rows = self._fetchall(query, (book_code,), "getBookAvailability", prepared=True)
+        return {row[0]: row[1] for row in rows} if rows is not None else {}
+
+    def getBookPrice(self, book_code):
+        """Retrieve the price of a book, looked up by BOOK_CODE."""
+        query = self.QUERIES["getBookPrice"]
+        rows = self._fetchall(query, (book_code,), "getBookPrice", prepared=True)
+        return rows[0][0] if rows else None
+
+    def getBookDetails(self, book_code):
+        """
+        Retrieve price, per-branch availability, authors and publisher of a book in one round trip.
+        Returns a BookDetail, or None if no book has the given BOOK_CODE.
+        """
+        query = self.QUERIES["getBookDetails"]
+        rows = self._fetchall(query, (book_code,), "getBookDetails", prepared=True)
+        return self._fold_book_details(rows).get(book_code) if rows is not None else None
+
+    def getBookDetailsBatch(self, book_codes):
+        """
+        Retrieve BookDetail objects for many books in one round trip.
+        Returns a dict mapping book code to BookDetail; unknown codes are left out.
+        """
+        book_codes = list(dict.fromkeys(book_codes))
+        if not book_codes:
+            return {}
+        placeholders, params = self._in_list(book_codes)
+        query = self.BOOK_DETAIL_QUERY.format(where=f"BK.BOOK_CODE IN ({placeholders})")
+        rows = self._fetchall(query, params, "getBookDetailsBatch", prepared=True)
+        return self._fold_book_details(rows) if rows is not None else {}
+
+    @staticmethod
+    def _in_list(values):
+        """
+        Return (placeholders, params) for an IN list of the given non-empty values. The list is padded
+        to a power of two (at least 8) by repeating the last value, which does not change the result
+        but keeps the number of distinct prepared statements per connection small.
+        """
+        size = 8
+        while size < len(values):
+            size *= 2
+        params = tuple(values) + tuple(values[-1:]) * (size - len(values))
+        return ", ".join(["%s"] * size), params
+
+    @staticmethod
+    def _fold_book_details(rows):
+        """Collapse the joined (author x branch) rows of BOOK_DETAIL_QUERY into BookDetail objects."""
+        details = {}
+        for (book_code, title, price, publisher_code, publisher_name, city,
+             author_num, author_last, author_first, branch_name, on_hand) in rows:
+            detail = details.get(book_code)
+            if detail is None:
+                publisher = Publisher(publisher_code, publisher_name, city) if publisher_code is not None else None
+                detail = details[book_code] = BookDetail(book_code, title, price, publisher)
+            if author_num is not None and all(a.author_num != author_num for a in detail.authors):
+                detail.authors.append(Author(author_num, author_last, author_first))
+            if branch_name is not None:
+                detail.availability[branch_name] = on_hand
+        return details
+
     def getAllCategories(self):
-        conn = self._create_connection()
-        with conn.cursor() as cursor:
-            query = "SELECT DISTINCT TYPE FROM henry_book"
-            try:
-                print("Executing query:", query)
-                cursor.execute(query)
-                results = [Category(row[0]) for row in cursor.fetchall()]
-                print("Fetched results:", results)
-                conn.close()
-                return results
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                conn.close()
-                return []
+        """
+        Retrieve every book category (distinct HENRY_BOOK.TYPE).
+        Returns a list of Category objects.
+        """
+        query = self.QUERIES["getAllCategories"]
+        rows = self._fetchall(query, name="getAllCategories", prepared=True)
+        return Category.from_rows(rows) if rows is not None else []
             
-    def getBooksByCategory(self, category):
-        conn = self._create_connection()
-        with conn.cursor() as cursor:
-            query = "SELECT TITLE FROM henry_book WHERE TYPE = %s"
-            try:
-                print("Executing query:", query)
-                cursor.execute(query, (category.type_,))
-                results = [row[0] for row in cursor.fetchall()]
-                print("Fetched results:", results)
-                conn.close()
-                return results
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                conn.close()
-                return []
+    def getBooksByCategory(self, category, after=None, before=None, limit=None):
+        """
+        Retrieve the books of a category (HENRY_BOOK.TYPE).
+        Returns a list of Book objects; after/before/limit select one keyset page (see _book_page).
+        """
+        query = self.QUERIES["getBooksByCategory"]
+        return self._book_page("getBooksByCategory", query, (category.type_,), after, before, limit)
             
     def getAllPublishers(self):
-        conn = self._create_connection()
-        with conn.cursor() as cursor:
-            query = "SELECT p.PUBLISHER_CODE, p.PUBLISHER_NAME, p.CITY FROM HENRY_PUBLISHER AS p JOIN HENRY_BOOK AS b ON p.PUBLISHER_CODE = b.PUBLISHER_CODE GROUP BY p.PUBLISHER_CODE, p.PUBLISHER_NAME, p.CITY"
-
-            try:
-                print("Executing query:", query)
-                cursor.execute(query)
-                results = [Publisher(*row) for row in cursor.fetchall()]
-                print("Fetched results:", results)
-                conn.close()
-                return results
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                conn.close()
-                return []
+        """
+        Retrieve every publisher that has at least one book.
+        Returns a list of Publisher objects.
+        """
+        query = self.QUERIES["getAllPublishers"]
+        rows = self._fetchall(query, name="getAllPublishers", prepared=True)
+        return Publisher.from_rows(rows) if rows is not None else []
             
-    def getBooksByPublisher(self, publisher):
-        conn = self._create_connection()
-        with conn.cursor() as cursor:
-            query = "SELECT TITLE FROM henry_book WHERE PUBLISHER_CODE = %s"
-            try:
-                print("Executing query:", query)
-                cursor.execute(query, (publisher.publisher_code,))
-                results = [row[0] for row in cursor.fetchall()]
-                print("Fetched results:", results)
-                conn.close()
-                return results
-            except mysql.connector.Error as err:
-                print(f"Error: {err}")
-                conn.close()
-                return []
+    def getBooksByPublisher(self, publisher, after=None, before=None, limit=None):
+        """
+        Retrieve the books of a publisher, looked up by PUBLISHER_CODE.
+        Returns a list of Book objects; after/before/limit select one keyset page (see _book_page).
+        """
+        query = self.QUERIES["getBooksByPublisher"]
+        return self._book_page("getBooksByPublisher", query, (publisher.publisher_code,), after, before, limit)
+
+    def getStockByBranch(self, category=None, publisher=None):
+        """
+        Total titles, copies on hand and stock value per branch, optionally for one Category or Publisher.
+        Returns a list of StockTotal objects labelled with the branch name, in BRANCH_NUM order.
+        """
+        query = self.QUERIES["getStockByBranch"]
+        params = ["PUBLISHER" if publisher is not None else "TYPE"]
+        if category is not None or publisher is not None:
+            query += " AND S.GROUP_KEY = %s"
+            params.append(publisher.publisher_code if publisher is not None else category.type_)
+        query += " GROUP BY B.BRANCH_NUM, B.BRANCH_NAME ORDER BY B.BRANCH_NUM"
+        rows = self._fetchall(query, tuple(params), "getStockByBranch", prepared=True)
+        return StockTotal.from_rows(rows) if rows is not None else []
+
+    def getStockByCategory(self):
+        """Total titles, copies on hand and stock value per category, over all branches."""
+        query = self.QUERIES["getStockByCategory"]
+        rows = self._fetchall(query, name="getStockByCategory", prepared=True)
+        return StockTotal.from_rows(rows) if rows is not None else []
+
+    def getStockByPublisher(self):
+        """Total titles, copies on hand and stock value per publisher, over all branches."""
+        query = self.QUERIES["getStockByPublisher"]
+        rows = self._fetchall(query, name="getStockByPublisher", prepared=True)
+        return StockTotal.from_rows(rows) if rows is not None else []
+
+    def getPriceByCategory(self):
+        """Number of books and average, lowest and highest price per category, as PriceStats objects."""
+        query = self.QUERIES["getPriceByCategory"]
+        rows = self._fetchall(query, name="getPriceByCategory", prepared=True)
+        return PriceStats.from_rows(rows) if rows is not None else []
+
+    def getPriceByPublisher(self):
+        """Number of books and average, lowest and highest price per publisher, as PriceStats objects."""
+        query = self.QUERIES["getPriceByPublisher"]
+        rows = self._fetchall(query, name="getPriceByPublisher", prepared=True)
+        return PriceStats.from_rows(rows) if rows is not None else []
+
+    def getLowStock(self, threshold=2, limit=100):
+        """
+        Retrieve the books with at most `threshold` copies on hand at a branch, fewest copies first.
+        Returns a list of at most `limit` LowStockItem objects.
+        """
+        query = self.QUERIES["getLowStock"]
+        rows = self._fetchall(query, (threshold, limit), "getLowStock", prepared=True)
+        return LowStockItem.from_rows(rows) if rows is not None else []
+
+    def getBasketStock(self, book_codes):
+        """
+        Retrieve the on-hand counts of many books at every branch in one set-based query (one per
+        BASKET_CHUNK codes). Returns a dict mapping branch name to a dict of book code -> ON_HAND,
+        in branch order; branches holding none of the books are left out. Returns {} on error.
+        """
+        book_codes = list(dict.fromkeys(book_codes))
+        by_branch = {}   # (branch number, branch name) -> {book code: on hand}
+        for start in range(0, len(book_codes), self.BASKET_CHUNK):
+            placeholders, params = self._in_list(book_codes[start:start + self.BASKET_CHUNK])
+            query = self.BASKET_STOCK_QUERY.format(codes=placeholders)
+            rows = self._fetchall(query, params, "getBasketStock", prepared=True)
+            if rows is None:
+                return {}
+            for branch_num, branch_name, book_code, on_hand in rows:
+                by_branch.setdefault((branch_num, branch_name), {})[book_code] = on_hand
+        return {branch_name: stock for (_, branch_name), stock in sorted(by_branch.items())}
+
+    def refreshStockSummary(self, full=False):
+        """
+        Bring HENRY_STOCK_SUMMARY up to date with the inventory change log, in one transaction.
+        The changes logged since the last refresh are summed into one delta per touched
+        (category, branch) and (publisher, branch) row; full=True (or a very large backlog) rebuilds
+        every row instead, which is also needed after catalog edits. Concurrent refreshes queue on
+        the HENRY_SUMMARY_STATE row.
+        Returns the CHANGE_ID the summary is current up to, or None if the refresh failed.
+        """
+        name = "refreshStockSummary"
+        metrics = self.metrics
+        metrics.counter("henry_dao_queries_total", "DAO queries executed").inc(method=name)
+        started = time.perf_counter()
+        try:
+            with self._pool.connection() as conn:
+                acquired = time.perf_counter()
+                cursor = conn.cursor()
+                try:
+                    self._begin(conn)
+                    try:
+                        high, groups = self._refresh_stock_summary(cursor, full)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                finally:
+                    cursor.close()
+        except self.Error as err:
+            metrics.counter("henry_dao_query_errors_total", "DAO queries that failed").inc(method=name)
+            logger.error("%s failed after %.1f ms: %s", name, (time.perf_counter() - started) * 1000, err)
+            return None
+        self._record_query(name, "HENRY_STOCK_SUMMARY", (full,), groups, started, acquired)
+        return high
+
+    def _refresh_stock_summary(self, cursor, full):
+        """Run the statements of refreshStockSummary on an open transaction; returns (CHANGE_ID, rows written)."""
+        def execute(query, params=()):
+            cursor.execute(self._sql(query), params)
+
+        # Lock the state row first so concurrent refreshes run one after the other
+        execute("UPDATE HENRY_SUMMARY_STATE SET CHANGE_ID = CHANGE_ID WHERE NAME = 'STOCK'")
+        execute("SELECT CHANGE_ID FROM HENRY_SUMMARY_STATE WHERE NAME = 'STOCK'")
+        rows = cursor.fetchall()   # fetchall, not fetchone: an unread result would block the next statement
+        low = int(rows[0][0]) if rows and rows[0][0] is not None else None
+        execute("SELECT COALESCE(MAX(CHANGE_ID), 0) FROM HENRY_INVENTORY_CHANGE")
+        high = int(cursor.fetchall()[0][0])
+        if low is None or high - low > self.STOCK_SUMMARY_FULL_REFRESH_CHANGES:
+            full = True
+        elif not full and high == low:
+            return high, 0
+
+        written = 0
+        if full:
+            execute("DELETE FROM HENRY_STOCK_SUMMARY")
+            for dimension, column in self.STOCK_SUMMARY_DIMENSIONS.items():
+                execute(self.STOCK_SUMMARY_REBUILD.format(dimension=dimension, column=column))
+                written += max(cursor.rowcount, 0)
+        else:
+            for dimension, column in self.STOCK_SUMMARY_DIMENSIONS.items():
+                execute(self.STOCK_SUMMARY_DELTAS.format(column=column), (low, high))
+                for group_key, branch_num, titles, on_hand, value in cursor.fetchall():
+                    if not (titles or on_hand or value):
+                        continue
+                    execute("UPDATE HENRY_STOCK_SUMMARY SET TITLES = TITLES + %s, ON_HAND = ON_HAND + %s, "
+                            "STOCK_VALUE = STOCK_VALUE + %s WHERE DIMENSION = %s AND GROUP_KEY = %s AND BRANCH_NUM = %s",
+                            (titles, on_hand, value, dimension, group_key, branch_num))
+                    if cursor.rowcount == 0:
+                        execute("INSERT INTO HENRY_STOCK_SUMMARY (DIMENSION, GROUP_KEY, BRANCH_NUM, TITLES, ON_HAND, "
+                                "STOCK_VALUE) VALUES (%s, %s, %s, %s, %s, %s)",
+                                (dimension, group_key, branch_num, titles, on_hand, value))
+                    written += 1
+            # A group whose last book left a branch has no row after a full rebuild either
+            execute("DELETE FROM HENRY_STOCK_SUMMARY WHERE TITLES <= 0")
+        if low is None:
+            execute("INSERT INTO HENRY_SUMMARY_STATE (NAME, CHANGE_ID) VALUES ('STOCK', %s)", (high,))
+        else:
+            execute("UPDATE HENRY_SUMMARY_STATE SET CHANGE_ID = %s WHERE NAME = 'STOCK'", (high,))
+        return high, written
+
+    def getInventoryWatermark(self):
+        """
+        Retrieve the id of the newest entry of the HENRY_INVENTORY_CHANGE log (0 if it is empty).
+        Returns None if the log cannot be read, e.g. on a database without migration 002.
+        """
+        query = self.QUERIES["getInventoryWatermark"]
+        rows = self._fetchall(query, name="getInventoryWatermark", prepared=True)
+        return int(rows[0][0]) if rows else None
+
+    def hasInventoryChangeLog(self):
+        """
+        Check whether the HENRY_INVENTORY_CHANGE log exists (migration 002).
+        Returns True or False, or None if the database could not be asked.
+        """
+        rows = self._fetchall(self.TABLE_EXISTS_QUERY, ("HENRY_INVENTORY_CHANGE",), "hasInventoryChangeLog")
+        return rows[0][0] > 0 if rows else None
+
+    def getInventoryChanges(self, since_id, limit=1000):
+        """
+        Retrieve the inventory changes logged after change id `since_id`, oldest first.
+        Returns a list of at most `limit` InventoryChange objects.
+        """
+        query = self.QUERIES["getInventoryChanges"]
+        rows = self._fetchall(query, (since_id, limit), "getInventoryChanges", prepared=True)
+        return InventoryChange.from_rows(rows) if rows is not None else []
+
+    def fetchRows(self, query, params=()):
+        """
+        Run a read-only query and return its raw row tuples.
+        Used by bulk loaders such as the catalog snapshot, which build their own structures from the rows.
+        """
+        return self._fetchall(query, params, "fetchRows")
+
+    def iterRows(self, query, params=(), batch_size=1000):
+        """
+        Run a read-only query and yield its raw row tuples as they are fetched, `batch_size` at a time.
+        Used by exports and other bulk readers that must not hold a whole table in memory. Unlike the
+        query methods, database errors are raised, since a truncated stream would look complete.
+        """
+        return self._iterrows(query, params, "iterRows", batch_size)
+
+    def upsertRows(self, table, columns, key_columns, rows, batch_size=1000):
+        """
+        Insert rows into a table, updating the other columns of rows whose primary key already exists.
+        `rows` is any iterable of tuples in `columns` order and is consumed as it goes, `batch_size`
+        rows per executemany() call and transaction. Returns the number of rows written. Like
+        iterRows, database errors are raised (after rolling back the failing batch).
+        """
+        for identifier in [table, *columns, *key_columns]:
+            if not IDENTIFIER_RE.match(identifier):
+                raise ValueError(f"Invalid table or column name {identifier!r}")
+        if not key_columns or not set(key_columns) <= set(columns):
+            raise ValueError("upsertRows needs the primary key columns among the columns written")
+        query = self._upsert_query(table, list(columns), list(key_columns))
+        return self._executemany(query, rows, "upsertRows", batch_size)
+
+    def tableChecksums(self, tables):
+        """
+        Return a dict mapping each table name (upper case) to its current CHECKSUM TABLE value.
+        A changed checksum means the table's contents changed, so callers can skip reloading unchanged tables.
+        Returns None if the checksums could not be read.
+        """
+        rows = self._fetchall("CHECKSUM TABLE " + ", ".join(tables), name="tableChecksums")
+        if rows is None:
+            return None
+        # Rows come back as ("Henry.henry_book", checksum)
+        return {name.rsplit(".", 1)[-1].upper(): checksum for name, checksum in rows}
 
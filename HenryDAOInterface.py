@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryDAOInterface.py, defines the storage-independent interface of the Henry Bookstore DAO.
+The GUI, the caches and the tools only ever call the methods listed here, so any backend that
+implements HenryDAOInterface (MySQL in HenryDAO.py, SQLite in HenrySQLiteDAO.py) can be plugged in
+without touching the rest of the application. HenryBackends.create_dao() picks the backend from
+the configuration file, and HenryConformance.py checks that every backend behaves the same.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class HenryDAOInterface(ABC):
+    """
+    Abstract interface every Henry storage backend implements.
+    Query methods never raise on database errors; they report them and return an empty result
+    ([] / {} / None) so the GUI keeps working.
+    """
+
+    @abstractmethod
+    def getAllAuthors(self):
+        """Return a list of Author objects for every author who wrote at least one book."""
+
+    @abstractmethod
+    def getAllBooks(self):
+        """Return a list of Book objects for every book, or None if the catalog cannot be read."""
+
+    @abstractmethod
+    def getAllCategories(self):
+        """Return a list of Category objects, one per distinct book type."""
+
+    @abstractmethod
+    def getAllPublishers(self):
+        """Return a list of Publisher objects for every publisher with at least one book."""
+
+    @abstractmethod
+    def getBooksByAuthor(self, author, after=None, before=None, limit=None):
+        """
+        Return the Book objects written by an Author, ordered by (title, book_code).
+        With `limit`, only one keyset page is returned: the books following the Book `after`, or the
+        books just preceding the Book `before`.
+        """
+
+    @abstractmethod
+    def getBooksByCategory(self, category, after=None, before=None, limit=None):
+        """
+        Return the Book objects of a Category, ordered by (title, book_code).
+        With `limit`, only one keyset page is returned: the books following the Book `after`, or the
+        books just preceding the Book `before`.
+        """
+
+    @abstractmethod
+    def getBooksByPublisher(self, publisher, after=None, before=None, limit=None):
+        """
+        Return the Book objects of a Publisher, ordered by (title, book_code).
+        With `limit`, only one keyset page is returned: the books following the Book `after`, or the
+        books just preceding the Book `before`.
+        """
+
+    @abstractmethod
+    def getBookAvailability(self, book_code):
+        """Return a dict mapping branch name to copies on hand for a book code."""
+
+    @abstractmethod
+    def getBookPrice(self, book_code):
+        """Return the price of a book code, or None if it does not exist."""
+
+    @abstractmethod
+    def getBookDetails(self, book_code):
+        """Return the BookDetail of a book code, or None if it does not exist."""
+
+    @abstractmethod
+    def getBookDetailsBatch(self, book_codes):
+        """Return a dict mapping book code to BookDetail for many book codes at once."""
+
+    @abstractmethod
+    def getStockByBranch(self, category=None, publisher=None):
+        """Return StockTotal objects per branch, optionally restricted to one Category or Publisher."""
+
+    @abstractmethod
+    def getStockByCategory(self):
+        """Return StockTotal objects per category, over all branches."""
+
+    @abstractmethod
+    def getStockByPublisher(self):
+        """Return StockTotal objects per publisher, over all branches."""
+
+    @abstractmethod
+    def getPriceByCategory(self):
+        """Return PriceStats objects per category."""
+
+    @abstractmethod
+    def getPriceByPublisher(self):
+        """Return PriceStats objects per publisher."""
+
+    @abstractmethod
+    def getLowStock(self, threshold=2, limit=100):
+        """Return up to `limit` LowStockItem objects with at most `threshold` copies on hand, fewest first."""
+
+    @abstractmethod
+    def getBasketStock(self, book_codes):
+        """Return a dict mapping branch name to {book code: ON_HAND} for the given books."""
+
+    @abstractmethod
+    def refreshStockSummary(self, full=False):
+        """Bring the materialized stock summary up to date; return its CHANGE_ID, or None on failure."""
+
+    @abstractmethod
+    def getInventoryWatermark(self):
+        """Return the id of the newest inventory change, or None if the change log cannot be read."""
+
+    @abstractmethod
+    def hasInventoryChangeLog(self):
+        """Return whether the inventory change log exists, or None if the database could not be asked."""
+
+    @abstractmethod
+    def getInventoryChanges(self, since_id, limit=1000):
+        """Return up to `limit` InventoryChange objects logged after change id `since_id`, oldest first."""
+
+    @abstractmethod
+    def fetchRows(self, query, params=()):
+        """Run a read-only query written with %s placeholders and return raw row tuples (None on error)."""
+
+    @abstractmethod
+    def iterRows(self, query, params=(), batch_size=1000):
+        """Like fetchRows, but yield the rows as they are fetched instead of returning a list."""
+
+    @abstractmethod
+    def upsertRows(self, table, columns, key_columns, rows, batch_size=1000):
+        """Insert or update rows of a table in batched transactions; return the number of rows written."""
+
+    @abstractmethod
+    def tableChecksums(self, tables):
+        """Return a dict of table name -> content checksum, or None if the backend cannot provide one."""
+
+    @abstractmethod
+    def close_connection(self):
+        """Release every database connection held by the backend."""
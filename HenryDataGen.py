@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryDataGen.py, generates synthetic Henry Bookstore data at any scale.
+Henry.sql only holds a few dozen books, which says nothing about how the DAO queries behave on a
+real catalog. The generator produces the same six tables (HENRY_AUTHOR, HENRY_BOOK, HENRY_BRANCH,
+HENRY_INVENTORY, HENRY_PUBLISHER, HENRY_WROTE) with a configurable number of books, authors,
+publishers and branches, skewed the way real catalogs are (a few prolific authors, big publishers
+and popular categories). Output is either a SQLite database ready for HenrySQLiteDAO or a MySQL
+script. Because Henry.sql sizes its key columns for two-digit numbers (AUTHOR_NUM DECIMAL(2,0),
+BOOK_CODE CHAR(4), ...), the generated schema keeps every table and column name but widens those
+types so millions of rows fit.
+
+    python HenryDataGen.py --books 1000000 --authors 100000 --branches 500 --sqlite henry_1m.db
+    python HenryDataGen.py --books 100000 --mysql henry_100k.sql
+"""
+
+import argparse
+import glob
+import os
+import random
+import sqlite3
+import sys
+import time
+
+# Henry.sql with the key and counter columns widened for large synthetic catalogs
+SCHEMA = """
+CREATE TABLE HENRY_AUTHOR
+(AUTHOR_NUM DECIMAL(7,0) PRIMARY KEY,
+AUTHOR_LAST CHAR(12),
+AUTHOR_FIRST CHAR(10) );
+CREATE TABLE HENRY_BOOK
+(BOOK_CODE CHAR(8) PRIMARY KEY,
+TITLE CHAR(40),
+PUBLISHER_CODE CHAR(5),
+TYPE CHAR(3),
+PRICE DECIMAL(6,2),
+PAPERBACK CHAR(1) );
+CREATE TABLE HENRY_BRANCH
+(BRANCH_NUM DECIMAL(4,0) PRIMARY KEY,
+BRANCH_NAME CHAR(50),
+BRANCH_LOCATION CHAR(50),
+NUM_EMPLOYEES DECIMAL(2,0) );
+CREATE TABLE HENRY_INVENTORY
+(BOOK_CODE CHAR(8),
+BRANCH_NUM DECIMAL(4,0),
+ON_HAND DECIMAL(4,0),
+PRIMARY KEY (BOOK_CODE, BRANCH_NUM) );
+CREATE TABLE HENRY_PUBLISHER
+(PUBLISHER_CODE CHAR(5) PRIMARY KEY,
+PUBLISHER_NAME CHAR(25),
+CITY CHAR(20) );
+CREATE TABLE HENRY_WROTE
+(BOOK_CODE CHAR(8),
+AUTHOR_NUM DECIMAL(7,0),
+SEQUENCE DECIMAL(1,0),
+PRIMARY KEY (BOOK_CODE, AUTHOR_NUM) );
+"""
+
+TABLES = ["HENRY_AUTHOR", "HENRY_PUBLISHER", "HENRY_BRANCH", "HENRY_BOOK", "HENRY_WROTE", "HENRY_INVENTORY"]
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CATEGORIES = ["FIC", "MYS", "SFI", "HOR", "ART", "PSY", "SCI", "HIS", "TRA", "CMP", "POE", "PHI",
+              "BIO", "CHI", "COO", "REL", "BUS", "SPO", "TRU", "ROM"]
+FIRST_NAMES = ["Toni", "Paul", "Vernor", "Dick", "Peter", "Stephen", "Philip", "Truddi", "Bradley", "Joseph",
+               "Gary", "Douglas", "Harper", "J.K.", "J.D.", "Seamus", "Albert", "John", "Riva", "Barbara",
+               "Randy", "Tracy", "Lon", "Maya", "Ursula", "Octavia", "Kazuo", "Chinua", "Zadie", "Haruki"]
+LAST_NAMES = ["Morrison", "Solotaroff", "Vintage", "Francis", "Straub", "King", "Pratt", "Chase", "Collins",
+              "Heller", "Wills", "Hofstadter", "Lee", "Ambrose", "Rowling", "Salinger", "Heaney", "Camus",
+              "Steinbeck", "Castelman", "Owen", "O'Rourke", "Kidder", "Schleining", "Angelou", "Le Guin",
+              "Butler", "Ishiguro", "Achebe", "Smith", "Murakami", "Atwood", "Carver", "Didion"]
+TITLE_WORDS = ["Night", "River", "Stranger", "House", "Garden", "Machine", "Wind", "Edge", "Light", "Glass",
+               "Winter", "Stone", "Silence", "Fire", "Harbor", "Road", "Mirror", "Deep", "Song", "Shadow",
+               "Empire", "Guide", "Brothers", "Eden", "Magic", "Terror", "Soul", "Sky", "Rabbit", "Wrath"]
+CITIES = ["New York", "Boston", "Chicago", "Toronto", "London", "San Francisco", "Seattle", "Austin",
+          "Denver", "Philadelphia", "Portland", "Atlanta"]
+
+
+def skewed_index(rng, count, skew=1.2):
+    """Pick an index in [0, count) with a Zipf-like preference for low indexes."""
+    return min(int(count * rng.random() ** (1 + skew)), count - 1)
+
+
+def generate(books=100000, authors=10000, publishers=500, branches=50, stock_per_book=3, seed=42):
+    """
+    Generate the six Henry tables.
+    Returns a dict mapping table name to a generator of row tuples in the column order of SCHEMA.
+    Rows are produced lazily, so even the largest scales are written without holding them in memory.
+    """
+    def author_rows():
+        rng = random.Random(seed + 1)
+        for num in range(1, authors + 1):
+            yield (num, rng.choice(LAST_NAMES)[:12], rng.choice(FIRST_NAMES)[:10])
+
+    def publisher_rows():
+        rng = random.Random(seed + 2)
+        for index in range(publishers):
+            name = f"{rng.choice(LAST_NAMES)} {rng.choice(['Books', 'Press', 'House', 'Publishing'])}"
+            yield (publisher_code(index), f"{name} {index}"[:25], rng.choice(CITIES))
+
+    def branch_rows():
+        rng = random.Random(seed + 3)
+        for num in range(1, branches + 1):
+            yield (num, f"Henry Branch {num}", f"{rng.randint(1, 9999)} {rng.choice(TITLE_WORDS)} St", rng.randint(3, 40))
+
+    def book_rows():
+        rng = random.Random(seed + 4)
+        for index in range(books):
+            words = rng.sample(TITLE_WORDS, 3)
+            title = rng.choice([f"The {words[0]}", f"{words[0]} and {words[1]}",
+                                f"{words[0]} of the {words[1]}", f"A {words[0]} {words[1]} {words[2]}"])
+            yield (book_code(index), title[:40], publisher_code(skewed_index(rng, publishers)),
+                   CATEGORIES[skewed_index(rng, len(CATEGORIES), 0.6)],
+                   round(rng.uniform(4.99, 79.99), 2), rng.choice("YN"))
+
+    def wrote_rows():
+        rng = random.Random(seed + 5)
+        for index in range(books):
+            count = 1 if rng.random() < 0.85 else rng.randint(2, 3)
+            chosen = []
+            while len(chosen) < count:
+                author = skewed_index(rng, authors) + 1
+                if author not in chosen:
+                    chosen.append(author)
+            for sequence, author in enumerate(chosen, start=1):
+                yield (book_code(index), author, sequence)
+
+    def inventory_rows():
+        rng = random.Random(seed + 6)
+        for index in range(books):
+            count = min(branches, max(0, int(rng.expovariate(1 / stock_per_book))))
+            for branch in sorted(rng.sample(range(1, branches + 1), count)):
+                yield (book_code(index), branch, rng.randint(1, 25))
+
+    return {
+        "HENRY_AUTHOR": author_rows(),
+        "HENRY_PUBLISHER": publisher_rows(),
+        "HENRY_BRANCH": branch_rows(),
+        "HENRY_BOOK": book_rows(),
+        "HENRY_WROTE": wrote_rows(),
+        "HENRY_INVENTORY": inventory_rows(),
+    }
+
+
+def book_code(index):
+    return f"{index:08d}"
+
+
+def publisher_code(index):
+    digits = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    code = ""
+    for _ in range(3):
+        index, digit = divmod(index, 36)
+        code = digits[digit] + code
+    return "P" + code
+
+
+def migration_scripts(sqlite):
+    """
+    The numbered migrations (indexes, inventory change feed, ...) applied after the rows are loaded,
+    so generated databases have the same schema as a migrated Henry database. SQLite prefers the
+    .sqlite.sql variant of a migration, like HenrySQLiteDAO does.
+    """
+    scripts = []
+    for path in sorted(glob.glob(os.path.join(SCRIPT_DIR, "Henry_[0-9][0-9][0-9]_*.sql"))):
+        if path.endswith(".sqlite.sql"):
+            continue
+        variant = path[:-len(".sql")] + ".sqlite.sql"
+        scripts.append(variant if sqlite and os.path.exists(variant) else path)
+    return scripts
+
+
+def read_script(path):
+    with open(path, encoding="utf-8") as script:
+        return script.read()
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# In[2]:
+
+
+def write_sqlite(path, tables, batch_size=10000):
+    """Create a SQLite database at `path` (replacing any existing file) and load the generated rows."""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA)
+    counts = {}
+    for table in TABLES:
+        counts[table] = 0
+        for batch in batched(tables[table], batch_size):
+            placeholders = ", ".join(["?"] * len(batch[0]))
+            conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", batch)
+            counts[table] += len(batch)
+        conn.commit()
+    # Indexes and triggers go in after the bulk load, which keeps the load fast and the change log empty
+    for script in migration_scripts(sqlite=True):
+        conn.executescript(read_script(script))
+    conn.executescript("ANALYZE;")
+    conn.close()
+    return counts
+
+
+def sql_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def write_mysql(path, tables, batch_size=1000):
+    """Write a MySQL script that recreates the widened schema and loads the generated rows."""
+    counts = {}
+    with open(path, "w", encoding="utf-8") as out:
+        for table in TABLES + ["HENRY_INVENTORY_CHANGE", "HENRY_STOCK_SUMMARY", "HENRY_SUMMARY_STATE"]:
+            out.write(f"DROP TABLE IF EXISTS {table};\n")
+        out.write(SCHEMA)
+        for table in TABLES:
+            counts[table] = 0
+            for batch in batched(tables[table], batch_size):
+                values = ",\n".join("(" + ",".join(sql_literal(v) for v in row) + ")" for row in batch)
+                out.write(f"INSERT INTO {table}\nVALUES\n{values};\n")
+                counts[table] += len(batch)
+        for script in migration_scripts(sqlite=False):
+            out.write(read_script(script))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic Henry Bookstore data")
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--authors", type=int, default=10000)
+    parser.add_argument("--publishers", type=int, default=500)
+    parser.add_argument("--branches", type=int, default=50)
+    parser.add_argument("--stock-per-book", type=float, default=3.0,
+                        help="average number of branches holding each book (default: 3)")
+    parser.add_argument("--seed", type=int, default=42)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--sqlite", help="write a SQLite database file")
+    target.add_argument("--mysql", help="write a MySQL script (load it with: mysql Henry < FILE)")
+    args = parser.parse_args(argv)
+    if min(args.books, args.authors, args.publishers, args.branches) < 1:
+        parser.error("--books, --authors, --publishers and --branches must all be at least 1")
+
+    started = time.perf_counter()
+    tables = generate(books=args.books, authors=args.authors, publishers=args.publishers,
+                      branches=args.branches, stock_per_book=args.stock_per_book, seed=args.seed)
+    if args.sqlite:
+        counts = write_sqlite(args.sqlite, tables)
+    else:
+        counts = write_mysql(args.mysql, tables)
+    for table in TABLES:
+        print(f"{table:16} {counts[table]:>10,} rows")
+    print(f"Generated in {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryExecutor.py, runs DAO calls off the tkinter main thread for the Henry Bookstore GUI.
+tkinter widgets may only be touched from the thread running mainloop(), so a slow MySQL query issued
+directly from an event handler freezes the whole window. QueryExecutor hands the blocking DAO work
+to a small thread pool and delivers results back on the main thread by polling a queue with
+root.after(). Every request is submitted on a named channel (e.g. "sba.books"); submitting again on
+the same channel supersedes the previous request, which is cancelled if it has not started yet and
+otherwise has its result silently dropped, so a user clicking quickly through a combobox only ever
+sees the result of the last selection.
+"""
+
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("henry.executor")
+
+
+class QueryExecutor:
+    """
+    Thread pool for DAO calls whose results are delivered on the tkinter main thread.
+    submit(), cancel() and the on_done/on_error callbacks must all be used from the main thread.
+    """
+
+    def __init__(self, root, max_workers=4, poll_ms=15):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="henry-dao")
+        self._results = queue.SimpleQueue()
+        self._generation = {}   # channel -> generation of the latest submitted request
+        self._pending = {}      # channel -> (generation, future, on_done, on_error) still awaited
+        self._poll_id = None
+        self._closed = False
+        self.stats = {"submitted": 0, "delivered": 0, "cancelled": 0, "dropped": 0, "failed": 0}
+
+    def submit(self, channel, fn, *args, on_done=None, on_error=None):
+        """
+        Run fn(*args) on a worker thread and call on_done(result) on the main thread.
+        Any earlier request still pending on the same channel is superseded.
+        """
+        if self._closed:
+            return
+        self.cancel(channel)
+        generation = self._generation.get(channel, 0) + 1
+        self._generation[channel] = generation
+        future = self._pool.submit(fn, *args)
+        self._pending[channel] = (generation, future, on_done, on_error)
+        self.stats["submitted"] += 1
+        future.add_done_callback(lambda f: self._results.put((channel, generation, f)))
+        self._schedule_poll()
+
+    def cancel(self, *channels):
+        """Supersede the pending requests on the given channels without submitting new ones."""
+        for channel in channels:
+            pending = self._pending.pop(channel, None)
+            if pending is None:
+                continue
+            self._generation[channel] = pending[0] + 1
+            # A request that already started cannot be interrupted; its result is dropped in _poll
+            if pending[1].cancel():
+                self.stats["cancelled"] += 1
+
+    def is_pending(self, prefix=""):
+        """Return True if any request on a channel starting with `prefix` is still outstanding."""
+        return any(channel.startswith(prefix) for channel in self._pending)
+
+    def shutdown(self):
+        """Stop delivering results and drop every request that has not started yet."""
+        self._closed = True
+        self.cancel(*list(self._pending))
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                channel, generation, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            pending = self._pending.get(channel)
+            if future.cancelled():
+                continue
+            if pending is None or pending[0] != generation:
+                self.stats["dropped"] += 1
+                continue
+            del self._pending[channel]
+            _, _, on_done, on_error = pending
+            error = future.exception()
+            if error is not None:
+                self.stats["failed"] += 1
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    logger.error("Error in background query on %s: %r", channel, error)
+            else:
+                self.stats["delivered"] += 1
+                if on_done is not None:
+                    on_done(future.result())
+        if self._pending:
+            self._schedule_poll()
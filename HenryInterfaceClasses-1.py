@@ -9,58 +9,134 @@ and manage data throughout the application. These classes are utilized by the He
 creating objects from database query results, allowing for an object-oriented approach to handle the data.
 These models also interface with the GUI components, enabling the display and manipulation of data in a 
 structured manner. Each class includes a __str__ method for easy string representation of its instances.
+Author, Book, Branch, Category and Publisher are immutable named-tuple records: they have no per-instance
+__dict__, compare and hash by value, and can be built straight from database row tuples with
+from_rows() or from result columns with from_columns().
 """
 
+from collections import namedtuple
+from functools import partial
 
-class Author:
+
+class Record:
+    """
+    Mixin for the named-tuple models: bulk constructors that build records from database results.
+    Rows must hold exactly the record's fields, in field order (the DAO SELECTs them that way); a row of
+    another length raises TypeError.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = rows if isinstance(rows, list) else list(rows)
+        # Every row of a result has the same columns, so checking the first one catches a changed SELECT
+        if rows and len(rows[0]) != len(cls._fields):
+            raise TypeError(f"{cls.__name__} expects {len(cls._fields)} columns, got {len(rows[0])}")
+        # tuple.__new__ copies each row into a record in C; no Python code runs per row
+        return list(map(partial(tuple.__new__, cls), rows))
+
+    @classmethod
+    def from_columns(cls, *columns):
+        """Build records from parallel column sequences (one per field)."""
+        if len(columns) != len(cls._fields):
+            raise TypeError(f"{cls.__name__} expects {len(cls._fields)} columns, got {len(columns)}")
+        return list(map(partial(tuple.__new__, cls), zip(*columns)))
+
+
+class Author(Record, namedtuple("Author", ["author_num", "author_last", "author_first"])):
     """
     Author class to represent an author in the bookstore database.
     Attributes include the author's number, last name, and first name.
     """
-    def __init__(self, author_num, author_last, author_first):
-        self.author_num = author_num
-        self.author_last = author_last
-        self.author_first = author_first
+    __slots__ = ()
 
     def __str__(self):
         return f"{self.author_first} {self.author_last}"
 
-class Book:
+class Book(Record, namedtuple("Book", ["book_code", "title", "price"])):
     """
     Book class to represent a book in the bookstore database.
-    Attributes include the book's title and price.
+    Attributes include the book's code (the HENRY_BOOK primary key), title and price.
     """
-    def __init__(self, title, price):
+    __slots__ = ()
+
+    def __str__(self):
+        return self.title
+
+class BookDetail:
+    """
+    BookDetail class to represent everything the GUI shows for a single book.
+    Attributes include the book's code, title and price, its Publisher, the list of
+    Authors in writing sequence, and a dict mapping branch name to copies on hand.
+    Unlike the other models it is filled in incrementally by the DAO, so it stays mutable.
+    """
+    __slots__ = ("book_code", "title", "price", "publisher", "authors", "availability")
+
+    def __init__(self, book_code, title, price, publisher=None, authors=None, availability=None):
+        self.book_code = book_code
         self.title = title
         self.price = price
+        self.publisher = publisher
+        self.authors = authors if authors is not None else []
+        self.availability = availability if availability is not None else {}
 
     def __str__(self):
         return self.title
 
-class Branch:
-    def __init__(self, name, on_hand):
-        self.name = name
-        self.on_hand = on_hand
+class Branch(Record, namedtuple("Branch", ["name", "on_hand"])):
+    __slots__ = ()
 
     def __str__(self):
         return self.name
     
-class Category:
-    def __init__(self, type_):
-        self.type_ = type_
+class Category(Record, namedtuple("Category", ["type_"])):
+    __slots__ = ()
 
     def __str__(self):
         return self.type_
     
-class Publisher:
-    def __init__(self, publisher_code, publisher_name, city):
-        self.publisher_code = publisher_code
-        self.publisher_name = publisher_name
-        self.city = city
+class Publisher(Record, namedtuple("Publisher", ["publisher_code", "publisher_name", "city"])):
+    __slots__ = ()
 
     def __str__(self):
         return self.publisher_name
 
+class InventoryChange(Record, namedtuple("InventoryChange",
+                                         ["change_id", "book_code", "branch_num", "branch_name", "on_hand"])):
+    """
+    InventoryChange class to represent one entry of the HENRY_INVENTORY_CHANGE log.
+    on_hand is the new number of copies, or None when the inventory row was deleted;
+    branch_name is None if the branch no longer exists.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.book_code} @ {self.branch_name}: {self.on_hand}"
+
+class StockTotal(Record, namedtuple("StockTotal", ["label", "titles", "on_hand", "stock_value"])):
+    """
+    StockTotal class to represent one row of a stock report.
+    label is the branch name, category or publisher name the row is grouped by; titles counts the
+    inventory rows (book at a branch), on_hand the copies and stock_value their total price.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return self.label
+
+class PriceStats(Record, namedtuple("PriceStats", ["label", "titles", "average", "lowest", "highest"])):
+    """PriceStats class to represent the price statistics of the books of a category or publisher."""
+    __slots__ = ()
+
+    def __str__(self):
+        return self.label
+
+class LowStockItem(Record, namedtuple("LowStockItem", ["book_code", "title", "branch_name", "on_hand"])):
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.title} @ {self.branch_name}: {self.on_hand}"
+
 
 # In[ ]:
 
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryLoadGen.py, is a load generator for the HenryServer.py HTTP/JSON API.
+It opens a number of keep-alive connections, looks up real author numbers, categories,
+publishers and book codes first, and then has every connection send a random mix of requests,
+weighted the way the GUI uses the API (mostly book lists and book details), for a fixed time or
+number of requests. With --etag it revalidates with If-None-Match like a caching client, and with
+--gzip it asks for compressed responses. It reports throughput, latency percentiles and the
+status codes returned.
+
+    python HenryServer.py --backend sqlite &
+    python HenryLoadGen.py --concurrency 32 --duration 10 --etag --gzip
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import sys
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+
+class HTTPConnection:
+    """A minimal HTTP/1.1 keep-alive client on asyncio streams (one request at a time)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, path, headers=None):
+        """Send a GET and return (status, response headers, body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        try:
+            head = await self.reader.readuntil(b"\r\n\r\n")
+            status_line, *header_lines = head.decode("latin-1").split("\r\n")
+            response_headers = {}
+            for line in header_lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    response_headers[name.strip().lower()] = value.strip()
+            body = await self.reader.readexactly(int(response_headers.get("content-length", 0)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.close()
+            raise
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(status_line.split(" ")[1]), response_headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def decode_body(headers, body):
+    if headers.get("content-encoding") == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+async def discover(conn, sample=200):
+    """Collect the ids the request mix is built from: list endpoints and some book codes."""
+    ids = {}
+    for name in ("authors", "categories", "publishers"):
+        status, headers, body = await conn.request("/" + name)
+        if status != 200:
+            raise RuntimeError(f"/{name} returned {status}")
+        ids[name] = decode_body(headers, body)
+    ids["authors"] = [author["author_num"] for author in ids["authors"]]
+    ids["publishers"] = [publisher["publisher_code"] for publisher in ids["publishers"]]
+    books = set()
+    for type_ in random.sample(ids["categories"], min(len(ids["categories"]), 10)):
+        status, headers, body = await conn.request(f"/categories/{quote(type_)}/books?limit={sample}")
+        books.update(book["book_code"] for book in decode_body(headers, body)["books"])
+    ids["books"] = sorted(books)
+    if not ids["books"]:
+        raise RuntimeError("No books found")
+    return ids
+
+
+def request_mix(ids, page_size):
+    """Weighted (weight, path factory) pairs approximating how the GUI drives the DAO."""
+    return [
+        (1, lambda: random.choice(["/authors", "/categories", "/publishers"])),
+        (3, lambda: f"/authors/{random.choice(ids['authors'])}/books?limit={page_size}"),
+        (3, lambda: f"/categories/{quote(random.choice(ids['categories']))}/books?limit={page_size}"),
+        (3, lambda: f"/publishers/{quote(random.choice(ids['publishers']))}/books?limit={page_size}"),
+        (5, lambda: f"/books/{quote(random.choice(ids['books']))}"),
+        (3, lambda: f"/books/{quote(random.choice(ids['books']))}/availability"),
+        (2, lambda: f"/books/{quote(random.choice(ids['books']))}/price"),
+    ]
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.bytes = 0
+
+    def percentile(self, fraction):
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+    def summary(self, elapsed):
+        count = len(self.latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+            "mb_received": round(self.bytes / 1e6, 3),
+            "latency_ms": {name: round(self.percentile(fraction) * 1000, 2)
+                           for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+            "not_modified_ratio": round(self.statuses[304] / count, 3) if count else 0.0,
+        }
+
+
+async def worker(host, port, mix, deadline, budget, result, etag, use_gzip):
+    weights = [weight for weight, _ in mix]
+    factories = [factory for _, factory in mix]
+    conn = HTTPConnection(host, port)
+    etags = {}   # path -> ETag of the last 200 response, for conditional requests
+    base_headers = {"Accept-Encoding": "gzip"} if use_gzip else {}
+    try:
+        while time.perf_counter() < deadline and budget():
+            path = random.choices(factories, weights)[0]()
+            headers = dict(base_headers)
+            if etag and path in etags:
+                headers["If-None-Match"] = etags[path]
+            started = time.perf_counter()
+            try:
+                status, response_headers, body = await conn.request(path, headers)
+            except (OSError, asyncio.IncompleteReadError):
+                result.errors += 1
+                continue
+            result.latencies.append(time.perf_counter() - started)
+            result.statuses[status] += 1
+            result.bytes += len(body)
+            if status == 200 and "etag" in response_headers:
+                etags[path] = response_headers["etag"]
+    finally:
+        conn.close()
+
+
+async def run(url, concurrency, duration, requests, etag, use_gzip, page_size):
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    conn = HTTPConnection(host, port)
+    try:
+        ids = await discover(conn)
+    finally:
+        conn.close()
+    mix = request_mix(ids, page_size)
+
+    remaining = [requests]
+    def budget():
+        # Shared request budget (0 = unlimited); workers run on one event loop, so no lock is needed
+        if not requests:
+            return True
+        remaining[0] -= 1
+        return remaining[0] >= 0
+
+    result = LoadResult()
+    started = time.perf_counter()
+    deadline = started + duration if duration else float("inf")
+    await asyncio.gather(*(worker(host, port, mix, deadline, budget, result, etag, use_gzip)
+                           for _ in range(concurrency)))
+    return result.summary(time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate load against the Henry HTTP/JSON API")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="server address (default: http://127.0.0.1:8080)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent connections (default: 16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (default: 10)")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="stop after this many requests instead of after --duration")
+    parser.add_argument("--page-size", type=int, default=50, help="books per book list request (default: 50)")
+    parser.add_argument("--etag", action="store_true", help="revalidate with If-None-Match like a caching client")
+    parser.add_argument("--gzip", action="store_true", help="request gzip-compressed responses")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run(args.url, args.concurrency, 0 if args.requests else args.duration,
+                              args.requests, args.etag, args.gzip, args.page_size))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    latency = summary["latency_ms"]
+    print(f"{summary['requests']} requests in {summary['seconds']:.2f} s "
+          f"({summary['requests_per_second']:.1f} req/s, {summary['errors']} errors, "
+          f"{summary['mb_received']:.2f} MB received)")
+    print(f"Latency: p50 {latency['p50']:.2f} ms, p90 {latency['p90']:.2f} ms, "
+          f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+    print("Statuses: " + ", ".join(f"{status}: {n}" for status, n in summary["statuses"].items())
+          + f" (304 ratio {summary['not_modified_ratio']:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
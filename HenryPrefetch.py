@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryPrefetch.py, prefetches book details and book lists for the Henry Bookstore GUI.
+After a book is shown, the next click is most likely on a title next to it in the same list, or on
+the author, category or publisher next to the selected one. Prefetcher loads the details of the
+visible titles with one batched getBookDetailsBatch query, and the first page of the neighbouring
+book lists, on the QueryExecutor in the background. The results land in the CachedHenryDAO cache,
+so the following selection is answered from memory (HenryAsyncFrame looks there first). The number
+of books per batch is bounded by a budget, and every lookup is counted as served from a prefetch,
+from an earlier view, or as a miss.
+"""
+
+import logging
+
+from HenryMetrics import REGISTRY
+
+logger = logging.getLogger("henry.prefetch")
+
+DEFAULT_BUDGET = 50      # Books whose details one prefetch batch may load
+DEFAULT_NEIGHBOURS = 1   # Items on either side of the selected one whose book lists are warmed
+MAX_TRACKED = 10000      # Prefetched book codes remembered for the hit statistics
+
+
+class Prefetcher:
+    """
+    Background prefetching shared by all tabs of the GUI (use from the tkinter main thread).
+    Prefetching only happens with a DAO that can store what it loads, i.e. one offering
+    prefetch_book_details (CachedHenryDAO); a snapshot already holds everything in memory, and a
+    budget of 0 turns prefetching off. lookup() works in every case.
+    """
+
+    def __init__(self, dao, executor, budget=DEFAULT_BUDGET, neighbours=DEFAULT_NEIGHBOURS):
+        self.dao = dao
+        self.executor = executor
+        self.budget = budget
+        self.neighbours = neighbours
+        self.enabled = budget > 0 and hasattr(dao, "prefetch_book_details")
+        self._prefetched = set()   # Book codes loaded by a prefetch and not looked up since
+        self.stats = {"lookups": 0, "prefetched": 0, "cached": 0, "batches": 0, "books": 0, "lists": 0}
+        self._lookups = REGISTRY.counter("henry_prefetch_lookups_total",
+                                         "Book detail lookups by the GUI, by where they were answered")
+        self._books = REGISTRY.counter("henry_prefetch_books_total", "Book details loaded by prefetching")
+
+    def lookup(self, book_code):
+        """Return the BookDetail if it is already in memory, else None (never queries the database)."""
+        peek = getattr(self.dao, "peek_book_details", None)
+        details = peek(book_code) if peek is not None else None
+        self.stats["lookups"] += 1
+        if details is None:
+            result = "miss"
+        elif book_code in self._prefetched:
+            result = "prefetched"
+            self._prefetched.discard(book_code)
+        else:
+            result = "cached"
+        if details is not None:
+            self.stats[result] += 1
+        self._lookups.inc(result=result)
+        return details
+
+    def hit_rate(self):
+        """Fraction of lookups answered from memory, and the part of it due to prefetching."""
+        lookups = self.stats["lookups"]
+        if not lookups:
+            return 0.0, 0.0
+        return (self.stats["prefetched"] + self.stats["cached"]) / lookups, self.stats["prefetched"] / lookups
+
+    def prefetch_details(self, books):
+        """Load the details of up to `budget` of these books (nearest first) in one background batch."""
+        if not self.enabled or not books:
+            return
+        book_codes = [book.book_code for book in books[:self.budget]]
+        # A newer prefetch (another selection, in any tab) supersedes one not yet started
+        self.executor.submit("prefetch.details", self.dao.prefetch_book_details, book_codes,
+                             on_done=self._prefetched_details, on_error=self._failed)
+
+    def _prefetched_details(self, book_codes):
+        self.stats["batches"] += 1
+        self.stats["books"] += len(book_codes)
+        self._books.inc(len(book_codes))
+        if len(self._prefetched) + len(book_codes) > MAX_TRACKED:
+            self._prefetched.clear()
+        self._prefetched.update(book_codes)
+
+    def warm_lists(self, loaders, page_size):
+        """Load the first page of each book list, e.g. partial(dao.getBooksByAuthor, author)."""
+        if not self.enabled or not loaders:
+            return
+        self.executor.submit("prefetch.lists", self._load_pages, loaders, page_size,
+                             on_done=self._warmed_lists, on_error=self._failed)
+
+    @staticmethod
+    def _load_pages(loaders, page_size):
+        # Same arguments as VirtualBookList.reset, so the cached page is the one it asks for
+        for loader in loaders:
+            loader(None, None, page_size)
+        return len(loaders)
+
+    def _warmed_lists(self, count):
+        self.stats["lists"] += count
+
+    def _failed(self, error):
+        # Prefetching is best effort; the selection itself will query and report any error
+        logger.warning("Prefetch failed: %s", error)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenrySQLiteDAO.py, is the embedded SQLite backend of the Henry Bookstore DAO.
+HenrySQLiteDAO runs every HenryDAO query against a local SQLite database (a file or ":memory:")
+instead of a MySQL server, which gives edge machines a zero-latency store and lets the whole
+application and the benchmark suite run without any server at all. When the database is empty it
+is created from Henry.sql followed by the numbered migration scripts (Henry_001_*.sql, ...); a
+migration that needs SQLite-specific syntax ships as a Henry_NNN_*.sqlite.sql variant, which is
+used in place of the MySQL script.
+"""
+
+import glob
+import itertools
+import logging
+import os
+import sqlite3
+from decimal import Decimal
+
+from HenryDAO1 import HenryDAO, PoolError
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger("henry.dao")
+
+_memory_ids = itertools.count(1)
+
+# DECIMAL parameters (e.g. from HenryBulk) are passed as text, which SQLite's NUMERIC affinity then stores
+sqlite3.register_adapter(Decimal, str)
+
+
+def default_scripts(directory=SCRIPT_DIR):
+    """Return Henry.sql and the numbered migrations in order, preferring .sqlite.sql variants."""
+    scripts = [os.path.join(directory, "Henry.sql")]
+    for path in sorted(glob.glob(os.path.join(directory, "Henry_[0-9][0-9][0-9]_*.sql"))):
+        if path.endswith(".sqlite.sql"):
+            continue
+        variant = path[:-len(".sql")] + ".sqlite.sql"
+        scripts.append(variant if os.path.exists(variant) else path)
+    return scripts
+
+
+class HenrySQLiteDAO(HenryDAO):
+    """
+    HenryDAO backend for SQLite.
+    All queries are inherited from HenryDAO; only the driver hooks differ. ":memory:" databases use
+    SQLite's shared cache so every pooled connection sees the same data, and one extra connection
+    is held open for the lifetime of the DAO to keep the in-memory database alive.
+    """
+
+    paramstyle = "qmark"
+    # sqlite3 already keeps compiled statements per connection, keyed by SQL text (cached_statements),
+    # so the registered queries are reused without server-side prepared cursors
+    prepared_statements = False
+    TABLE_EXISTS_QUERY = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND UPPER(name) = %s"
+
+    def __init__(self, path=":memory:", scripts=None, pool_size=5, checkout_timeout=10.0,
+                 health_check_interval=30.0):
+        self.path = path
+        self.Error = (sqlite3.Error, PoolError)
+        if path == ":memory:":
+            self._database, self._uri = f"file:henry-{os.getpid()}-{next(_memory_ids)}?mode=memory&cache=shared", True
+        else:
+            self._database, self._uri = path, False
+        # Holds the schema load and, for ":memory:", keeps the database from being discarded
+        self._keeper = self._create_connection()
+        if scripts is not None or not self._has_schema():
+            self.load_scripts(scripts if scripts is not None else default_scripts())
+        self._start_pool(pool_size, checkout_timeout, health_check_interval)
+
+    def _create_connection(self):
+        """Create and return a new SQLite connection in autocommit mode."""
+        # Pooled connections move between worker threads, but only one thread uses a connection at a time
+        return sqlite3.connect(self._database, uri=self._uri, check_same_thread=False,
+                               isolation_level=None, cached_statements=4 * self.statement_cache_size)
+
+    def _is_healthy(self, conn):
+        conn.execute("SELECT 1").fetchone()
+        return True
+
+    def _begin(self, conn):
+        conn.execute("BEGIN")
+
+    def _upsert_query(self, table, columns, key_columns):
+        values = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in key_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO " + (f"UPDATE SET {values}" if values else "NOTHING"))
+
+    def _has_schema(self):
+        row = self._keeper.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND UPPER(name) = 'HENRY_BOOK'").fetchone()
+        return row[0] > 0
+
+    def load_scripts(self, scripts):
+        """Execute SQL script files (schema, data, migrations) against the database, in order."""
+        for path in scripts:
+            logger.info("Loading script %s", path)
+            with open(path, encoding="utf-8") as script:
+                self._keeper.executescript(script.read())
+
+    def close_connection(self):
+        """Close all pooled connections and the keeper connection."""
+        super().close_connection()
+        self._keeper.close()
+
+    def tableChecksums(self, tables):
+        """SQLite has no CHECKSUM TABLE; returning None makes callers reload every table."""
+        return None
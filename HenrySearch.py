@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenrySearch.py, implements the type-ahead search index behind the Search tab of the Henry Bookstore GUI.
+SearchIndex is built once from the DAO and then answers every keystroke from memory, without a
+database round trip. Titles, author names and publisher names are normalized (case-folded, split
+into words) and stored in sorted arrays: one of whole names, one of words and, for substring
+matches, one of word suffixes. A query term is looked up with bisect and the matching range is
+scanned in order, so a lookup costs O(log n) plus the handful of results it returns.
+Results are ranked by how they match (whole-name prefix, then word prefix, then substring inside
+a word) and capped.
+"""
+
+import bisect
+import re
+
+WORD_RE = re.compile(r"\w+")
+
+# Rank of each kind of match; lower ranks are listed first
+NAME_PREFIX, WORD_PREFIX, SUBSTRING = 0, 1, 2
+
+
+def normalize(text):
+    """Case-fold text and reduce it to its words separated by single spaces."""
+    return " ".join(WORD_RE.findall((text or "").casefold()))
+
+
+class SearchHit:
+    def __init__(self, kind, label, item):
+        self.kind = kind     # "book", "author" or "publisher"
+        self.label = label   # Text shown in the results and matched against the query
+        self.item = item     # The Book, Author or Publisher object
+
+    def __str__(self):
+        return f"{self.kind.capitalize()}: {self.label}"
+
+
+class SearchIndex:
+    """
+    Immutable prefix/substring index over SearchHit labels.
+    Each sorted array holds distinct keys, with a parallel list of the ids of the hits containing
+    each key, so bisect runs on plain strings and shared words are stored once.
+    With substring=False the suffix array is skipped, which saves memory on very large catalogs at
+    the cost of only matching word prefixes.
+    """
+
+    def __init__(self, hits, substring=True, min_substring=2):
+        self.hits = list(hits)
+        self.texts = [normalize(hit.label) for hit in self.hits]
+        self._spaced = [" " + text for text in self.texts]   # " " + term finds a word prefix with one `in`
+        self.substring = substring
+        self.min_substring = min_substring
+        words = [set(text.split()) for text in self.texts]
+        self._names = self._sorted_postings((text, i) for i, text in enumerate(self.texts) if text)
+        self._words = self._sorted_postings((word, i) for i, unique in enumerate(words) for word in unique)
+        # Every proper suffix of every word, so a prefix lookup on them finds substrings inside words
+        self._suffixes = self._sorted_postings(
+            (word[start:], i) for i, unique in enumerate(words) for word in unique
+            for start in range(1, len(word) - min_substring + 1)) if substring else ([], [], [0])
+
+    @staticmethod
+    def _sorted_postings(pairs):
+        """
+        Group (key, hit id) pairs into sorted distinct keys, a parallel list of hit id lists and the
+        running total of ids before each key (so the number of hits under a prefix is one subtraction).
+        """
+        postings = {}
+        for key, i in pairs:
+            ids = postings.get(key)
+            if ids is None:
+                postings[key] = [i]
+            elif ids[-1] != i:
+                ids.append(i)
+        keys = sorted(postings)
+        offsets = [0]
+        for key in keys:
+            offsets.append(offsets[-1] + len(postings[key]))
+        return keys, [postings[key] for key in keys], offsets
+
+    @staticmethod
+    def _prefix_range(index, prefix):
+        """Return (first, end, hit count) of the keys of an index that start with `prefix`."""
+        keys, _, offsets = index
+        first = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + "\U0010ffff", first)
+        return first, end, offsets[end] - offsets[first]
+
+    @classmethod
+    def from_dao(cls, dao, substring=True):
+        """Build the index from every book title, author and publisher known to the DAO."""
+        books = dao.getAllBooks()
+        if books is None:
+            raise RuntimeError("Could not load the books for the search index")
+        hits = [SearchHit("book", book.title, book) for book in books]
+        hits += [SearchHit("author", f"{author.author_first} {author.author_last}", author)
+                 for author in dao.getAllAuthors()]
+        hits += [SearchHit("publisher", publisher.publisher_name, publisher) for publisher in dao.getAllPublishers()]
+        return cls(hits, substring)
+
+    def __len__(self):
+        return len(self.hits)
+
+    def search(self, query, limit=20, max_scan=5000):
+        """
+        Return up to `limit` SearchHits matching every word of `query`, best matches first.
+        In each tier the query word with the fewest index entries drives the lookup and the other
+        words are checked on each candidate. At most `max_scan` candidates are examined, which
+        bounds the cost of very unselective queries on large catalogs.
+        """
+        terms = list(dict.fromkeys(normalize(query).split()))
+        if not terms or limit <= 0:
+            return []
+        texts, spaced = self.texts, self._spaced
+        tiers = [
+            (NAME_PREFIX, (self._names,), [" ".join(terms)]),
+            (WORD_PREFIX, (self._words,), terms),
+            # A substring may also start a word, so this tier reads both the word and the suffix arrays
+            (SUBSTRING, (self._words, self._suffixes), [term for term in terms if len(term) >= self.min_substring]),
+        ]
+        results, seen = [], set()
+        budget = max_scan
+        for rank, indexes, lookups in tiers:
+            if not lookups or (rank == SUBSTRING and not self.substring):
+                continue
+            ranges = {term: [self._prefix_range(index, term) for index in indexes] for term in lookups}
+            driver = min(lookups, key=lambda term: sum(count for _, _, count in ranges[term]))
+            if rank == WORD_PREFIX:
+                needles = [" " + term for term in terms if term != driver]
+                haystacks = spaced
+            else:
+                needles = [term for term in terms if term != driver] if rank == SUBSTRING else []
+                haystacks = texts
+            for (_, postings, _), (first, end, _) in zip(indexes, ranges[driver]):
+                for position in range(first, end):
+                    for i in postings[position]:
+                        if budget <= 0:
+                            return results
+                        budget -= 1
+                        if i in seen:
+                            continue
+                        haystack = haystacks[i]
+                        for needle in needles:
+                            if needle not in haystack:
+                                break
+                        else:
+                            seen.add(i)
+                            results.append(self.hits[i])
+                            if len(results) >= limit:
+                                return results
+        return results
@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryServer.py, serves the Henry Bookstore DAO as a headless HTTP/JSON API.
+Instead of every terminal opening its own database connections, kiosks and other clients can share
+one pooled, cached backend through this server. It is built on asyncio streams (no web framework
+needed): the event loop only parses requests and writes responses, while the blocking DAO calls,
+JSON encoding and gzip compression run on a bounded thread pool. When more requests are waiting
+than the pool can absorb, new ones are answered 503 right away instead of queueing without bound.
+Responses carry an ETag, so clients revalidating with If-None-Match get an empty 304 when nothing
+changed, and are gzip-compressed for clients that accept it.
+
+    python HenryServer.py --port 8080 --backend sqlite
+    curl -s localhost:8080/categories/FIC/books?limit=5
+"""
+
+import argparse
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from HenryBackends import BACKENDS, catalog_file_path, configure_logging, create_dao, load_config
+from HenryCache import FEED_INVENTORY_TTL, INVENTORY_METHODS, CachedHenryDAO
+from HenryChangeFeed import InventoryChangeFeed
+from HenryInterfaceClasses import Author, Book, Category, Publisher
+from HenryMetrics import REGISTRY
+from HenrySnapshot import SnapshotHenryDAO
+
+logger = logging.getLogger("henry.server")
+
+CATALOG_MAX_AGE = 60     # Seconds clients may reuse catalog responses without revalidating
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+GZIP_MIN_BYTES = 1024    # Smaller bodies are not worth compressing
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_cursor(book):
+    """Opaque paging cursor for the position of a Book in a (title, book_code) ordered list."""
+    return base64.urlsafe_b64encode(json.dumps([book.title, book.book_code]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        title, book_code = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid paging cursor") from None
+    return Book(book_code, title, None)
+
+
+# In[2]:
+
+
+class HenryAPI:
+    """
+    The JSON endpoints, as plain blocking functions over a DAO.
+    resolve() maps a request path to a handler; handlers take the path arguments and the parsed
+    query string and return (payload, max_age), or raise HTTPError.
+    """
+
+    def __init__(self, dao):
+        self.dao = dao
+        self.routes = [(route, re.compile(re.sub(r"\{\w+\}", "([^/]+)", route)), handler) for route, handler in [
+            ("/authors", self.authors),
+            ("/categories", self.categories),
+            ("/publishers", self.publishers),
+            ("/authors/{author_num}/books", self.books_by_author),
+            ("/categories/{type}/books", self.books_by_category),
+            ("/publishers/{publisher_code}/books", self.books_by_publisher),
+            ("/books/{book_code}", self.book_details),
+            ("/books/{book_code}/availability", self.availability),
+            ("/books/{book_code}/price", self.price),
+            ("/basket", self.basket),
+            ("/health", self.health),
+        ]]
+
+    def resolve(self, path):
+        """Return (route template, handler, path arguments), or raise HTTPError(404)."""
+        for route, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if match:
+                return route, handler, [unquote(arg) for arg in match.groups()]
+        raise HTTPError(HTTPStatus.NOT_FOUND)
+
+    def authors(self, query):
+        return [author._asdict() for author in self.dao.getAllAuthors()], CATALOG_MAX_AGE
+
+    def categories(self, query):
+        return [category.type_ for category in self.dao.getAllCategories()], CATALOG_MAX_AGE
+
+    def publishers(self, query):
+        return [publisher._asdict() for publisher in self.dao.getAllPublishers()], CATALOG_MAX_AGE
+
+    def books_by_author(self, author_num, query):
+        if not author_num.isdigit():
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        return self._book_page(self.dao.getBooksByAuthor, Author(int(author_num), None, None), query)
+
+    def books_by_category(self, type_, query):
+        return self._book_page(self.dao.getBooksByCategory, Category(type_), query)
+
+    def books_by_publisher(self, publisher_code, query):
+        return self._book_page(self.dao.getBooksByPublisher, Publisher(publisher_code, None, None), query)
+
+    def _book_page(self, loader, key, query):
+        """One keyset page of a book list; "next" is the cursor of the following page, or null."""
+        try:
+            limit = int(query.get("limit", [DEFAULT_PAGE_SIZE])[0])
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "limit must be a number") from None
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        after = decode_cursor(query["after"][0]) if "after" in query else None
+        books = loader(key, after=after, limit=limit)
+        return {
+            "books": [book._asdict() for book in books],
+            "next": encode_cursor(books[-1]) if len(books) == limit else None,
+        }, CATALOG_MAX_AGE
+
+    def book_details(self, book_code, query):
+        details = self.dao.getBookDetails(book_code)
+        if details is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No book {book_code}")
+        return {
+            "book_code": details.book_code,
+            "title": details.title,
+            "price": details.price,
+            "publisher": details.publisher._asdict() if details.publisher is not None else None,
+            "authors": [author._asdict() for author in details.authors],
+            "availability": details.availability,
+        }, 0
+
+    def availability(self, book_code, query):
+        return {"book_code": book_code, "availability": self.dao.getBookAvailability(book_code)}, 0
+
+    def price(self, book_code, query):
+        price = self.dao.getBookPrice(book_code)
+        if price is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No book {book_code}")
+        return {"book_code": book_code, "price": price}, CATALOG_MAX_AGE
+
+    def basket(self, query):
+        """Branch x book on-hand matrix for ?codes=A,B,C (or repeated codes= parameters)."""
+        codes = list(dict.fromkeys(code for value in query.get("codes", []) for code in value.split(",") if code))
+        if not 1 <= len(codes) <= MAX_PAGE_SIZE:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"codes must list between 1 and {MAX_PAGE_SIZE} book codes")
+        return {"book_codes": codes, "branches": self.dao.getBasketStock(codes)}, 0
+
+    def health(self, query):
+        # A snapshot server answers from its catalog (read-only) while the database is down
+        online = getattr(self.dao, "online", True)
+        return {"status": "ok" if online is not False else "offline", "pool": self.dao.pool_stats()}, 0
+
+
+class Response:
+    __slots__ = ("status", "body", "etag", "gzip_body", "max_age", "content_type", "allow")
+
+    def __init__(self, status, body, max_age=0, content_type="application/json", etag=None, gzip_body=None):
+        self.status = status
+        self.body = body
+        self.max_age = max_age
+        self.content_type = content_type
+        self.etag = etag
+        self.gzip_body = gzip_body
+        self.allow = None
+
+
+def render(handler, args, query, accept_gzip):
+    """Run a handler and encode its result (on a worker thread): JSON body, ETag and gzip variant."""
+    try:
+        payload, max_age = handler(*args, query)
+        status = HTTPStatus.OK
+    except HTTPError as err:
+        payload, max_age, status = {"error": str(err)}, 0, err.status
+    body = json.dumps(payload, separators=(",", ":"), default=_json_default).encode()
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"' if status == HTTPStatus.OK else None
+    gzip_body = gzip.compress(body, compresslevel=5) if accept_gzip and len(body) >= GZIP_MIN_BYTES else None
+    return Response(status, body, max_age, etag=etag, gzip_body=gzip_body)
+
+
+# In[3]:
+
+
+class HenryServer:
+    """
+    asyncio HTTP/1.1 server (keep-alive, GET and HEAD only) in front of a HenryAPI.
+    At most `workers` handlers run at once; up to `max_pending` more wait for a worker, and any
+    request beyond that is refused with 503 so overload shows up as fast errors, not timeouts.
+    """
+
+    keepalive_timeout = 15.0   # Seconds an idle connection is kept open
+    max_header_bytes = 16384
+    max_body_bytes = 65536     # GET/HEAD bodies carry nothing we use; larger ones get 413
+
+    def __init__(self, dao, host="127.0.0.1", port=8080, workers=8, max_pending=256):
+        self.api = HenryAPI(dao)
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="henry-api")
+        self._in_flight = 0
+        self._server = None
+        self.poll_task = None   # Inventory change feed poller, see poll_inventory
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                  limit=self.max_header_bytes)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Serving the Henry API on http://%s:%d with %d workers", self.host, self.port, self.workers)
+        return self._server
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    self._write(writer, "HEAD", HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {}, b"", False)
+                    break
+                try:
+                    method, target, version, headers = self._parse(head)
+                except ValueError:
+                    self._write(writer, "GET", HTTPStatus.BAD_REQUEST, {}, b"", False)
+                    break
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self._write(writer, "GET", HTTPStatus.BAD_REQUEST, {}, b"", False)
+                    break
+                if length > self.max_body_bytes:
+                    self._write(writer, "GET", HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {}, b"", False)
+                    break
+                if length:
+                    try:
+                        await asyncio.wait_for(reader.readexactly(length), self.keepalive_timeout)
+                    except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                        break
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                status, response_headers, body = await self.respond(method, target, headers)
+                self._write(writer, method, status, response_headers, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse(head):
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    @staticmethod
+    def _write(writer, method, status, headers, body, keep_alive):
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 f"Content-Length: {len(body)}",
+                 "Connection: " + ("keep-alive" if keep_alive else "close")]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body if method != "HEAD" else b""))
+
+    async def respond(self, method, target, headers):
+        """Return (status, response headers, body) for one request."""
+        started = time.perf_counter()
+        url = urlsplit(target)
+        route = "unknown"
+        try:
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            if url.path == "/metrics":
+                route = url.path
+                return HTTPStatus.OK, {"Content-Type": "text/plain; version=0.0.4"}, REGISTRY.render_text().encode()
+            route, handler, args = self.api.resolve(url.path)
+            if self._in_flight >= self.workers + self.max_pending:
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy")
+            accept_gzip = "gzip" in headers.get("accept-encoding", "")
+            self._in_flight += 1
+            try:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, render, handler, args, parse_qs(url.query), accept_gzip)
+            finally:
+                self._in_flight -= 1
+        except HTTPError as err:
+            response = Response(err.status, json.dumps({"error": str(err)}).encode())
+            if err.status == HTTPStatus.METHOD_NOT_ALLOWED:
+                response.allow = "GET, HEAD"
+        except Exception as err:
+            logger.exception("Error handling %s %s", method, target)
+            response = Response(HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({"error": str(err)}).encode())
+        finally:
+            REGISTRY.histogram("henry_http_request_seconds", "HTTP request latency").observe(
+                time.perf_counter() - started, route=route)
+        return self._finish(response, headers, route)
+
+    @staticmethod
+    def _finish(response, headers, route):
+        """Pick the representation (gzip or identity), answer 304 for a matching If-None-Match."""
+        status, body = response.status, response.body
+        out = {"Content-Type": response.content_type}
+        if response.allow is not None:
+            out["Allow"] = response.allow
+        if response.etag is not None:
+            etag = response.etag
+            if response.gzip_body is not None:
+                body, etag = response.gzip_body, etag[:-1] + '-gzip"'
+                out["Content-Encoding"] = "gzip"
+            out["ETag"] = etag
+            out["Vary"] = "Accept-Encoding"
+            out["Cache-Control"] = f"max-age={response.max_age}" if response.max_age else "no-cache"
+            candidates = [tag.strip().removeprefix("W/") for tag in headers.get("if-none-match", "").split(",")]
+            if etag in candidates or "*" in candidates:
+                status, body = HTTPStatus.NOT_MODIFIED, b""
+                del out["Content-Type"]
+                out.pop("Content-Encoding", None)
+        REGISTRY.counter("henry_http_requests_total", "HTTP requests by route and status").inc(
+            route=route, status=str(status.value))
+        return status, out, body
+
+
+# In[4]:
+
+
+async def poll_inventory(feed, executor, interval):
+    """Keep the shared cache's on-hand counts current from the inventory change log."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(executor, feed.poll)
+        except Exception:
+            logger.exception("Error polling inventory changes")
+
+
+def _poll_stopped(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Inventory change polling stopped", exc_info=task.exception())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Henry Bookstore DAO as an HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int,
+                        help="threads running DAO calls (default: the connection pool size)")
+    parser.add_argument("--max-pending", type=int, default=256,
+                        help="requests allowed to wait for a worker before new ones get 503 (default: 256)")
+    parser.add_argument("--config", help="configuration file (default: henry.ini)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="storage backend (default: from the configuration)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="answer queries from an in-memory catalog snapshot instead of the cache")
+    parser.add_argument("--refresh-interval", type=float, default=60.0,
+                        help="seconds between snapshot refreshes (default: 60)")
+    parser.add_argument("--catalog-file",
+                        help="snapshot mode with a local catalog file: start from it and keep serving it when the "
+                             "database is down (default: [snapshot] catalog_file with --snapshot)")
+    parser.add_argument("--inventory-poll", type=float, default=2.0,
+                        help="seconds between inventory change feed polls, 0 to disable (default: 2)")
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+    configure_logging(config)
+
+    if args.snapshot or args.catalog_file:
+        catalog_path = catalog_file_path(config, args.catalog_file)
+        dao = SnapshotHenryDAO(create_dao(config, backend=args.backend, connect_eagerly=catalog_path is None),
+                               refresh_interval=args.refresh_interval, cache_path=catalog_path)
+    else:
+        dao = CachedHenryDAO(create_dao(config, backend=args.backend))
+    feed = InventoryChangeFeed(dao) if args.inventory_poll > 0 else None
+    if feed is not None and not feed.enabled:
+        feed = None
+    if feed is not None and isinstance(dao, CachedHenryDAO):
+        dao.ttls.update(dict.fromkeys(INVENTORY_METHODS, FEED_INVENTORY_TTL))
+
+    # More workers than pooled connections would only wait for a connection
+    workers = args.workers or config["pool"].getint("size")
+    server = HenryServer(dao, host=args.host, port=args.port, workers=workers, max_pending=args.max_pending)
+
+    async def run():
+        await server.start()
+        if feed is not None:
+            # Keep a reference: the event loop only holds tasks weakly
+            server.poll_task = asyncio.get_running_loop().create_task(
+                poll_inventory(feed, server.executor, args.inventory_poll))
+            server.poll_task.add_done_callback(_poll_stopped)
+        try:
+            await server.serve_forever()
+        finally:
+            if server.poll_task is not None:
+                server.poll_task.cancel()
+                await asyncio.gather(server.poll_task, return_exceptions=True)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        dao.close_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
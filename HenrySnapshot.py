@@ -0,0 +1,505 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenrySnapshot.py, implements the in-memory catalog snapshot mode used by branch kiosks.
+SnapshotHenryDAO loads HENRY_BOOK, HENRY_AUTHOR, HENRY_WROTE, HENRY_PUBLISHER, HENRY_BRANCH and
+HENRY_INVENTORY once with one bulk SELECT per table, keeps them as compact tuples in a
+CatalogSnapshot with hash indexes by author_num, type, publisher_code and book_code, and then
+answers every HenryDAO query method without touching the network.
+A background thread refreshes the snapshot periodically. Only tables whose CHECKSUM TABLE value
+changed are reloaded; the new snapshot is built completely off to the side and then swapped in with
+a single reference assignment, so readers always see either the old or the new snapshot, never a
+half-loaded one. Between refreshes, the inventory change feed (HenryChangeFeed.py) keeps on-hand
+counts current through apply_inventory_changes(), which swaps in a copy of the snapshot with only
+the changed books' inventory replaced.
+With a catalog file (cache_path), every new snapshot is also saved to a local SQLite file stamped
+with a format version and the table checksums. The next start builds its first snapshot from that
+file without waiting for the database, revalidates it in the background (reloading only tables
+whose checksum changed), and keeps answering from it, read-only, while the database is unreachable.
+"""
+
+import bisect
+import copy
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+
+from HenryInterfaceClasses import Author, Book, BookDetail, Category, LowStockItem, PriceStats, Publisher, StockTotal
+
+logger = logging.getLogger("henry.snapshot")
+
+# Layout of catalog files written by save_snapshot; files of another version are ignored
+CATALOG_FILE_VERSION = 1
+
+# One bulk SELECT per table; column order is what CatalogSnapshot expects
+SNAPSHOT_QUERIES = {
+    "HENRY_BOOK": "SELECT BOOK_CODE, TITLE, PUBLISHER_CODE, TYPE, PRICE FROM HENRY_BOOK",
+    "HENRY_AUTHOR": "SELECT AUTHOR_NUM, AUTHOR_LAST, AUTHOR_FIRST FROM HENRY_AUTHOR",
+    "HENRY_WROTE": "SELECT BOOK_CODE, AUTHOR_NUM, SEQUENCE FROM HENRY_WROTE",
+    "HENRY_PUBLISHER": "SELECT PUBLISHER_CODE, PUBLISHER_NAME, CITY FROM HENRY_PUBLISHER",
+    "HENRY_BRANCH": "SELECT BRANCH_NUM, BRANCH_NAME FROM HENRY_BRANCH",
+    "HENRY_INVENTORY": "SELECT BOOK_CODE, BRANCH_NUM, ON_HAND FROM HENRY_INVENTORY",
+}
+
+
+class CatalogSnapshot:
+    """
+    Immutable, fully indexed copy of the Henry catalog and inventory.
+    Rows are stored as plain tuples keyed by primary key; secondary indexes map author_num, type and
+    publisher_code to tuples of book codes in title order. A snapshot is never modified after
+    construction, so it can be shared between threads without locking.
+    """
+
+    def __init__(self, tables, checksums=None, loaded_at=None):
+        self.tables = tables   # table name -> list of raw row tuples, kept for incremental refreshes
+        self.checksums = checksums or {}
+        self.loaded_at = loaded_at if loaded_at is not None else time.time()
+
+        # Primary key indexes
+        self.books = {code: (title, publisher_code, type_, price)
+                      for code, title, publisher_code, type_, price in tables["HENRY_BOOK"]}
+        self.authors = {num: (last, first) for num, last, first in tables["HENRY_AUTHOR"]}
+        self.publishers = {code: (name, city) for code, name, city in tables["HENRY_PUBLISHER"]}
+        self.branches = {num: name for num, name in sorted(tables["HENRY_BRANCH"], key=lambda row: row[0])}
+
+        # Secondary indexes: book codes in title order per author, type and publisher. The books are
+        # sorted by title once; the indexes are filled in that order, so they need no sorting of their own
+        title_ordered = sorted(self.books, key=self.sort_key)
+        rank = {code: position for position, code in enumerate(title_ordered)}
+        by_author, authors_by_book = {}, {}
+        for book_code, author_num, sequence in sorted(tables["HENRY_WROTE"], key=lambda row: (row[2] or 0)):
+            if book_code in rank:
+                by_author.setdefault(author_num, []).append(book_code)
+                authors_by_book.setdefault(book_code, []).append(author_num)
+        by_type, by_publisher = {}, {}
+        books = self.books
+        for code in title_ordered:
+            _, publisher_code, type_, _ = books[code]
+            by_type.setdefault(type_, []).append(code)
+            by_publisher.setdefault(publisher_code, []).append(code)
+        self.books_by_author = {num: tuple(sorted(codes, key=rank.__getitem__)) for num, codes in by_author.items()}
+        self.books_by_type = {type_: tuple(codes) for type_, codes in by_type.items()}
+        self.books_by_publisher = {code: tuple(codes) for code, codes in by_publisher.items()}
+        self.authors_by_book = {code: tuple(nums) for code, nums in authors_by_book.items()}
+
+        inventory = {}
+        for book_code, branch_num, on_hand in sorted(tables["HENRY_INVENTORY"], key=lambda row: row[1]):
+            inventory.setdefault(book_code, []).append((branch_num, on_hand))
+        self.inventory = {code: tuple(rows) for code, rows in inventory.items()}
+
+        # The getAll* lists never change within a snapshot, so build them once
+        self.all_authors = [Author(num, *self.authors[num]) for num in sorted(self.books_by_author)
+                            if num in self.authors]
+        self.all_categories = [Category(type_) for type_ in sorted(self.books_by_type)]
+        self.all_publishers = [Publisher(code, *self.publishers[code]) for code in sorted(self.books_by_publisher)
+                               if code in self.publishers]
+
+        # Report aggregates, computed on first use (the same for every reader, so a race only repeats work)
+        self._stock_summary = None
+        self._price_stats = None
+
+    def sort_key(self, book_code):
+        """(title, book_code) position of a book, the order of every secondary index."""
+        return (self.books[book_code][0] or "", book_code)
+
+    def page(self, book_codes, after=None, before=None, limit=None):
+        """
+        Return Book objects for a slice of a title-ordered index, with the keyset paging semantics of
+        HenryDAO._book_page: the page starts after the Book `after` / ends before the Book `before`.
+        """
+        start, end = 0, len(book_codes)
+        if after is not None:
+            start = bisect.bisect_right(book_codes, (after.title or "", after.book_code), key=self.sort_key)
+        if before is not None:
+            end = bisect.bisect_left(book_codes, (before.title or "", before.book_code), key=self.sort_key)
+        if limit is not None:
+            if before is not None:
+                start = max(start, end - limit)
+            else:
+                end = min(end, start + limit)
+        return [self.book(code) for code in book_codes[start:end]]
+
+    def with_inventory(self, changes):
+        """
+        Return a copy of the snapshot with InventoryChange entries applied to its inventory.
+        Everything but the inventory index is shared with this snapshot, which is left unchanged.
+        """
+        inventory = dict(self.inventory)
+        for change in changes:
+            rows = {branch_num: on_hand for branch_num, on_hand in inventory.get(change.book_code, ())}
+            if change.on_hand is None:
+                rows.pop(change.branch_num, None)
+            else:
+                rows[change.branch_num] = change.on_hand
+            inventory[change.book_code] = tuple(sorted(rows.items()))
+        snapshot = copy.copy(self)
+        snapshot.inventory = inventory
+        snapshot._stock_summary = None   # Price statistics only depend on the catalog and stay valid
+        return snapshot
+
+    def stock_summary(self):
+        """
+        The in-memory equivalent of HENRY_STOCK_SUMMARY:
+        {(dimension, group key, branch_num): [titles, on_hand, stock_value]}.
+        """
+        summary = self._stock_summary
+        if summary is None:
+            summary = {}
+            for book_code, rows in self.inventory.items():
+                book = self.books.get(book_code)
+                if book is None:
+                    continue
+                _, publisher_code, type_, price = book
+                for branch_num, on_hand in rows:
+                    for key in (("TYPE", type_, branch_num), ("PUBLISHER", publisher_code, branch_num)):
+                        if key[1] is None:
+                            continue
+                        totals = summary.get(key)
+                        if totals is None:
+                            totals = summary[key] = [0, 0, 0]
+                        totals[0] += 1
+                        totals[1] += on_hand or 0
+                        totals[2] += (on_hand or 0) * (price or 0)
+            self._stock_summary = summary
+        return summary
+
+    def price_stats(self):
+        """{"TYPE" or "PUBLISHER": {group key: [titles, price total, lowest, highest]}} over every book."""
+        stats = self._price_stats
+        if stats is None:
+            stats = {"TYPE": {}, "PUBLISHER": {}}
+            for _, publisher_code, type_, price in self.books.values():
+                for dimension, key in (("TYPE", type_), ("PUBLISHER", publisher_code)):
+                    if key is None or price is None:
+                        continue
+                    entry = stats[dimension].get(key)
+                    if entry is None:
+                        stats[dimension][key] = [1, price, price, price]
+                    else:
+                        entry[0] += 1
+                        entry[1] += price
+                        entry[2] = min(entry[2], price)
+                        entry[3] = max(entry[3], price)
+            self._price_stats = stats
+        return stats
+
+    def book(self, book_code):
+        title, _, _, price = self.books[book_code]
+        return Book(book_code, title, price)
+
+    def availability(self, book_code):
+        return {self.branches[branch_num]: on_hand for branch_num, on_hand in self.inventory.get(book_code, ())
+                if branch_num in self.branches}
+
+    def details(self, book_code):
+        title, publisher_code, _, price = self.books[book_code]
+        publisher = None
+        if publisher_code in self.publishers:
+            publisher = Publisher(publisher_code, *self.publishers[publisher_code])
+        authors = [Author(num, *self.authors[num]) for num in self.authors_by_book.get(book_code, ())
+                   if num in self.authors]
+        return BookDetail(book_code, title, price, publisher, authors, self.availability(book_code))
+
+
+def _snapshot_columns(table):
+    query = SNAPSHOT_QUERIES[table]
+    return [column.strip() for column in query[len("SELECT "):query.index(" FROM ")].split(",")]
+
+
+def save_snapshot(snapshot, path):
+    """
+    Write the tables, checksums and load time of a CatalogSnapshot to a SQLite catalog file.
+    The file is written next to `path` and then renamed over it, so readers never see a partial file.
+    DECIMAL values are stored as text and listed in the file's metadata so load_snapshot restores them.
+    """
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    decimals = {}
+    conn = sqlite3.connect(temp_path)
+    try:
+        for table, rows in snapshot.tables.items():
+            columns = _snapshot_columns(table)
+            decimal_columns = {index for index in range(len(columns))
+                               if isinstance(next((row[index] for row in rows if row[index] is not None), None), Decimal)}
+            if decimal_columns:
+                decimals[table] = sorted(decimal_columns)
+                rows = [tuple(str(value) if index in decimal_columns and value is not None else value
+                              for index, value in enumerate(row)) for row in rows]
+            conn.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+            conn.executemany(f"INSERT INTO {table} VALUES ({', '.join(['?'] * len(columns))})", rows)
+        meta = {"version": CATALOG_FILE_VERSION, "queries": SNAPSHOT_QUERIES, "loaded_at": snapshot.loaded_at,
+                "checksums": snapshot.checksums, "decimals": decimals}
+        conn.execute("CREATE TABLE CATALOG_META (NAME TEXT PRIMARY KEY, VALUE TEXT)")
+        conn.executemany("INSERT INTO CATALOG_META VALUES (?, ?)", [(name, json.dumps(value)) for name, value in meta.items()])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path):
+    """
+    Build a CatalogSnapshot from a catalog file written by save_snapshot.
+    Returns None if the file does not exist, cannot be read, or was written by another version
+    (or for different SNAPSHOT_QUERIES).
+    """
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        meta = {name: json.loads(value) for name, value in conn.execute("SELECT NAME, VALUE FROM CATALOG_META")}
+        if meta.get("version") != CATALOG_FILE_VERSION or meta.get("queries") != SNAPSHOT_QUERIES:
+            logger.warning("Ignoring catalog file %s: written by another version", path)
+            return None
+        tables = {}
+        for table in SNAPSHOT_QUERIES:
+            rows = conn.execute(f"SELECT * FROM {table}").fetchall()
+            decimal_columns = set(meta["decimals"].get(table, ()))
+            if decimal_columns:
+                rows = [tuple(Decimal(value) if index in decimal_columns and value is not None else value
+                              for index, value in enumerate(row)) for row in rows]
+            tables[table] = rows
+        return CatalogSnapshot(tables, meta["checksums"], loaded_at=meta["loaded_at"])
+    except (sqlite3.Error, KeyError, ValueError) as err:
+        logger.warning("Ignoring unreadable catalog file %s: %s", path, err)
+        return None
+    finally:
+        conn.close()
+
+
+# In[2]:
+
+
+class SnapshotHenryDAO:
+    """
+    HenryDAO replacement that answers every query from a CatalogSnapshot held in memory.
+    The wrapped HenryDAO is only used to load and refresh the snapshot; attributes not defined here
+    (close_connection, pool_stats, ...) are forwarded to it.
+    With cache_path, the first snapshot comes from that catalog file when it is usable and is
+    revalidated against the database in the background; `online` tells whether the last refresh
+    reached the database (None until the first one finished).
+    """
+
+    def __init__(self, dao, refresh_interval=60.0, start_refresher=True, cache_path=None):
+        self.dao = dao
+        self.refresh_interval = refresh_interval
+        self.cache_path = cache_path
+        self.snapshot = load_snapshot(cache_path) if cache_path else None
+        self.online = None
+        self.validated_at = None   # time.time() of the last refresh that reached the database
+        self.stats = {"refreshes": 0, "tables_reloaded": 0, "failed_refreshes": 0, "saves": 0}
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.snapshot is not None:
+            logger.info("Catalog snapshot loaded from %s (saved %s)", cache_path, time.ctime(self.snapshot.loaded_at))
+            if not start_refresher:
+                self.refresh()
+        elif not self.refresh():
+            raise RuntimeError("Could not load the catalog snapshot")
+        if start_refresher:
+            self.start()
+
+    def __getattr__(self, name):
+        return getattr(self.dao, name)
+
+    def refresh(self):
+        """
+        Reload the tables that changed since the current snapshot and swap in a new snapshot.
+        Returns True if the snapshot is current afterwards.
+        """
+        with self._refresh_lock:
+            current = self.snapshot
+            checksums = self.dao.tableChecksums(list(SNAPSHOT_QUERIES))
+            tables = {}
+            for table, query in SNAPSHOT_QUERIES.items():
+                unchanged = (current is not None and checksums is not None
+                             and checksums.get(table) is not None
+                             and current.checksums.get(table) == checksums.get(table))
+                if unchanged:
+                    tables[table] = current.tables[table]
+                    continue
+                rows = self.dao.fetchRows(query)
+                if rows is None:
+                    self.stats["failed_refreshes"] += 1
+                    if self.online is not False and current is not None:
+                        logger.warning("Database unreachable; answering from the catalog snapshot of %s",
+                                       time.ctime(current.loaded_at))
+                    self.online = False
+                    return current is not None
+                tables[table] = rows
+                self.stats["tables_reloaded"] += 1
+            self.online = True
+            self.validated_at = time.time()
+            if current is not None and all(tables[table] is current.tables[table] for table in tables):
+                return True
+            # Build the complete snapshot first; readers switch over in one assignment
+            snapshot = self.snapshot = CatalogSnapshot(tables, checksums)
+            self.stats["refreshes"] += 1
+            logger.info("Catalog snapshot loaded: %d books, %d authors, %d branches",
+                        len(snapshot.books), len(snapshot.authors), len(snapshot.branches))
+        if self.cache_path:
+            self.save(snapshot)
+        return True
+
+    def save(self, snapshot=None):
+        """Write a snapshot (by default the current one) to the catalog file; returns True on success."""
+        try:
+            save_snapshot(snapshot or self.snapshot, self.cache_path)
+        except (OSError, sqlite3.Error) as err:
+            logger.warning("Could not save the catalog file %s: %s", self.cache_path, err)
+            return False
+        self.stats["saves"] += 1
+        return True
+
+    def start(self):
+        """Start the background thread that refreshes the snapshot every refresh_interval seconds."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="henry-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def apply_inventory_changes(self, changes):
+        """Swap in a snapshot with the given InventoryChange entries applied to its on-hand counts."""
+        if changes:
+            with self._refresh_lock:
+                self.snapshot = self.snapshot.with_inventory(changes)
+
+    def close_connection(self):
+        self.stop()
+        self.dao.close_connection()
+
+    def _refresh_loop(self):
+        # A snapshot read from the catalog file is revalidated right away
+        while not self._stop.wait(self.refresh_interval if self.online is not None else 0):
+            try:
+                self.refresh()
+            except Exception as err:
+                self.stats["failed_refreshes"] += 1
+                self.online = False
+                logger.exception("Error refreshing catalog snapshot: %s", err)
+
+    # HenryDAO query methods, answered from the current snapshot
+
+    def getAllAuthors(self):
+        return list(self.snapshot.all_authors)
+
+    def getAllCategories(self):
+        return list(self.snapshot.all_categories)
+
+    def getAllBooks(self):
+        snapshot = self.snapshot
+        return [snapshot.book(code) for code in snapshot.books]
+
+    def getAllPublishers(self):
+        return list(self.snapshot.all_publishers)
+
+    def getBooksByAuthor(self, author, after=None, before=None, limit=None):
+        snapshot = self.snapshot
+        return snapshot.page(snapshot.books_by_author.get(author.author_num, ()), after, before, limit)
+
+    def getBooksByCategory(self, category, after=None, before=None, limit=None):
+        snapshot = self.snapshot
+        return snapshot.page(snapshot.books_by_type.get(category.type_, ()), after, before, limit)
+
+    def getBooksByPublisher(self, publisher, after=None, before=None, limit=None):
+        snapshot = self.snapshot
+        return snapshot.page(snapshot.books_by_publisher.get(publisher.publisher_code, ()), after, before, limit)
+
+    def getBookAvailability(self, book_code):
+        return self.snapshot.availability(book_code)
+
+    def getBookPrice(self, book_code):
+        book = self.snapshot.books.get(book_code)
+        return book[3] if book is not None else None
+
+    def getBookDetails(self, book_code):
+        snapshot = self.snapshot
+        return snapshot.details(book_code) if book_code in snapshot.books else None
+
+    def peek_book_details(self, book_code):
+        # Every book is in memory, so this is getBookDetails (see CachedHenryDAO.peek_book_details)
+        return self.getBookDetails(book_code)
+
+    def getBookDetailsBatch(self, book_codes):
+        snapshot = self.snapshot
+        return {code: snapshot.details(code) for code in dict.fromkeys(book_codes) if code in snapshot.books}
+
+    def getStockByBranch(self, category=None, publisher=None):
+        snapshot = self.snapshot
+        dimension = "PUBLISHER" if publisher is not None else "TYPE"
+        group = publisher.publisher_code if publisher is not None else category.type_ if category is not None else None
+        totals = {}
+        for (row_dimension, key, branch_num), (titles, on_hand, value) in snapshot.stock_summary().items():
+            if row_dimension == dimension and (group is None or key == group):
+                branch = totals.setdefault(branch_num, [0, 0, 0])
+                branch[0] += titles
+                branch[1] += on_hand
+                branch[2] += value
+        return [StockTotal(snapshot.branches[num], *totals[num]) for num in sorted(totals) if num in snapshot.branches]
+
+    def _stock_by(self, dimension):
+        totals = {}
+        for (row_dimension, key, _), (titles, on_hand, value) in self.snapshot.stock_summary().items():
+            if row_dimension == dimension:
+                group = totals.setdefault(key, [0, 0, 0])
+                group[0] += titles
+                group[1] += on_hand
+                group[2] += value
+        return totals
+
+    def getStockByCategory(self):
+        totals = self._stock_by("TYPE")
+        return [StockTotal(type_, *totals[type_]) for type_ in sorted(totals)]
+
+    def getStockByPublisher(self):
+        publishers = self.snapshot.publishers
+        totals = self._stock_by("PUBLISHER")
+        return sorted((StockTotal(publishers[code][0], *totals[code]) for code in totals if code in publishers),
+                      key=lambda total: total.label)
+
+    def getPriceByCategory(self):
+        stats = self.snapshot.price_stats()["TYPE"]
+        return [PriceStats(type_, count, total / count, lowest, highest)
+                for type_, (count, total, lowest, highest) in sorted(stats.items())]
+
+    def getPriceByPublisher(self):
+        publishers = self.snapshot.publishers
+        stats = self.snapshot.price_stats()["PUBLISHER"]
+        return sorted((PriceStats(publishers[code][0], count, total / count, lowest, highest)
+                       for code, (count, total, lowest, highest) in stats.items() if code in publishers),
+                      key=lambda stat: stat.label)
+
+    def getBasketStock(self, book_codes):
+        snapshot = self.snapshot
+        by_branch = {}
+        for code in sorted(dict.fromkeys(book_codes)):
+            for branch_num, on_hand in snapshot.inventory.get(code, ()):
+                if branch_num in snapshot.branches:
+                    by_branch.setdefault(branch_num, {})[code] = on_hand
+        return {snapshot.branches[num]: by_branch[num] for num in sorted(by_branch)}
+
+    def getLowStock(self, threshold=2, limit=100):
+        snapshot = self.snapshot
+        rows = ((on_hand, snapshot.books[code][0], branch_num, code)
+                for code, inventory in snapshot.inventory.items() if code in snapshot.books
+                for branch_num, on_hand in inventory
+                if on_hand is not None and on_hand <= threshold and branch_num in snapshot.branches)
+        return [LowStockItem(code, title, snapshot.branches[branch_num], on_hand)
+                for on_hand, title, branch_num, code in heapq.nsmallest(limit, rows)]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryTreeRender.py, provides diff-based rendering of ttk.Treeview tables for the Henry Bookstore GUI.
+Clearing a Treeview and inserting every row again each time a book is selected or an on-hand count
+changes makes Tk delete and recreate all items, which flickers and loses the selection.
+TreeRenderer remembers which item shows which row (by a key such as the branch name) and, given
+the new rows, only inserts, deletes, moves or updates the items that differ. schedule() defers the
+render to the next idle tick, and coalesce() does the same for event handlers, so a burst of
+selection events or inventory updates results in one render per tick.
+"""
+
+
+def coalesce(widget, fn):
+    """
+    Return a callable that runs fn(*args) at the widget's next idle tick, with the arguments of the
+    last call made before then; earlier calls in the same tick are dropped.
+    """
+    state = {"after_id": None, "args": ()}
+
+    def run():
+        state["after_id"] = None
+        fn(*state["args"])
+
+    def call(*args):
+        state["args"] = args
+        if state["after_id"] is None:
+            state["after_id"] = widget.after_idle(run)
+    return call
+
+
+class TreeRenderer:
+    """
+    Keeps the top-level items of a ttk.Treeview in sync with a list of value tuples.
+    key(values) identifies a row across renders (by default its first column); rows with the same
+    key are told apart by their order of appearance.
+    """
+
+    def __init__(self, tree, key=None):
+        self.tree = tree
+        self.key = key or (lambda values: values[0])
+        self.items = {}     # row key -> (item id, values shown)
+        self.order = []     # item ids in display order
+        self._pending = None
+        self._after_id = None
+        self.stats = {"renders": 0, "inserted": 0, "updated": 0, "deleted": 0, "moved": 0}
+
+    def _keys(self, rows, key):
+        seen = {}
+        for values in rows:
+            row_key = key(values)
+            occurrence = seen.get(row_key, 0)
+            seen[row_key] = occurrence + 1
+            yield (row_key, occurrence), tuple(values)
+
+    def render(self, rows, key=None):
+        """Show exactly `rows` (iterable of value tuples), touching only the items that changed."""
+        self.cancel()
+        self.stats["renders"] += 1
+        tree = self.tree
+        items = {}
+        order = []
+        for row_key, values in self._keys(rows, key or self.key):
+            current = self.items.pop(row_key, None)
+            if current is None:
+                item = tree.insert("", "end", values=values)
+                self.stats["inserted"] += 1
+            else:
+                item = current[0]
+                if current[1] != values:
+                    tree.item(item, values=values)
+                    self.stats["updated"] += 1
+            items[row_key] = (item, values)
+            order.append(item)
+        if self.items:
+            tree.delete(*(item for item, _ in self.items.values()))
+            self.stats["deleted"] += len(self.items)
+        # New items were appended at the end; items are only moved from the first misplaced one on
+        shown = tree.get_children()
+        first = next((index for index, item in enumerate(order) if shown[index] != item), None)
+        if first is not None:
+            for index in range(first, len(order)):
+                tree.move(order[index], "", index)
+            self.stats["moved"] += len(order) - first
+        self.items = items
+        self.order = order
+
+    def schedule(self, rows, key=None):
+        """Render `rows` at the next idle tick; a later schedule() in the same tick replaces them."""
+        self._pending = (list(rows), key)
+        if self._after_id is None:
+            self._after_id = self.tree.after_idle(self.flush)
+
+    def flush(self):
+        """Render the scheduled rows now, if any."""
+        self._after_id = None
+        if self._pending is not None:
+            rows, key = self._pending
+            self.render(rows, key)
+
+    def cancel(self):
+        if self._after_id is not None:
+            self.tree.after_cancel(self._after_id)
+            self._after_id = None
+        self._pending = None
+
+    def clear(self):
+        self.render(())
+
+    def patch(self, key, values):
+        """
+        Update, add (at the end) or, when values is None, remove the single row with this key,
+        without re-rendering the rest. A scheduled render is flushed first so it cannot undo the patch.
+        """
+        self.flush()
+        row_key = (key, 0)
+        current = self.items.get(row_key)
+        if values is None:
+            if current is not None:
+                self.tree.delete(current[0])
+                self.order.remove(current[0])
+                del self.items[row_key]
+                self.stats["deleted"] += 1
+            return
+        values = tuple(values)
+        if current is None:
+            item = self.tree.insert("", "end", values=values)
+            self.order.append(item)
+            self.stats["inserted"] += 1
+        elif current[1] != values:
+            item = current[0]
+            self.tree.item(item, values=values)
+            self.stats["updated"] += 1
+        else:
+            return
+        self.items[row_key] = (item, values)
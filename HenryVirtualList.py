@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[1]:
+
+"""
+This script, HenryVirtualList.py, provides the virtualized book list used by the Henry Bookstore search frames.
+A popular category or publisher can hold tens of thousands of titles; loading them all into a
+combobox costs memory and makes Tk slow. VirtualBookList instead asks the DAO for one keyset page
+of books at a time (getBooksBy*(..., after=..., before=..., limit=...)), appends the next page
+when the user scrolls near the bottom, and prepends the previous page when scrolling back up.
+Only a bounded window of rows is kept: once it grows past max_rows, the rows furthest from the
+view are dropped and fetched again if the user scrolls back to them.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualBookList(ttk.Frame):
+    """
+    Scrollable list of book titles backed by a keyset-paged loader.
+    Pages are fetched through the owning frame's run_query(channel, fn, *args, on_done=..., on_error=...),
+    so they run on the QueryExecutor and drive the frame's loading indicator, which also reports
+    failures. on_select is called with the selected Book, or with None when a new list turns out to
+    be empty.
+    """
+
+    def __init__(self, master, run_query, channel, on_select=None, page_size=100, max_rows=400,
+                 height=10, width=40, prefetch_fraction=0.2):
+        super().__init__(master)
+        self.run_query = run_query
+        self.channel = channel
+        self.on_select = on_select
+        self.page_size = page_size
+        self.max_rows = max(max_rows, 2 * page_size)  # Room for the visible page and the one being added
+        self.prefetch_fraction = prefetch_fraction   # Load the next page once the view is this close to an edge
+
+        self.listbox = tk.Listbox(self, height=height, width=width, exportselection=False, activestyle="none")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=self._on_scroll)
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.listbox.bind("<<ListboxSelect>>", self._on_listbox_select)
+
+        self.books = []          # The loaded window of Book objects, in display order
+        self.loader = None       # loader(after, before, limit) -> list of Book objects
+        self.more_before = False
+        self.more_after = False
+        self._fetching = False   # Only one page request is in flight at a time
+
+    def reset(self, loader):
+        """
+        Show a new list. `loader` is called as loader(after, before, limit) on a worker thread, e.g.
+        functools.partial(dao.getBooksByCategory, category).
+        """
+        self.loader = loader
+        self.books = []
+        self.listbox.delete(0, "end")
+        self.more_before = self.more_after = False
+        self._fetching = True
+        self.run_query(self.channel, loader, None, None, self.page_size, on_done=self._show_first_page,
+                       on_error=self._page_failed)
+
+    def clear(self):
+        """Empty the list without loading anything (cancel the owner's page query first)."""
+        self.loader = None
+        self.books = []
+        self.listbox.delete(0, "end")
+        self.more_before = self.more_after = False
+        self._fetching = False
+
+    def selected(self):
+        """Return the selected Book, or None."""
+        selection = self.listbox.curselection()
+        return self.books[selection[0]] if selection else None
+
+    def visible_books(self):
+        """Return the loaded books in view other than the selected one, nearest to it first."""
+        if not self.books:
+            return []
+        first = self.listbox.nearest(0)
+        last = min(len(self.books), first + int(self.listbox.cget("height")))
+        selection = self.listbox.curselection()
+        anchor = selection[0] if selection else first
+        indices = sorted((index for index in range(first, last) if index != anchor), key=lambda index: abs(index - anchor))
+        return [self.books[index] for index in indices]
+
+    def _show_first_page(self, books):
+        self._fetching = False
+        self.books = list(books)
+        self.listbox.insert("end", *[book.title for book in self.books])
+        self.more_after = len(self.books) == self.page_size
+        if self.books:
+            self.listbox.selection_set(0)
+            self.listbox.see(0)
+        if self.on_select is not None:
+            self.on_select(self.books[0] if self.books else None)
+
+    def _on_listbox_select(self, event):
+        book = self.selected()
+        if book is not None and self.on_select is not None:
+            self.on_select(book)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._fetching or not self.books:
+            return
+        if self.more_after and float(last) >= 1.0 - self.prefetch_fraction:
+            self._fetching = True
+            self.run_query(self.channel, self.loader, self.books[-1], None, self.page_size,
+                           on_done=self._append_page, on_error=self._page_failed)
+        elif self.more_before and float(first) <= self.prefetch_fraction:
+            self._fetching = True
+            self.run_query(self.channel, self.loader, None, self.books[0], self.page_size,
+                           on_done=self._prepend_page, on_error=self._page_failed)
+
+    def _page_failed(self, error):
+        # The owner has reported the error; scrolling to the edge again retries the page
+        self._fetching = False
+
+    def _append_page(self, books):
+        self._fetching = False
+        self.more_after = len(books) == self.page_size
+        top = self.listbox.nearest(0)
+        self.books.extend(books)
+        self.listbox.insert("end", *[book.title for book in books])
+        # Drop rows from the top to stay within the window; the view keeps showing the same books
+        overflow = len(self.books) - self.max_rows
+        if overflow > 0:
+            del self.books[:overflow]
+            self.listbox.delete(0, overflow - 1)
+            self.more_before = True
+        self.listbox.yview(max(0, top - max(overflow, 0)))
+
+    def _prepend_page(self, books):
+        self._fetching = False
+        self.more_before = len(books) == self.page_size
+        top = self.listbox.nearest(0)
+        self.books[:0] = books
+        self.listbox.insert(0, *[book.title for book in books])
+        # Drop rows from the bottom to stay within the window
+        overflow = len(self.books) - self.max_rows
+        if overflow > 0:
+            del self.books[-overflow:]
+            self.listbox.delete(len(self.books), "end")
+            self.more_after = True
+        self.listbox.yview(top + len(books))
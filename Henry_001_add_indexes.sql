@@ -0,0 +1,9 @@
+-- Migration 001: secondary indexes for the HenryDAO lookups.
+-- HenryDAO looks books up by BOOK_CODE (primary key) and filters book lists by
+-- TYPE, PUBLISHER_CODE and AUTHOR_NUM. Without these indexes getBooksByCategory,
+-- getBooksByPublisher and getBooksByAuthor scan the whole table.
+-- Run once against an existing Henry database: mysql Henry < Henry_001_add_indexes.sql
+
+CREATE INDEX HENRY_BOOK_TYPE_IDX ON HENRY_BOOK (TYPE, TITLE);
+CREATE INDEX HENRY_BOOK_PUBLISHER_IDX ON HENRY_BOOK (PUBLISHER_CODE, TITLE);
+CREATE INDEX HENRY_WROTE_AUTHOR_IDX ON HENRY_WROTE (AUTHOR_NUM);
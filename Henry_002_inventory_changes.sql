@@ -0,0 +1,23 @@
+-- Migration 002: inventory change feed.
+-- HENRY_INVENTORY.ON_HAND is the only data that changes during the day. These triggers append
+-- every insert, update and delete on HENRY_INVENTORY to HENRY_INVENTORY_CHANGE, so clients can
+-- poll for rows with CHANGE_ID above the last one they saw (HenryDAO.getInventoryChanges) and
+-- patch their caches and screens instead of re-querying. A deleted row is logged with ON_HAND NULL.
+-- Old changes can be removed at any time (e.g. nightly): clients only read forward from their watermark.
+-- Run once against an existing Henry database: mysql Henry < Henry_002_inventory_changes.sql
+
+CREATE TABLE HENRY_INVENTORY_CHANGE
+(CHANGE_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+BOOK_CODE CHAR(8),
+BRANCH_NUM DECIMAL(4,0),
+ON_HAND DECIMAL(4,0),
+CHANGED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP );
+
+CREATE TRIGGER HENRY_INVENTORY_INSERTED AFTER INSERT ON HENRY_INVENTORY FOR EACH ROW
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND) VALUES (NEW.BOOK_CODE, NEW.BRANCH_NUM, NEW.ON_HAND);
+
+CREATE TRIGGER HENRY_INVENTORY_UPDATED AFTER UPDATE ON HENRY_INVENTORY FOR EACH ROW
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND) VALUES (NEW.BOOK_CODE, NEW.BRANCH_NUM, NEW.ON_HAND);
+
+CREATE TRIGGER HENRY_INVENTORY_DELETED AFTER DELETE ON HENRY_INVENTORY FOR EACH ROW
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND) VALUES (OLD.BOOK_CODE, OLD.BRANCH_NUM, NULL);
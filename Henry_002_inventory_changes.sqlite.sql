@@ -0,0 +1,21 @@
+-- Migration 002 (SQLite variant of Henry_002_inventory_changes.sql): inventory change feed.
+-- Same table and triggers, with SQLite's AUTOINCREMENT and BEGIN ... END trigger bodies.
+
+CREATE TABLE HENRY_INVENTORY_CHANGE
+(CHANGE_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+BOOK_CODE CHAR(8),
+BRANCH_NUM DECIMAL(4,0),
+ON_HAND DECIMAL(4,0),
+CHANGED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP );
+
+CREATE TRIGGER HENRY_INVENTORY_INSERTED AFTER INSERT ON HENRY_INVENTORY BEGIN
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND) VALUES (NEW.BOOK_CODE, NEW.BRANCH_NUM, NEW.ON_HAND);
+END;
+
+CREATE TRIGGER HENRY_INVENTORY_UPDATED AFTER UPDATE ON HENRY_INVENTORY BEGIN
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND) VALUES (NEW.BOOK_CODE, NEW.BRANCH_NUM, NEW.ON_HAND);
+END;
+
+CREATE TRIGGER HENRY_INVENTORY_DELETED AFTER DELETE ON HENRY_INVENTORY BEGIN
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND) VALUES (OLD.BOOK_CODE, OLD.BRANCH_NUM, NULL);
+END;
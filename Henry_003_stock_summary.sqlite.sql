@@ -0,0 +1,55 @@
+-- Migration 003 (SQLite variant of Henry_003_stock_summary.sql): materialized stock summary.
+-- Same tables, columns and triggers, with SQLite's BEGIN ... END trigger bodies.
+
+ALTER TABLE HENRY_INVENTORY_CHANGE ADD COLUMN CHANGE_KIND CHAR(1);
+ALTER TABLE HENRY_INVENTORY_CHANGE ADD COLUMN OLD_ON_HAND DECIMAL(4,0);
+
+DROP TRIGGER HENRY_INVENTORY_INSERTED;
+DROP TRIGGER HENRY_INVENTORY_UPDATED;
+DROP TRIGGER HENRY_INVENTORY_DELETED;
+
+CREATE TRIGGER HENRY_INVENTORY_INSERTED AFTER INSERT ON HENRY_INVENTORY BEGIN
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND, CHANGE_KIND, OLD_ON_HAND)
+VALUES (NEW.BOOK_CODE, NEW.BRANCH_NUM, NEW.ON_HAND, 'I', NULL);
+END;
+
+CREATE TRIGGER HENRY_INVENTORY_UPDATED AFTER UPDATE ON HENRY_INVENTORY BEGIN
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND, CHANGE_KIND, OLD_ON_HAND)
+VALUES (NEW.BOOK_CODE, NEW.BRANCH_NUM, NEW.ON_HAND, 'U', OLD.ON_HAND);
+END;
+
+CREATE TRIGGER HENRY_INVENTORY_DELETED AFTER DELETE ON HENRY_INVENTORY BEGIN
+INSERT INTO HENRY_INVENTORY_CHANGE (BOOK_CODE, BRANCH_NUM, ON_HAND, CHANGE_KIND, OLD_ON_HAND)
+VALUES (OLD.BOOK_CODE, OLD.BRANCH_NUM, NULL, 'D', OLD.ON_HAND);
+END;
+
+CREATE TABLE HENRY_STOCK_SUMMARY
+(DIMENSION CHAR(9),
+GROUP_KEY CHAR(8),
+BRANCH_NUM DECIMAL(4,0),
+TITLES INTEGER,
+ON_HAND INTEGER,
+STOCK_VALUE DECIMAL(14,2),
+PRIMARY KEY (DIMENSION, GROUP_KEY, BRANCH_NUM) );
+
+CREATE TABLE HENRY_SUMMARY_STATE
+(NAME CHAR(16) PRIMARY KEY,
+CHANGE_ID BIGINT );
+
+-- Low-stock lists read the few rows below a threshold instead of the whole table
+CREATE INDEX HENRY_INVENTORY_ON_HAND_IDX ON HENRY_INVENTORY (ON_HAND);
+
+INSERT INTO HENRY_SUMMARY_STATE (NAME, CHANGE_ID)
+SELECT 'STOCK', COALESCE(MAX(CHANGE_ID), 0) FROM HENRY_INVENTORY_CHANGE;
+
+INSERT INTO HENRY_STOCK_SUMMARY (DIMENSION, GROUP_KEY, BRANCH_NUM, TITLES, ON_HAND, STOCK_VALUE)
+SELECT 'TYPE', BK.TYPE, I.BRANCH_NUM, COUNT(*), SUM(I.ON_HAND), SUM(I.ON_HAND * BK.PRICE)
+FROM HENRY_INVENTORY I JOIN HENRY_BOOK BK ON BK.BOOK_CODE = I.BOOK_CODE
+WHERE BK.TYPE IS NOT NULL
+GROUP BY BK.TYPE, I.BRANCH_NUM;
+
+INSERT INTO HENRY_STOCK_SUMMARY (DIMENSION, GROUP_KEY, BRANCH_NUM, TITLES, ON_HAND, STOCK_VALUE)
+SELECT 'PUBLISHER', BK.PUBLISHER_CODE, I.BRANCH_NUM, COUNT(*), SUM(I.ON_HAND), SUM(I.ON_HAND * BK.PRICE)
+FROM HENRY_INVENTORY I JOIN HENRY_BOOK BK ON BK.BOOK_CODE = I.BOOK_CODE
+WHERE BK.PUBLISHER_CODE IS NOT NULL
+GROUP BY BK.PUBLISHER_CODE, I.BRANCH_NUM;